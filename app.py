@@ -1,13 +1,14 @@
 import streamlit as st
-import cv2
-import numpy as np
-from PIL import Image
-import tempfile
-import os
-from pathlib import Path
+import hashlib
 
 # Локальные импорты
+from utils.cache import ResultCache
 from utils.detection import TrafficSignDetector
+from utils.ingest import decode_image
+from utils.metrics import DetectorMetrics, JsonLogSink, serve_prometheus
+from utils.recommendations import driver_recommendations
+from utils.registry import DEFAULT_MODEL, ModelRegistry
+from utils.statistics import DetectionStats
 from utils.visualization import create_result_image, create_statistics_chart
 from config import *
 
@@ -50,10 +51,41 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 @st.cache_resource
-def load_model():
-    """Загружаем модель один раз и кешируем"""
-    detector = TrafficSignDetector(MODEL_PATH)
-    return detector
+def load_result_cache():
+    """Кэш результатов детекции, общий для всех сессий"""
+    return ResultCache(
+        max_bytes=RESULT_CACHE_MAX_MB * 2 ** 20,
+        disk_dir=RESULT_CACHE_DIR,
+        max_disk_bytes=RESULT_CACHE_MAX_DISK_MB * 2 ** 20
+    )
+
+@st.cache_resource
+def load_metrics():
+    """Метрики детектора, общие для всех сессий"""
+    metrics = DetectorMetrics(sinks=[JsonLogSink(METRICS_LOG_PATH)] if METRICS_LOG_PATH else [])
+    if METRICS_PORT is not None:
+        serve_prometheus(metrics, port=METRICS_PORT)
+    return metrics
+
+@st.cache_resource
+def load_registry():
+    """Реестр моделей, общий для всех сессий (манифест MODEL_REGISTRY_PATH или MODEL_PATH)"""
+    return ModelRegistry.from_config(
+        max_bytes=REGISTRY_MAX_MB * 2 ** 20,
+        backend=INFERENCE_BACKEND,
+        cache=load_result_cache(),
+        metrics=load_metrics()
+    )
+
+def load_model(name: str = DEFAULT_MODEL) -> TrafficSignDetector:
+    """
+    Активная версия модели из реестра
+
+    Модель загружается и прогревается при первом обращении, поэтому
+    первый запрос пользователя не ждет инициализации графа модели;
+    смена активной версии в реестре не требует перезапуска приложения.
+    """
+    return load_registry().get(name)
 
 def main():
     # Заголовок приложения
@@ -77,7 +109,7 @@ def main():
         # Настройки детекции
         confidence_threshold = st.slider(
             "🎯 Порог уверенности", 
-            min_value=0.1, 
+            min_value=CANDIDATE_CONFIDENCE, 
             max_value=1.0, 
             value=0.5, 
             step=0.05
@@ -91,9 +123,32 @@ def main():
             step=0.05
         )
         
+        # Выбор модели для A/B сравнения чекпойнтов из манифеста
+        try:
+            registry = load_registry()
+        except FileNotFoundError as error:
+            st.error(f"❌ {error}")
+            st.stop()
+        model_names = registry.names()
+        model_name = DEFAULT_MODEL if DEFAULT_MODEL in model_names else model_names[0]
+        if len(model_names) > 1:
+            model_name = st.selectbox("🧠 Модель", model_names, index=model_names.index(model_name))
+        for row in registry.stats():
+            if row['name'] == model_name and row['active'] and row['resident']:
+                st.caption(
+                    f"🧠 {model_name}:{row['version']} - загрузка {row['load_seconds']:.1f} с, "
+                    f"веса {row['weights_bytes'] / 2 ** 20:.0f} МБ"
+                )
+        
         show_confidence = st.checkbox("📊 Показывать уверенность", value=True)
         show_class_names = st.checkbox("🏷️ Показывать названия классов", value=True)
         
+        cache_stats = load_result_cache().stats()
+        st.caption(
+            f"🗄️ Кэш результатов: {cache_stats['hits']} попаданий, "
+            f"{cache_stats['misses']} промахов"
+        )
+        
         st.markdown("---")
         st.markdown("### 📋 Поддерживаемые знаки:")
         
@@ -117,7 +172,7 @@ def main():
             ["📁 Загрузить файл", "📷 Использовать камеру", "🖼️ Пример изображения"]
         )
         
-        uploaded_image = None
+        uploaded_bytes = None
         
         if upload_option == "📁 Загрузить файл":
             uploaded_file = st.file_uploader(
@@ -126,12 +181,12 @@ def main():
                 help="Поддерживаются форматы: PNG, JPG, JPEG"
             )
             if uploaded_file:
-                uploaded_image = Image.open(uploaded_file)
+                uploaded_bytes = uploaded_file.getvalue()
                 
         elif upload_option == "📷 Использовать камеру":
             camera_image = st.camera_input("Сделайте фото")
             if camera_image:
-                uploaded_image = Image.open(camera_image)
+                uploaded_bytes = camera_image.getvalue()
                 
         elif upload_option == "🖼️ Пример изображения":
             demo_image = st.selectbox(
@@ -140,82 +195,48 @@ def main():
             )
             # Здесь можно добавить загрузку примеров из папки assets
             st.info("💡 Добавьте примеры изображений в папку assets/demo_images/")
+        
+        # Декодируем байты сразу в RGB массив без промежуточных копий
+        image_array = None
+        if uploaded_bytes:
+            try:
+                image_array = decode_image(uploaded_bytes)
+            except ValueError as error:
+                st.error(f"❌ {error}")
     
     with col2:
         st.header("🎯 Результаты детекции")
         
-        if uploaded_image:
+        if image_array is not None:
+            image_key = (hashlib.sha1(uploaded_bytes).hexdigest(), DEFAULT_IMAGE_SIZE,
+                         model_name, registry.active_version(model_name))
+            
             # Показываем оригинальное изображение
             st.subheader("📷 Исходное изображение")
-            st.image(uploaded_image, use_container_width=True)
+            st.image(image_array, use_container_width=True)
             
             # Кнопка для запуска детекции
             if st.button("🚀 Начать детекцию", type="primary"):
                 with st.spinner("🔍 Анализируем изображение..."):
-                    
+
                     # Загружаем модель
-                    detector = load_model()
-                    
-                    # Конвертируем изображение
-                    image_array = np.array(uploaded_image)
-                    
-                    # Запускаем детекцию
-                    results = detector.detect(
-                        image_array,
-                        conf_threshold=confidence_threshold,
-                        iou_threshold=iou_threshold
-                    )
-                    
-                    # Создаем изображение с результатами
-                    result_image = create_result_image(
-                        image_array, 
-                        results,
-                        show_confidence=show_confidence,
-                        show_class_names=show_class_names
+                    detector = load_model(model_name)
+
+                    # Модель запускается один раз, пороги применяются к кандидатам
+                    st.session_state['candidates'] = (
+                        image_key,
+                        detector.detect_candidates(image_array, img_size=DEFAULT_IMAGE_SIZE)
                     )
-                    
-                    # Показываем результат
-                    st.markdown('<div class="detection-result">', unsafe_allow_html=True)
-                    st.subheader("✨ Результат детекции")
-                    st.image(result_image, use_container_width=True)
-                    st.markdown('</div>', unsafe_allow_html=True)
-                    
-                    # Статистика обнаруженных объектов
-                    if results['detections']:
-                        st.markdown('<div class="stats-container">', unsafe_allow_html=True)
-                        st.subheader("📊 Статистика обнаружений")
-                        
-                        # Создаем таблицу результатов
-                        detection_data = []
-                        for detection in results['detections']:
-                            detection_data.append({
-                                "Знак": detection['class_name'],
-                                "Уверенность": f"{detection['confidence']:.2%}",
-                                "Координаты": f"({detection['bbox'][0]}, {detection['bbox'][1]})"
-                            })
-                        
-                        st.dataframe(detection_data, use_container_width=True)
-                        
-                        # График распределения классов
-                        chart = create_statistics_chart(results['detections'])
-                        st.plotly_chart(chart, use_container_width=True)
-                        
-                        st.markdown('</div>', unsafe_allow_html=True)
-                        
-                        # Предупреждения для водителя
-                        st.subheader("⚠️ Рекомендации водителю")
-                        recommendations = generate_driver_recommendations(results['detections'])
-                        for rec in recommendations:
-                            if rec['type'] == 'warning':
-                                st.warning(rec['message'])
-                            elif rec['type'] == 'info':
-                                st.info(rec['message'])
-                            elif rec['type'] == 'success':
-                                st.success(rec['message'])
-                    
-                    else:
-                        st.warning("🔍 На изображении не обнаружено дорожных знаков")
-        
+
+            # При изменении ползунков пороги переприменяются без инференса
+            cached = st.session_state.get('candidates')
+            if cached is not None and cached[0] == image_key:
+                results = cached[1].filter(
+                    conf_threshold=confidence_threshold,
+                    iou_threshold=iou_threshold
+                )
+                show_results(image_array, results, show_confidence, show_class_names)
+
         else:
             st.info("👆 Загрузите изображение для начала анализа")
     
@@ -227,51 +248,69 @@ def main():
         st.metric("🎯 Точность модели", "95.9%", "mAP50")
     
     with col2:
-        st.metric("⚡ Скорость обработки", "~3ms", "на изображение")
+        # Медиана измеренной задержки вызовов модели в этом процессе
+        metrics = load_metrics()
+        latency = metrics.latency_ms('total', 0.5)
+        if latency is None:
+            st.metric("⚡ Скорость обработки", "—", "нет замеров", delta_color="off")
+        else:
+            st.metric("⚡ Скорость обработки", f"{latency:.0f} мс",
+                      f"медиана, {metrics.images} изобр.", delta_color="off")
     
     with col3:
         st.metric("🔢 Классов знаков", "15", "типов")
 
-def generate_driver_recommendations(detections):
-    """Генерируем рекомендации для водителя на основе обнаруженных знаков"""
-    recommendations = []
-    
-    for detection in detections:
-        class_name = detection['class_name']
-        confidence = detection['confidence']
-        
-        if "Speed Limit" in class_name and confidence > 0.8:
-            speed = class_name.split()[-1]
-            recommendations.append({
-                'type': 'warning',
-                'message': f"🚗 Ограничение скорости: {speed} км/ч"
-            })
-        
-        elif "Stop" in class_name and confidence > 0.8:
-            recommendations.append({
-                'type': 'warning', 
-                'message': "🛑 Обязательная остановка!"
-            })
-        
-        elif "Red Light" in class_name and confidence > 0.8:
-            recommendations.append({
-                'type': 'warning',
-                'message': "🔴 Красный свет - остановитесь!"
-            })
-        
-        elif "Green Light" in class_name and confidence > 0.8:
-            recommendations.append({
-                'type': 'success',
-                'message': "🟢 Зеленый свет - можно продолжать движение"
+def show_results(image_array, results, show_confidence, show_class_names):
+    """Показываем изображение с результатами, статистику и рекомендации"""
+    # Создаем изображение с результатами
+    result_image = create_result_image(
+        image_array,
+        results,
+        show_confidence=show_confidence,
+        show_class_names=show_class_names
+    )
+
+    # Показываем результат
+    st.markdown('<div class="detection-result">', unsafe_allow_html=True)
+    st.subheader("✨ Результат детекции")
+    st.image(result_image, use_container_width=True)
+    st.markdown('</div>', unsafe_allow_html=True)
+
+    # Статистика обнаруженных объектов
+    if results['detections']:
+        st.markdown('<div class="stats-container">', unsafe_allow_html=True)
+        st.subheader("📊 Статистика обнаружений")
+
+        # Создаем таблицу результатов
+        detection_data = []
+        for detection in results['detections']:
+            detection_data.append({
+                "Знак": detection['class_name'],
+                "Уверенность": f"{detection['confidence']:.2%}",
+                "Координаты": f"({detection['bbox'][0]}, {detection['bbox'][1]})"
             })
-    
-    if not recommendations:
-        recommendations.append({
-            'type': 'info',
-            'message': "ℹ️ Дорожные знаки обнаружены, но рекомендации не требуются"
-        })
-    
-    return recommendations
+
+        st.dataframe(detection_data, use_container_width=True)
+
+        # График распределения классов по агрегированной статистике
+        chart = create_statistics_chart(DetectionStats.from_detections(results['detections']))
+        st.plotly_chart(chart, use_container_width=True)
+
+        st.markdown('</div>', unsafe_allow_html=True)
+
+        # Предупреждения для водителя
+        st.subheader("⚠️ Рекомендации водителю")
+        recommendations = driver_recommendations(results['detections'])
+        for rec in recommendations:
+            if rec['type'] == 'warning':
+                st.warning(rec['message'])
+            elif rec['type'] == 'info':
+                st.info(rec['message'])
+            elif rec['type'] == 'success':
+                st.success(rec['message'])
+
+    else:
+        st.warning("🔍 На изображении не обнаружено дорожных знаков")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
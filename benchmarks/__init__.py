@@ -0,0 +1,6 @@
+"""
+Бенчмарки проекта Traffic Signs Detection
+
+Запуск из корня репозитория:
+    python -m benchmarks.<имя_модуля> --help
+"""
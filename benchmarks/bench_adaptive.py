@@ -0,0 +1,104 @@
+"""
+Адаптивный размер входа под бюджет задержки против фиксированного img_size
+
+Поток кадров проходит три фазы: обычная нагрузка, всплеск (параллельно
+работают --spike-procs процессов, занимающих CPU) и снова обычная
+нагрузка. Детектор с фиксированным размером входа сравнивается с
+AdaptiveDetector: p50/p99 задержки по фазам, доля кадров сверх цели и
+размеры входа, которые выбрал планировщик.
+
+Пример:
+    python -m benchmarks.bench_adaptive --stub --target-ms 150 --frames 60 --spike-procs 4
+"""
+
+import argparse
+import multiprocessing as mp
+import time
+from collections import Counter
+
+import numpy as np
+
+from benchmarks.common import add_common_args, load_detector, make_images, print_table
+from config import ADAPTIVE_IMAGE_SIZES
+
+PHASES = ("обычная", "всплеск", "после всплеска")
+
+def burn_cpu(stop):
+    """Фоновая нагрузка на одно ядро до установки события"""
+    while not stop.is_set():
+        sum(i * i for i in range(10000))
+
+def run_stream(detect, images, frames, spike_procs):
+    """Задержки и размеры входа по фазам потока"""
+    context = mp.get_context('spawn')
+    records = {phase: ([], []) for phase in PHASES}
+    for phase in PHASES:
+        stop, workers = context.Event(), []
+        if phase == "всплеск":
+            workers = [context.Process(target=burn_cpu, args=(stop,), daemon=True) for _ in range(spike_procs)]
+            for worker in workers:
+                worker.start()
+            time.sleep(0.5)
+        try:
+            latencies, sizes = records[phase]
+            for index in range(frames):
+                start = time.perf_counter()
+                result = detect(images[index % len(images)])
+                latencies.append((time.perf_counter() - start) * 1000)
+                sizes.append(result['model_info']['img_size'])
+        finally:
+            stop.set()
+            for worker in workers:
+                worker.join()
+    return records
+
+def main():
+    parser = add_common_args(argparse.ArgumentParser(description=__doc__))
+    parser.add_argument("--target-ms", type=float, required=True, help="Целевая задержка кадра, мс")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(ADAPTIVE_IMAGE_SIZES),
+                        help="Лестница размеров входа")
+    parser.add_argument("--frames", type=int, default=60, help="Кадров в каждой фазе")
+    parser.add_argument("--spike-procs", type=int, default=4,
+                        help="Процессов фоновой нагрузки во время всплеска")
+    parser.add_argument("--shape", default="720x1280", help="Размер кадра ВЫСОТАxШИРИНА")
+    args = parser.parse_args()
+
+    height, width = (int(value) for value in args.shape.lower().split('x'))
+    images = make_images(8, shapes=[(height, width)], seed=args.seed)
+    params = dict(conf_threshold=args.conf, iou_threshold=args.iou)
+
+    detector = load_detector(args)
+    adaptive = detector.create_adaptive(args.target_ms, sizes=args.sizes, initial_size=args.img_size)
+    adaptive.warmup()
+
+    runs = {
+        f"фиксированный {args.img_size}": run_stream(
+            lambda image: detector.detect(image, img_size=args.img_size, **params),
+            images, args.frames, args.spike_procs
+        ),
+        "адаптивный": run_stream(
+            lambda image: adaptive.detect(image, **params),
+            images, args.frames, args.spike_procs
+        ),
+    }
+
+    rows = []
+    for name, records in runs.items():
+        for phase in PHASES:
+            latencies, sizes = records[phase]
+            latencies = np.asarray(latencies)
+            counts = Counter(sizes)
+            rows.append([
+                name, phase,
+                f"{np.percentile(latencies, 50):.1f}",
+                f"{np.percentile(latencies, 99):.1f}",
+                f"{(latencies > args.target_ms).mean() * 100:.0f}%",
+                ", ".join(f"{size}: {counts[size]}" for size in sorted(counts)),
+            ])
+
+    print(f"Цель: {args.target_ms:.0f} мс, кадр {height}x{width}, {args.frames} кадров в фазе\n")
+    print_table(["Режим", "Фаза", "p50, мс", "p99, мс", "Сверх цели", "Размеры входа (кадров)"], rows)
+    print(f"\nСмен размера: {adaptive.scheduler.switches}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Асинхронный API: отзывчивость цикла событий и пропускная способность
+
+Несколько сотен корутин одновременно запрашивают детекцию, а отдельная
+задача каждые --tick-ms засыпает и измеряет опоздание пробуждения
+(задержку цикла событий). Сравниваются:
+    blocking  - detect() вызывается прямо в корутине и блокирует цикл
+    offload   - AsyncDetector.detect_async(): инференс в ограниченном пуле
+    coalesce  - то же с объединением одновременных вызовов в пакеты
+
+Пример:
+    python -m benchmarks.bench_async --stub --callers 300 --img-size 320
+"""
+
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from benchmarks.common import add_common_args, load_detector, make_images, print_table
+from utils.async_api import AsyncDetector
+
+async def measure_lag(interval: float, lags: list, stop: asyncio.Event):
+    """Опоздание пробуждения после sleep(interval) в мс"""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lags.append((loop.time() - start - interval) * 1000)
+
+async def run_mode(mode: str, detector, images, args) -> dict:
+    params = dict(conf_threshold=args.conf, iou_threshold=args.iou, img_size=args.img_size)
+    async_detector = None
+    if mode != 'blocking':
+        async_detector = AsyncDetector(detector, max_concurrency=args.max_concurrency,
+                                       coalesce=mode == 'coalesce', max_batch_size=args.max_batch_size)
+
+    async def caller(index: int, submitted: float) -> float:
+        # Все вызовы приходят одновременно, как при всплеске входящих
+        # запросов; время ответа считается от момента прихода
+        image = images[index % len(images)]
+        if async_detector is None:
+            detector.detect(image, **params)
+        else:
+            await async_detector.detect_async(image, **params)
+        return (time.perf_counter() - submitted) * 1000
+
+    lags, stop = [], asyncio.Event()
+    ticker = asyncio.create_task(measure_lag(args.tick_ms / 1000, lags, stop))
+    await asyncio.sleep(args.tick_ms / 1000 * 3)
+
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(caller(i, start) for i in range(args.callers)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await ticker
+    stats = {}
+    if async_detector is not None:
+        stats = async_detector.stats()
+        await async_detector.aclose()
+
+    return {
+        'throughput': args.callers / elapsed,
+        'latency_p50': np.percentile(latencies, 50),
+        'latency_p99': np.percentile(latencies, 99),
+        'lag_p50': np.percentile(lags, 50),
+        'lag_max': max(lags),
+        'ticks': len(lags),
+        'batch': stats.get('average_batch_size'),
+    }
+
+def main():
+    parser = add_common_args(argparse.ArgumentParser(description=__doc__))
+    parser.add_argument("--callers", type=int, default=300, help="Одновременных корутин")
+    parser.add_argument("--max-concurrency", type=int, default=32, help="Лимит вызовов в работе")
+    parser.add_argument("--max-batch-size", type=int, default=8, help="Размер пакета для coalesce")
+    parser.add_argument("--tick-ms", type=float, default=10.0, help="Период замера задержки цикла")
+    parser.add_argument("--modes", nargs="+", default=['blocking', 'offload', 'coalesce'],
+                        choices=['blocking', 'offload', 'coalesce'])
+    args = parser.parse_args()
+
+    detector = load_detector(args)
+    detector.warmup(img_sizes=[args.img_size], batch_sizes=sorted({1, args.max_batch_size}))
+    images = make_images(16, shapes=[(480, 640)], seed=args.seed)
+
+    rows = []
+    for mode in args.modes:
+        result = asyncio.run(run_mode(mode, detector, images, args))
+        rows.append([
+            mode,
+            f"{result['throughput']:.1f}",
+            f"{result['latency_p50']:.0f}",
+            f"{result['latency_p99']:.0f}",
+            f"{result['lag_p50']:.1f}",
+            f"{result['lag_max']:.1f}",
+            result['ticks'],
+            f"{result['batch']:.1f}" if result['batch'] else "—",
+        ])
+
+    print(f"Корутин: {args.callers}, img_size: {args.img_size}, замер цикла каждые {args.tick_ms:.0f} мс\n")
+    print_table(["Режим", "Изображений/с", "Ответ p50, мс", "Ответ p99, мс",
+                 "Задержка цикла p50, мс", "Задержка цикла max, мс", "Тиков", "Средний пакет"], rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Сравнение движков инференса: согласованность результатов и задержка
+
+Для каждого движка проверяется, что боксы и уверенности совпадают с
+эталоном PyTorch, и строится таблица задержки по размерам входа.
+
+Пример:
+    python -m benchmarks.bench_backends --backends pytorch onnx openvino --sizes 320 480 640
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.common import add_common_args, make_images, match_detections, model_path, print_table
+from utils.backends import BACKENDS, check_backend
+from utils.detection import TrafficSignDetector
+
+def main():
+    parser = add_common_args(argparse.ArgumentParser(description=__doc__))
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[320, 480, 640])
+    parser.add_argument("--images", type=int, default=16)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    
+    images = make_images(args.images, seed=args.seed)
+    params = dict(conf_threshold=args.conf, iou_threshold=args.iou)
+    
+    detectors = {}
+    for backend in args.backends:
+        try:
+            check_backend(backend)
+        except ImportError as error:
+            print(f"⚠️ Пропускаем {backend}: {error}")
+            continue
+        detectors[backend] = TrafficSignDetector(model_path(args), backend=backend)
+    
+    # Эталон для сравнения - PyTorch
+    reference_detector = detectors.get('pytorch') or TrafficSignDetector(model_path(args), backend='pytorch')
+    
+    parity_rows, latency_rows = [], []
+    for size in args.sizes:
+        reference = [
+            reference_detector.detect(image, img_size=size, **params)['detections']
+            for image in images
+        ]
+        
+        for backend, detector in detectors.items():
+            for image in images[:2]:
+                detector.detect(image, img_size=size, **params)  # прогрев
+            
+            timings, outputs = [], []
+            for _ in range(args.repeats):
+                outputs = []
+                for image in images:
+                    start = time.perf_counter()
+                    outputs.append(detector.detect(image, img_size=size, **params)['detections'])
+                    timings.append(time.perf_counter() - start)
+            
+            ms = np.array(timings) * 1000
+            latency_rows.append([
+                backend, size,
+                f"{np.percentile(ms, 50):.1f}",
+                f"{np.percentile(ms, 95):.1f}",
+                f"{1000 / ms.mean():.1f}"
+            ])
+            
+            # Согласованность с эталоном
+            matched, total_ref, total_out, ious, conf_diffs = 0, 0, 0, [], []
+            for out, ref in zip(outputs, reference):
+                out_index, ref_index, iou = match_detections(out, ref)
+                matched += len(out_index)
+                total_ref += len(ref)
+                total_out += len(out)
+                ious.extend(iou[out_index, ref_index].tolist())
+                conf_diffs.extend(np.abs(
+                    out.confidences[out_index] - ref.confidences[ref_index]
+                ).tolist())
+            
+            parity_rows.append([
+                backend, size,
+                f"{matched}/{total_ref}",
+                total_out - matched,
+                f"{np.mean(ious):.4f}" if ious else "-",
+                f"{np.max(conf_diffs):.4f}" if conf_diffs else "-"
+            ])
+    
+    print("\n### Согласованность с PyTorch\n")
+    print_table(["Движок", "img_size", "Совпало", "Лишних", "Средний IoU", "Макс. |Δconf|"], parity_rows)
+    print("\n### Задержка на изображение\n")
+    print_table(["Движок", "img_size", "p50, мс", "p95, мс", "Изображений/с"], latency_rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Сравнение пропускной способности detect() в цикле и detect_batch()
+
+Пример:
+    python -m benchmarks.bench_batch --images 64 --batch-sizes 1 4 8 16
+"""
+
+import argparse
+
+from benchmarks.common import add_common_args, load_detector, make_images, measure, print_table
+
+def main():
+    parser = add_common_args(argparse.ArgumentParser(description=__doc__))
+    parser.add_argument("--images", type=int, default=64,
+                        help="Количество изображений в наборе")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 8, 16],
+                        help="Размеры пакетов для detect_batch()")
+    parser.add_argument("--repeats", type=int, default=3,
+                        help="Количество замеров")
+    args = parser.parse_args()
+    
+    detector = load_detector(args)
+    images = make_images(args.images, seed=args.seed)
+    params = dict(conf_threshold=args.conf, iou_threshold=args.iou, img_size=args.img_size)
+    
+    rows = []
+    
+    # Базовая линия: по одному изображению за вызов
+    loop_time = measure(
+        lambda: [detector.detect(image, **params) for image in images],
+        repeats=args.repeats
+    )['best']
+    rows.append(["detect() в цикле", "-", f"{len(images) / loop_time:.1f}", "1.00x"])
+    
+    for batch_size in args.batch_sizes:
+        batch_time = measure(
+            lambda: detector.detect_batch(images, batch_size=batch_size, **params),
+            repeats=args.repeats
+        )['best']
+        rows.append([
+            "detect_batch()",
+            batch_size,
+            f"{len(images) / batch_time:.1f}",
+            f"{loop_time / batch_time:.2f}x"
+        ])
+    
+    print_table(["Режим", "batch_size", "Изображений/с", "Ускорение"], rows)
+
+if __name__ == "__main__":
+    main()
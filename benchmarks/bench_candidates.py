@@ -0,0 +1,88 @@
+"""
+Переприменение порогов к кандидатам против повторного detect()
+
+Для каждого кадра модель один раз запускается в detect_candidates(),
+затем для сетки порогов уверенности и IoU результат CandidateSet.filter()
+сравнивается с detect() при тех же порогах: число детекций, классы и
+боксы должны совпадать. Выводится число расхождений и время обоих
+способов. При расхождениях скрипт завершается с кодом 1.
+
+Пример:
+    python -m benchmarks.bench_candidates --stub --frames 10
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.common import add_common_args, load_detector, make_images, print_table
+
+def same_detections(a, b, atol: float = 1e-3) -> bool:
+    """Совпадение наборов детекций с точностью до порядка одинаковых уверенностей"""
+    if len(a) != len(b):
+        return False
+    order_a = np.lexsort((a.class_ids, -a.confidences))
+    order_b = np.lexsort((b.class_ids, -b.confidences))
+    return (
+        np.array_equal(a.class_ids[order_a], b.class_ids[order_b])
+        and np.allclose(a.confidences[order_a], b.confidences[order_b], atol=atol)
+        and np.allclose(a.bboxes[order_a], b.bboxes[order_b], atol=atol)
+    )
+
+def main():
+    parser = add_common_args(argparse.ArgumentParser(description=__doc__))
+    parser.add_argument("--frames", type=int, default=10, help="Число кадров")
+    parser.add_argument("--confs", type=float, nargs="+", default=[0.25, 0.5, 0.75],
+                        help="Пороги уверенности")
+    parser.add_argument("--ious", type=float, nargs="+", default=[0.3, 0.45, 0.7],
+                        help="Пороги IoU")
+    args = parser.parse_args()
+
+    detector = load_detector(args)
+    detector.warmup(img_sizes=[args.img_size])
+    images = make_images(args.frames, shapes=[(480, 640), (720, 1280)], seed=args.seed)
+
+    rows, total_mismatches = [], 0
+    candidates = []
+    start = time.perf_counter()
+    for image in images:
+        candidates.append(detector.detect_candidates(image, img_size=args.img_size))
+    candidates_ms = (time.perf_counter() - start) * 1000 / len(images)
+
+    for conf in args.confs:
+        for iou in args.ious:
+            mismatches, boxes = 0, 0
+            detect_ms = filter_ms = 0.0
+            for image, candidate_set in zip(images, candidates):
+                start = time.perf_counter()
+                reference = detector.detect(image, conf_threshold=conf, iou_threshold=iou,
+                                            img_size=args.img_size)['detections']
+                detect_ms += (time.perf_counter() - start) * 1000
+
+                start = time.perf_counter()
+                filtered = candidate_set.filter(conf_threshold=conf, iou_threshold=iou)['detections']
+                filter_ms += (time.perf_counter() - start) * 1000
+
+                boxes += len(reference)
+                mismatches += not same_detections(filtered, reference)
+            total_mismatches += mismatches
+            rows.append([
+                conf, iou, boxes, mismatches,
+                f"{detect_ms / len(images):.1f}",
+                f"{filter_ms / len(images):.2f}",
+            ])
+
+    print(f"Кадров: {len(images)}, img_size: {args.img_size}, "
+          f"detect_candidates: {candidates_ms:.1f} мс/кадр\n")
+    print_table(["conf", "iou", "Боксов detect()", "Кадров с расхождением",
+                 "detect(), мс/кадр", "filter(), мс/кадр"], rows)
+
+    if total_mismatches:
+        print(f"\n❌ Расхождений с detect(): {total_mismatches}")
+        sys.exit(1)
+    print("\n✅ filter() совпадает с detect() на всех порогах")
+
+if __name__ == "__main__":
+    main()
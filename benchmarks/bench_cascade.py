@@ -0,0 +1,75 @@
+"""
+Каскад против полного прохода: стоимость кадра и точность классов
+
+На разбивке датасета сравниваются один проход с img_size, грубый
+проход с малым входом и каскад (грубый проход + уточнение увеличенных
+областей). Кроме recall/precision выводится точность класса среди
+найденных знаков - главное, что уточняет вторая стадия для похожих
+ограничений скорости, - и доля кадров, завершенных после первой стадии.
+
+Пример:
+    TRAFFIC_SIGNS_DATASET=/data/car python -m benchmarks.bench_cascade --split val --images 200
+"""
+
+import argparse
+
+import numpy as np
+
+from benchmarks.common import (
+    add_common_args, evaluate_detection, load_detector, load_labeled_split, print_table
+)
+from config import (
+    DATASET_ROOT, CASCADE_COARSE_SIZE, CASCADE_REFINE_SIZE, CASCADE_PROPOSAL_CONFIDENCE
+)
+
+def main():
+    parser = add_common_args(argparse.ArgumentParser(description=__doc__))
+    parser.add_argument("--dataset-root", default=DATASET_ROOT,
+                        help="Корень датасета (по умолчанию из TRAFFIC_SIGNS_DATASET или конфига)")
+    parser.add_argument("--split", default="val", choices=["train", "val", "test"])
+    parser.add_argument("--images", type=int, default=100, help="Максимум изображений разбивки")
+    parser.add_argument("--coarse-size", type=int, default=CASCADE_COARSE_SIZE)
+    parser.add_argument("--refine-size", type=int, default=CASCADE_REFINE_SIZE)
+    parser.add_argument("--proposal-conf", type=float, default=CASCADE_PROPOSAL_CONFIDENCE)
+    args = parser.parse_args()
+
+    detector = load_detector(args)
+    samples = load_labeled_split(args.split, detector.class_names, args.dataset_root, limit=args.images)
+    params = dict(conf_threshold=args.conf, iou_threshold=args.iou)
+
+    # Прогрев всех размеров входа
+    for size in {args.img_size, args.coarse_size, args.refine_size}:
+        detector.detect(samples[0][0], img_size=size, **params)
+
+    modes = {
+        f"один проход, img_size={args.img_size}":
+            lambda image: detector.detect(image, img_size=args.img_size, **params),
+        f"грубый проход, img_size={args.coarse_size}":
+            lambda image: detector.detect(image, img_size=args.coarse_size, **params),
+        f"каскад {args.coarse_size} -> {args.refine_size}":
+            lambda image: detector.detect_cascade(
+                image, coarse_size=args.coarse_size, refine_size=args.refine_size,
+                proposal_conf=args.proposal_conf, **params
+            ),
+    }
+
+    rows = []
+    for name, detect in modes.items():
+        report = evaluate_detection(detect, samples)
+        stages = [info['stages'] for info in report['model_info'] if 'stages' in info]
+        rows.append([
+            name,
+            f"{report['recall']:.1%}",
+            f"{report['precision']:.1%}",
+            f"{report['class_accuracy']:.1%}",
+            f"{report['mean_ms']:.1f}",
+            f"{np.mean(np.array(stages) == 1):.0%}" if stages else "—"
+        ])
+
+    print_table(
+        ["Режим", "Recall", "Precision", "Точность класса", "Среднее, мс/кадр", "Кадров после 1 стадии"],
+        rows
+    )
+
+if __name__ == "__main__":
+    main()
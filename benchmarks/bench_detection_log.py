@@ -0,0 +1,137 @@
+"""
+Журнал детекций: бинарные сегменты с memmap против JSON Lines
+
+Синтетический поток кадров (число детекций на кадр - пуассоновское)
+пишется в JSONL (по строке на кадр со списком словарей detect()) и в
+DetectionLogWriter. Сравниваются размер на диске, скорость записи и
+запросы: все детекции класса за последние 10% времени и число детекций
+по классам за весь журнал.
+
+Пример:
+    python -m benchmarks.bench_detection_log --frames 200000 --segment-records 1000000
+"""
+
+import argparse
+import json
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.common import print_table
+from config import CLASS_NAMES
+from utils.detection_log import DetectionLogReader, DetectionLogWriter
+from utils.results import Detections
+
+def make_frames(count: int, mean_detections: float, seed: int = 0):
+    """Кадры с метками времени (30 кадров/с) и случайными детекциями"""
+    rng = np.random.default_rng(seed)
+    class_names = dict(enumerate(CLASS_NAMES))
+    frames = []
+    for frame in range(count):
+        n = rng.poisson(mean_detections)
+        xy = rng.uniform(0, 1800, (n, 2))
+        wh = rng.uniform(10, 120, (n, 2))
+        frames.append((frame, 1.7e9 + frame / 30, Detections(
+            np.hstack([xy, xy + wh]),
+            rng.uniform(0.25, 1.0, n),
+            rng.integers(0, len(CLASS_NAMES), n),
+            class_names
+        )))
+    return frames
+
+def directory_size(path: Path) -> int:
+    return sum(p.stat().st_size for p in path.rglob('*') if p.is_file())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--frames", type=int, default=200000, help="Кадров в потоке")
+    parser.add_argument("--detections", type=float, default=3.0, help="Среднее число детекций на кадр")
+    parser.add_argument("--segment-records", type=int, default=1000000, help="Записей в сегменте журнала")
+    parser.add_argument("--class-id", type=int, default=CLASS_NAMES.index('Stop'),
+                        help="Класс для запроса по времени")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    frames = make_frames(args.frames, args.detections, args.seed)
+    total = sum(len(detections) for _, _, detections in frames)
+    start_time = frames[-1][1] - (frames[-1][1] - frames[0][1]) * 0.1
+    workdir = Path(tempfile.mkdtemp(prefix="detection_log_"))
+
+    try:
+        # Запись
+        jsonl_path = workdir / "detections.jsonl"
+        start = time.perf_counter()
+        with open(jsonl_path, 'w', encoding='utf-8') as f:
+            for frame, timestamp, detections in frames:
+                f.write(json.dumps({'frame': frame, 'time': timestamp,
+                                    'detections': detections.to_list()}, ensure_ascii=False) + "\n")
+        jsonl_write = time.perf_counter() - start
+
+        log_path = workdir / "log"
+        start = time.perf_counter()
+        with DetectionLogWriter(log_path, segment_records=args.segment_records) as writer:
+            for frame, timestamp, detections in frames:
+                writer.append(detections, frame, timestamp)
+        log_write = time.perf_counter() - start
+
+        # Запрос: детекции класса за последние 10% времени
+        start = time.perf_counter()
+        jsonl_hits = 0
+        with open(jsonl_path, encoding='utf-8') as f:
+            for line in f:
+                record = json.loads(line)
+                if record['time'] >= start_time:
+                    jsonl_hits += sum(d['class_id'] == args.class_id for d in record['detections'])
+        jsonl_query = time.perf_counter() - start
+
+        reader = DetectionLogReader(log_path)
+        start = time.perf_counter()
+        log_hits = len(reader.query(class_ids=[args.class_id], start=start_time))
+        log_query = time.perf_counter() - start
+
+        # Агрегат: число детекций по классам за весь журнал
+        start = time.perf_counter()
+        jsonl_counts = np.zeros(len(CLASS_NAMES), dtype=np.int64)
+        with open(jsonl_path, encoding='utf-8') as f:
+            for line in f:
+                for d in json.loads(line)['detections']:
+                    jsonl_counts[d['class_id']] += 1
+        jsonl_count = time.perf_counter() - start
+
+        start = time.perf_counter()
+        log_counts = reader.class_counts()
+        log_count = time.perf_counter() - start
+
+        if jsonl_hits != log_hits or dict(enumerate(jsonl_counts.tolist())) != {
+            class_id: log_counts.get(class_id, 0) for class_id in range(len(CLASS_NAMES))
+        }:
+            raise RuntimeError("Результаты запросов JSONL и журнала не совпадают")
+
+        rows = []
+        for name, path, write, query, count in (
+            ("JSONL", jsonl_path, jsonl_write, jsonl_query, jsonl_count),
+            ("Журнал (memmap)", log_path, log_write, log_query, log_count),
+        ):
+            size = path.stat().st_size if path.is_file() else directory_size(path)
+            rows.append([
+                name,
+                f"{size / 2 ** 20:.1f}",
+                f"{size / total:.1f}",
+                f"{total / write / 1e6:.2f}",
+                f"{query * 1000:.1f}",
+                f"{count * 1000:.1f}",
+            ])
+
+        print(f"Кадров: {args.frames}, детекций: {total}, найдено по запросу: {log_hits}\n")
+        print_table(["Формат", "Размер, МБ", "Байт/детекцию", "Запись, млн дет./с",
+                     "Класс за 10% времени, мс", "Счетчики по классам, мс"], rows)
+        print(f"\nУскорение запроса: {jsonl_query / log_query:.0f}x, "
+              f"размер меньше в {jsonl_path.stat().st_size / directory_size(log_path):.1f} раза")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Загрузка изображений: пиковая память и выделения до и после слоя ingest
+
+Сравниваются прежние пути (PIL -> np.array в app.py, cv2.imread ->
+cvtColor в detect_from_file и отрисовка с двумя конвертациями BGR/RGB)
+и utils.ingest (imdecode из байтов или np.memmap, перестановка каналов
+на месте, отрисовка в одну копию). Модель не запускается: замеряется
+только путь от закодированных байтов до входа модели и кадра с
+результатами. Память считается tracemalloc (буферы NumPy и OpenCV).
+
+Пример:
+    python -m benchmarks.bench_ingest --width 4000 --height 3000
+"""
+
+import argparse
+import io
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from benchmarks.common import make_photo, print_table
+from config import CLASS_NAMES
+from utils.detection import model_input
+from utils.ingest import decode_image, read_image
+from utils.results import Detections
+from utils.visualization import create_result_image
+
+def legacy_create_result_image(image, results):
+    """Прежняя отрисовка: копия и две полные конвертации каналов"""
+    result_image = cv2.cvtColor(image.copy(), cv2.COLOR_RGB2BGR)
+    for detection in results['detections']:
+        x1, y1, x2, y2 = detection['bbox']
+        cv2.rectangle(result_image, (x1, y1), (x2, y2), (0, 255, 0), 2)
+    return cv2.cvtColor(result_image, cv2.COLOR_BGR2RGB)
+
+def profile(fn, repeats: int):
+    """Пиковая память (МБ) и время (мс) на вызов"""
+    fn()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    ms = (time.perf_counter() - start) / repeats * 1000
+    return peak / 2 ** 20, ms
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--width", type=int, default=4000)
+    parser.add_argument("--height", type=int, default=3000)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    data = make_photo(args.width, args.height, args.seed)
+    names = dict(enumerate(CLASS_NAMES))
+    results = {'detections': Detections([[100, 100, 300, 300]], [0.9], [0], names)}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "photo.jpg"
+        path.write_bytes(data)
+
+        def upload_before():
+            image = np.array(Image.open(io.BytesIO(data)))
+            legacy_create_result_image(image, results)
+
+        def upload_after():
+            image = decode_image(data)
+            model_input(image)
+            create_result_image(image, results)
+
+        def file_before():
+            image = cv2.cvtColor(cv2.imread(str(path)), cv2.COLOR_BGR2RGB)
+            legacy_create_result_image(image, results)
+
+        def file_after():
+            image = read_image(path)
+            create_result_image(image, results)
+
+        def file_reduced():
+            image = read_image(path, reduce=2)
+            create_result_image(image, results)
+
+        modes = {
+            "загрузка в app.py: PIL -> np.array": upload_before,
+            "загрузка в app.py: decode_image": upload_after,
+            "файл: imread -> cvtColor": file_before,
+            "файл: read_image (mmap)": file_after,
+            "файл: read_image, reduce=2": file_reduced,
+        }
+
+        frame_mb = args.width * args.height * 3 / 2 ** 20
+        print(f"Изображение {args.width}x{args.height} ({len(data) / 2 ** 20:.1f} МБ JPEG, "
+              f"кадр RGB {frame_mb:.1f} МБ)")
+
+        rows = []
+        for name, fn in modes.items():
+            peak, ms = profile(fn, args.repeats)
+            rows.append([name, f"{peak:.1f}", f"{peak / frame_mb:.2f}", f"{ms:.1f}"])
+
+    # Пик в кадрах - сколько полноразмерных буферов живут одновременно
+    print_table(["Путь", "Пик памяти, МБ", "Пик в кадрах", "мс/изобр."], rows)
+
+if __name__ == "__main__":
+    main()
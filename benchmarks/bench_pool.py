@@ -0,0 +1,55 @@
+"""
+Масштабирование пула процессов: изображений в секунду от числа воркеров
+
+Пример:
+    python -m benchmarks.bench_pool --workers 1 2 4 8 --images 128
+"""
+
+import argparse
+import os
+
+from benchmarks.common import add_common_args, load_detector, make_images, measure, print_table
+from utils.pool import DetectorPool
+
+def main():
+    parser = add_common_args(argparse.ArgumentParser(description=__doc__))
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4],
+                        help="Проверяемые числа процессов")
+    parser.add_argument("--threads-per-worker", type=int,
+                        help="Потоков torch на воркер (по умолчанию ядра делятся поровну)")
+    parser.add_argument("--images", type=int, default=64)
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    
+    images = make_images(args.images, seed=args.seed)
+    params = dict(conf_threshold=args.conf, iou_threshold=args.iou, img_size=args.img_size)
+    
+    # Базовая линия: один детектор в текущем процессе
+    detector = load_detector(args)
+    baseline = args.images / measure(
+        lambda: detector.detect_batch(images, batch_size=args.batch_size, **params),
+        repeats=args.repeats
+    )['best']
+    del detector
+    
+    rows = [["один процесс", os.cpu_count(), f"{baseline:.1f}", "1.00x"]]
+    for workers in args.workers:
+        with DetectorPool(args.model, backend=args.backend, num_workers=workers,
+                          threads_per_worker=args.threads_per_worker,
+                          slots_per_worker=args.batch_size) as pool:
+            throughput = args.images / measure(
+                lambda: pool.detect_batch(images, batch_size=args.batch_size, **params),
+                repeats=args.repeats
+            )['best']
+            rows.append([
+                f"пул, {workers} воркеров",
+                pool.threads_per_worker,
+                f"{throughput:.1f}",
+                f"{throughput / baseline:.2f}x"
+            ])
+    
+    print_table(["Режим", "Потоков torch на процесс", "Изображений/с", "Ускорение"], rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Рекомендации водителю: разбор строк на каждой детекции против RecommendationEngine
+
+Прежний generate_driver_recommendations() из app.py проверял подстроки в
+названии класса каждой детекции и выдавал сообщение на каждый кадр, где
+виден знак. Здесь на синтетическом потоке 30 кадров/с (знаки держатся в
+кадре сериями, уверенность колеблется около порога) сравниваются
+время на кадр и число выданных сообщений; движок вызывается на каждом
+кадре и пакетами кадров (как после detect_batch()).
+
+Пример:
+    python -m benchmarks.bench_recommendations --frames 100000 --detections 4
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.common import print_table
+from config import CLASS_NAMES
+from utils.recommendations import RecommendationEngine
+from utils.results import Detections
+
+def legacy_recommendations(detections):
+    """Прежняя версия из app.py: строковые проверки на каждой детекции"""
+    recommendations = []
+    for detection in detections:
+        class_name = detection['class_name']
+        confidence = detection['confidence']
+        if "Speed Limit" in class_name and confidence > 0.8:
+            speed = class_name.split()[-1]
+            recommendations.append({'type': 'warning', 'message': f"🚗 Ограничение скорости: {speed} км/ч"})
+        elif "Stop" in class_name and confidence > 0.8:
+            recommendations.append({'type': 'warning', 'message': "🛑 Обязательная остановка!"})
+        elif "Red Light" in class_name and confidence > 0.8:
+            recommendations.append({'type': 'warning', 'message': "🔴 Красный свет - остановитесь!"})
+        elif "Green Light" in class_name and confidence > 0.8:
+            recommendations.append({'type': 'success', 'message': "🟢 Зеленый свет - можно продолжать движение"})
+    if not recommendations:
+        recommendations.append({'type': 'info', 'message': "ℹ️ Дорожные знаки обнаружены, но рекомендации не требуются"})
+    return recommendations
+
+def make_stream(frames: int, detections: int, seed: int = 0):
+    """
+    Поток кадров: знаки появляются сериями по 1-3 секунды, уверенность
+    колеблется около 0.8, часть кадров серии пропущена детектором
+    """
+    rng = np.random.default_rng(seed)
+    class_names = dict(enumerate(CLASS_NAMES))
+    visible = rng.integers(0, len(CLASS_NAMES), detections)
+    remaining = rng.integers(30, 90, detections)
+
+    stream = []
+    for _ in range(frames):
+        remaining -= 1
+        expired = remaining <= 0
+        visible[expired] = rng.integers(0, len(CLASS_NAMES), expired.sum())
+        remaining[expired] = rng.integers(30, 90, expired.sum())
+
+        present = rng.random(detections) > 0.1
+        count = int(present.sum())
+        stream.append(Detections(
+            rng.uniform(0, 600, (count, 4)),
+            np.clip(rng.normal(0.82, 0.06, count), 0, 1),
+            visible[present],
+            class_names
+        ))
+    return stream
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--frames", type=int, default=100000, help="Кадров в потоке")
+    parser.add_argument("--detections", type=int, default=4, help="Знаков в кадре одновременно")
+    parser.add_argument("--chunk", type=int, default=32, help="Кадров в одном update_many()")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    stream = make_stream(args.frames, args.detections, args.seed)
+
+    start = time.perf_counter()
+    legacy_messages = sum(
+        sum(rec['type'] != 'info' for rec in legacy_recommendations(detections))
+        for detections in stream
+    )
+    legacy_seconds = time.perf_counter() - start
+
+    engine = RecommendationEngine()
+    start = time.perf_counter()
+    engine_messages = sum(len(engine.update(detections)) for detections in stream)
+    engine_seconds = time.perf_counter() - start
+
+    batched = RecommendationEngine()
+    start = time.perf_counter()
+    batched_messages = sum(
+        len(batched.update_many(stream[offset:offset + args.chunk]))
+        for offset in range(0, len(stream), args.chunk)
+    )
+    batched_seconds = time.perf_counter() - start
+    if batched_messages != engine_messages or batched.state() != engine.state():
+        raise RuntimeError("update_many() и update() дали разные результаты")
+
+    rows = [
+        ["Строки на каждой детекции (app.py)", f"{legacy_seconds / args.frames * 1e6:.1f}",
+         f"{args.frames / legacy_seconds:.0f}", legacy_messages],
+        ["RecommendationEngine.update()", f"{engine_seconds / args.frames * 1e6:.1f}",
+         f"{args.frames / engine_seconds:.0f}", engine_messages],
+        [f"RecommendationEngine.update_many(), по {args.chunk} кадров",
+         f"{batched_seconds / args.frames * 1e6:.1f}", f"{args.frames / batched_seconds:.0f}",
+         batched_messages],
+    ]
+    print(f"Кадров: {args.frames} ({args.frames / 30 / 60:.1f} мин при 30 кадрах/с), "
+          f"знаков в кадре: {args.detections}\n")
+    print_table(["Вариант", "мкс/кадр", "Кадров/с", "Сообщений"], rows)
+    print(f"\nИтоговое состояние: {engine.state()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Реестр моделей: загрузка версий, горячая замена под нагрузкой и общие веса пула
+
+1. Несколько версий одной модели загружаются в ModelRegistry с бюджетом
+   памяти на --resident версий: время загрузки с прогревом, память под
+   веса, прирост памяти процесса и число выгрузок по LRU.
+2. Клиентские потоки непрерывно вызывают detect() через acquire(), пока
+   активная версия переключается по кругу. Сравниваются задержки до и
+   во время переключений; ни один запрос не должен завершиться ошибкой.
+3. Пул процессов с собственной копией весов в каждом воркере и с общими
+   весами из реестра (только pytorch): PSS и USS воркеров по /proc (Linux).
+
+Пример:
+    python -m benchmarks.bench_registry --stub --versions 3 --resident 2 --workers 2
+"""
+
+import argparse
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from benchmarks.common import add_common_args, make_images, model_path, print_table
+from utils.pool import DetectorPool
+from utils.registry import DEFAULT_MODEL, ModelRegistry
+
+def memory_bytes(pid: int) -> Optional[Tuple[int, int]]:
+    """
+    PSS и USS процесса: пропорциональная доля памяти (общие страницы
+    делятся между процессами) и только собственные страницы
+    """
+    fields = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                name, _, value = line.partition(':')
+                if value.strip().endswith('kB'):
+                    fields[name] = int(value.split()[0]) * 1024
+    except OSError:
+        return None
+    return fields['Pss'], fields['Private_Clean'] + fields['Private_Dirty']
+
+def percentile(latencies: List[float], q: float) -> str:
+    return f"{np.percentile(latencies, q):.1f}" if latencies else "—"
+
+def pool_memory(pool: DetectorPool) -> Optional[Tuple[float, float]]:
+    """Средние PSS и USS воркеров пула"""
+    values = [memory_bytes(handle.process.pid) for handle in pool._workers]
+    if None in values:
+        return None
+    return tuple(float(np.mean(column)) for column in zip(*values))
+
+def main():
+    parser = add_common_args(argparse.ArgumentParser(description=__doc__))
+    parser.add_argument("--versions", type=int, default=3, help="Версий модели в реестре")
+    parser.add_argument("--resident", type=int, default=2,
+                        help="Бюджет памяти реестра в числе версий")
+    parser.add_argument("--clients", type=int, default=4, help="Клиентских потоков")
+    parser.add_argument("--swaps", type=int, default=4, help="Переключений активной версии")
+    parser.add_argument("--workers", type=int, default=2, help="Воркеров пула (0 - пропустить)")
+    args = parser.parse_args()
+
+    weights = Path(model_path(args))
+    workdir = Path(tempfile.mkdtemp(prefix="model_registry_"))
+    image = make_images(1, shapes=[(720, 1280)], seed=args.seed)[0]
+    params = dict(conf_threshold=args.conf, iou_threshold=args.iou, img_size=args.img_size)
+
+    try:
+        # Версии - копии весов в разных файлах, чтобы каждая загружалась отдельно
+        registry = ModelRegistry(backend=args.backend)
+        versions = []
+        for index in range(args.versions):
+            path = workdir / f"v{index}{weights.suffix}"
+            shutil.copy(weights, path)
+            versions.append(registry.register(DEFAULT_MODEL, path, version=f"v{index}"))
+
+        # 1. Загрузка: бюджет выставляется по размеру весов первой версии,
+        # замеры снимаются сразу, пока версия не выгружена
+        rows = []
+        for version in versions:
+            registry.get(DEFAULT_MODEL, version)
+            if version == versions[0]:
+                registry.max_bytes = registry.resident_bytes * args.resident
+            row = next(r for r in registry.stats() if r['version'] == version)
+            rss = row['rss_delta_bytes']
+            rows.append([
+                version,
+                f"{row['load_seconds']:.2f}",
+                f"{row['weights_bytes'] / 2 ** 20:.1f}",
+                f"{rss / 2 ** 20:.1f}" if rss is not None else "—",
+            ])
+        print_table(["Версия", "Загрузка с прогревом, с", "Веса, МБ", "Прирост RSS, МБ"], rows)
+        resident = [r['version'] for r in registry.stats() if r['resident']]
+        print(f"\nБюджет: {registry.max_bytes / 2 ** 20:.1f} МБ, в памяти: {', '.join(resident)}, "
+              f"выгрузок: {registry.evictions}\n")
+
+        # 2. Горячая замена под нагрузкой
+        registry.activate(DEFAULT_MODEL, versions[0])
+        phase = ['before']
+        latencies = {'before': [], 'swap': []}
+        errors = []
+        stop = threading.Event()
+
+        def client():
+            while not stop.is_set():
+                start = time.perf_counter()
+                try:
+                    with registry.acquire() as detector:
+                        detector.detect(image, **params)
+                except Exception as error:
+                    errors.append(error)
+                    continue
+                latencies[phase[0]].append((time.perf_counter() - start) * 1000)
+
+        threads = [threading.Thread(target=client, daemon=True) for _ in range(args.clients)]
+        for thread in threads:
+            thread.start()
+        time.sleep(2.0)
+
+        phase[0] = 'swap'
+        swap_seconds = []
+        for swap in range(args.swaps):
+            start = time.perf_counter()
+            registry.activate(DEFAULT_MODEL, versions[(swap + 1) % len(versions)])
+            swap_seconds.append(time.perf_counter() - start)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        print_table(["Фаза", "Запросов", "p50, мс", "p99, мс"], [
+            ["До переключений", len(latencies['before']),
+             percentile(latencies['before'], 50), percentile(latencies['before'], 99)],
+            [f"{args.swaps} переключений", len(latencies['swap']),
+             percentile(latencies['swap'], 50), percentile(latencies['swap'], 99)],
+        ])
+        print(f"\nactivate(): медиана {np.median(swap_seconds):.2f} с (с загрузкой выгруженных версий), "
+              f"ошибок запросов: {len(errors)}, выгрузок: {registry.evictions}\n")
+
+        # 3. Память воркеров пула сразу после прогрева: пробный запрос
+        # попал бы только в один воркер и добавил бы ему память активаций
+        if args.workers:
+            rows = []
+            with DetectorPool(str(weights), backend=args.backend, num_workers=args.workers) as pool:
+                rows.append(["Своя копия весов", pool_memory(pool)])
+            with registry.pool(num_workers=args.workers) as pool:
+                rows.append(["Общие веса реестра", pool_memory(pool)])
+            print_table(["Пул", "PSS воркера, МБ", "USS воркера, МБ"], [
+                [name] + ([f"{value / 2 ** 20:.1f}" for value in memory] if memory else ["—", "—"])
+                for name, memory in rows
+            ])
+            active = next(row for row in registry.stats() if row['active'])
+            print(f"\nВеса модели: {active['weights_bytes'] / 2 ** 20:.1f} МБ "
+                  f"(слитая и неслитая копии)")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Отрисовка детекций: create_result_image() против AnnotationRenderer
+
+Кадры и детекции синтетические, модель не нужна. Кроме времени на кадр
+выводится доля бюджета кадра при 30 FPS и проверяется, что рендерер с
+точностью подписи 0.01% совпадает с create_result_image() попиксельно.
+
+Пример:
+    python -m benchmarks.bench_render --frames 100 --detections 5 --width 1920 --height 1080
+"""
+
+import argparse
+
+import numpy as np
+
+from benchmarks.common import make_images, measure, print_table
+from config import CLASS_NAMES
+from utils.results import Detections
+from utils.visualization import AnnotationRenderer, create_result_image
+
+def make_results(count: int, detections: int, width: int, height: int, seed: int):
+    """Случайные детекции для каждого кадра"""
+    rng = np.random.default_rng(seed)
+    names = dict(enumerate(CLASS_NAMES))
+    results = []
+    for _ in range(count):
+        xy = rng.uniform(0, [width - 200, height - 200], (detections, 2))
+        wh = rng.uniform(20, 200, (detections, 2))
+        results.append({'detections': Detections(
+            np.hstack([xy, xy + wh]),
+            rng.uniform(0.5, 1.0, detections),
+            rng.integers(0, len(names), detections),
+            names
+        )})
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--detections", type=int, default=5, help="Детекций на кадр")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    images = make_images(args.frames, shapes=((args.height, args.width),), seed=args.seed)
+    results = make_results(args.frames, args.detections, args.width, args.height, args.seed)
+
+    exact = AnnotationRenderer(confidence_step=0.0001, confidence_format='.2%')
+    mismatched = sum(
+        int(np.any(create_result_image(image, result) != exact.render(image, result)))
+        for image, result in zip(images, results)
+    )
+    print(f"Кадров, отличающихся от create_result_image(): {mismatched} из {args.frames}")
+
+    renderer = AnnotationRenderer()
+    buffers = np.empty((args.frames, args.height, args.width, 3), dtype=np.uint8)
+    frames_in_place = [image.copy() for image in images]
+
+    modes = {
+        "create_result_image()": lambda: [
+            create_result_image(image, result) for image, result in zip(images, results)
+        ],
+        "render(), новая копия": lambda: [
+            renderer.render(image, result) for image, result in zip(images, results)
+        ],
+        "render(), буфер вызывающего": lambda: [
+            renderer.render(image, result, out=buffer)
+            for image, result, buffer in zip(images, results, buffers)
+        ],
+        "render(), на месте": lambda: [
+            renderer.render(frame, result, out=frame)
+            for frame, result in zip(frames_in_place, results)
+        ],
+        "render_batch(), буфер вызывающего": lambda: renderer.render_batch(images, results, out=buffers),
+    }
+
+    rows = []
+    baseline = None
+    for name, fn in modes.items():
+        ms = measure(fn, repeats=args.repeats)['best'] / args.frames * 1000
+        baseline = baseline or ms
+        rows.append([name, f"{ms:.3f}", f"{ms / (1000 / 30):.1%}", f"{baseline / ms:.2f}x"])
+
+    print_table(["Режим", "мс/кадр", "Доля бюджета 30 FPS", "Ускорение"], rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Задержка по стадиям: декодирование, предобработка, инференс, постобработка,
+разбор результата, отрисовка и график
+
+Изображения - синтетические JPEG заданных размеров. Для каждой
+комбинации размера кадра, размера пакета и числа потоков выводятся
+p50/p95/p99 каждой стадии на изображение и пропускная способность всего
+пути от байтов до кадра с результатами и графика статистики. Стадии
+модели берутся из model_info['speed'] результата detect_batch().
+
+Без весов запускается с моделью-заглушкой (--stub): время прямого прохода
+и предобработки такое же, как у обученной YOLO11n, а число детекций
+реалистично (15-25 на кадр).
+
+Пример:
+    python -m benchmarks.bench_stages --stub --shapes 480x640 1080x1920 --batch-sizes 1 8 --threads 1 4
+"""
+
+import argparse
+import json
+import time
+
+import cv2
+import numpy as np
+import torch
+
+from benchmarks.common import add_common_args, load_detector, make_photo, print_table
+from utils.ingest import decode_image
+from utils.visualization import create_result_image, create_statistics_chart
+
+STAGES = ['decode', 'preprocess', 'inference', 'postprocess', 'parse', 'render', 'chart']
+PERCENTILES = [50, 95, 99]
+
+def parse_shape(text: str):
+    """Размер кадра 'HxW' -> (высота, ширина)"""
+    height, width = text.lower().split('x')
+    return int(height), int(width)
+
+def run_config(detector, encoded, batch_size: int, params):
+    """
+    Прогоняет все изображения пакетами и собирает время стадий
+
+    Returns:
+        Словарь стадия -> массив мс на изображение и общее время в секундах
+    """
+    timings = {stage: [] for stage in STAGES}
+    start = time.perf_counter()
+    for offset in range(0, len(encoded), batch_size):
+        images = []
+        for data in encoded[offset:offset + batch_size]:
+            stage_start = time.perf_counter()
+            images.append(decode_image(data))
+            timings['decode'].append((time.perf_counter() - stage_start) * 1000)
+
+        results = detector.detect_batch(images, batch_size=batch_size, **params)
+
+        for image, result in zip(images, results):
+            speed = result['model_info']['speed']
+            for stage in ('preprocess', 'inference', 'postprocess', 'parse'):
+                timings[stage].append(speed.get(stage, 0.0))
+
+            stage_start = time.perf_counter()
+            create_result_image(image, result)
+            timings['render'].append((time.perf_counter() - stage_start) * 1000)
+
+            stage_start = time.perf_counter()
+            create_statistics_chart(result['detections'])
+            timings['chart'].append((time.perf_counter() - stage_start) * 1000)
+
+    elapsed = time.perf_counter() - start
+    return {stage: np.array(values) for stage, values in timings.items()}, elapsed
+
+def main():
+    parser = add_common_args(argparse.ArgumentParser(description=__doc__))
+    parser.add_argument("--shapes", nargs="+", default=["480x640", "1080x1920"],
+                        help="Размеры кадров ВЫСОТАxШИРИНА")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8],
+                        help="Размеры пакетов для detect_batch()")
+    parser.add_argument("--threads", type=int, nargs="+", default=[torch.get_num_threads()],
+                        help="Числа потоков torch и OpenCV")
+    parser.add_argument("--images", type=int, default=32,
+                        help="Изображений на каждую комбинацию")
+    parser.add_argument("--output", help="Путь для записи результатов в JSON")
+    args = parser.parse_args()
+
+    detector = load_detector(args)
+    params = dict(conf_threshold=args.conf, iou_threshold=args.iou, img_size=args.img_size)
+
+    stage_rows, summary_rows, records = [], [], []
+    for text in args.shapes:
+        height, width = parse_shape(text)
+        encoded = [make_photo(width, height, seed=args.seed + i) for i in range(args.images)]
+
+        for threads in args.threads:
+            torch.set_num_threads(threads)
+            cv2.setNumThreads(threads)
+
+            for batch_size in args.batch_sizes:
+                # Прогрев: первый проход строит граф и выделяет буферы
+                run_config(detector, encoded[:batch_size], batch_size, params)
+                timings, elapsed = run_config(detector, encoded, batch_size, params)
+
+                config_name = f"{width}x{height}, batch {batch_size}, потоков {threads}"
+                record = {
+                    'width': width,
+                    'height': height,
+                    'batch_size': batch_size,
+                    'threads': threads,
+                    'images_per_second': len(encoded) / elapsed,
+                    'stages': {}
+                }
+                for stage, ms in timings.items():
+                    p50, p95, p99 = np.percentile(ms, PERCENTILES)
+                    stage_rows.append([config_name, stage, f"{p50:.2f}", f"{p95:.2f}", f"{p99:.2f}"])
+                    record['stages'][stage] = {'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p99,
+                                               'mean_ms': float(ms.mean())}
+
+                total = sum(timings.values())
+                summary_rows.append([
+                    config_name,
+                    f"{np.percentile(total, 50):.1f}",
+                    f"{np.percentile(total, 99):.1f}",
+                    f"{record['images_per_second']:.1f}"
+                ])
+                records.append(record)
+
+    print_table(["Конфигурация", "Стадия", "p50, мс", "p95, мс", "p99, мс"], stage_rows)
+    print()
+    print_table(["Конфигурация", "Сумма стадий p50, мс", "Сумма стадий p99, мс", "Изображений/с"],
+                summary_rows)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'model': args.model, 'backend': args.backend,
+                       'img_size': args.img_size, 'results': records}, f, indent=2)
+        print(f"\nРезультаты сохранены: {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Холодный старт: время импорта, загрузки модели и первого инференса
+
+Каждый замер выполняется в новом процессе интерпретатора, поэтому
+учитываются импорт модулей, загрузка весов и инициализация графа и
+ядер при первом прямом проходе. Режимы:
+    cold - первый detect() сразу после загрузки модели
+    warm - перед первым detect() вызывается TrafficSignDetector.warmup()
+
+Импорт utils.detection и utils.visualization не должен тянуть OpenCV,
+ultralytics, torch и plotly: они загружаются при создании детектора,
+чтении файла, отрисовке и первом построении графика. Если тяжелые модули
+загружены импортом, скрипт завершается с кодом 1.
+
+Пример:
+    python -m benchmarks.bench_startup --stub --runs 5 --shape 720x1280
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.common import add_common_args, model_path, print_table
+from config import PROJECT_ROOT
+
+# Модули, которые не должен загружать импорт utils
+HEAVY_MODULES = ('cv2', 'ultralytics', 'torch', 'plotly')
+
+# Код дочернего процесса: печатает замеры в мс последней строкой JSON
+CHILD_SCRIPT = r"""
+import json, sys, time
+start = time.perf_counter()
+timings = {}
+heavy_modules = json.loads(sys.argv[2])
+
+def lap(name, since):
+    timings[name] = (time.perf_counter() - since) * 1000
+
+t = time.perf_counter(); import config; lap('import_config', t)
+t = time.perf_counter(); import utils.detection; lap('import_detection', t)
+timings['heavy_after_detection'] = sorted(m for m in heavy_modules if m in sys.modules)
+t = time.perf_counter(); import utils.visualization; lap('import_visualization', t)
+timings['heavy_modules_loaded'] = sorted(m for m in heavy_modules if m in sys.modules)
+
+import numpy as np
+model, backend, warmup, img_size, height, width, steady_runs = json.loads(sys.argv[1])
+t = time.perf_counter()
+detector = utils.detection.TrafficSignDetector(model, backend=backend)
+lap('load_model', t)
+if warmup:
+    t = time.perf_counter(); detector.warmup(img_sizes=[img_size]); lap('warmup', t)
+
+image = np.random.default_rng(0).integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+t = time.perf_counter(); detector.detect(image, img_size=img_size); lap('first_detect', t)
+lap('time_to_first_result', start)
+
+steady = []
+for _ in range(steady_runs):
+    t = time.perf_counter(); detector.detect(image, img_size=img_size)
+    steady.append((time.perf_counter() - t) * 1000)
+timings['steady_detect'] = float(np.median(steady))
+print(json.dumps(timings))
+"""
+
+STAGES = ['import_config', 'import_detection', 'import_visualization', 'load_model',
+          'warmup', 'first_detect', 'time_to_first_result', 'steady_detect']
+
+def run_child(args: argparse.Namespace, warmup: bool, height: int, width: int):
+    """Запускает один холодный старт в новом процессе и возвращает замеры"""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(PROJECT_ROOT),
+                                                                      os.environ.get('PYTHONPATH')])))
+    payload = json.dumps([args.model, args.backend, warmup, args.img_size, height, width, args.steady_runs])
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, "-c", CHILD_SCRIPT, payload, json.dumps(HEAVY_MODULES)],
+                               capture_output=True, text=True, env=env, check=True)
+    timings = json.loads(completed.stdout.strip().splitlines()[-1])
+    timings['process'] = (time.perf_counter() - start) * 1000
+    return timings
+
+def main():
+    parser = add_common_args(argparse.ArgumentParser(description=__doc__))
+    parser.add_argument("--runs", type=int, default=3,
+                        help="Новых процессов на каждый режим")
+    parser.add_argument("--shape", default="720x1280",
+                        help="Размер кадра первого запроса ВЫСОТАxШИРИНА")
+    parser.add_argument("--steady-runs", type=int, default=5,
+                        help="Повторных detect() для установившейся задержки")
+    parser.add_argument("--output", help="Путь для записи результатов в JSON")
+    args = parser.parse_args()
+
+    model_path(args)
+    height, width = (int(value) for value in args.shape.lower().split('x'))
+
+    rows, records = [], {}
+    for mode, warmup in (('cold', False), ('warm', True)):
+        runs = [run_child(args, warmup, height, width) for _ in range(args.runs)]
+        medians = {
+            stage: float(np.median([run[stage] for run in runs]))
+            for stage in STAGES + ['process'] if stage in runs[0]
+        }
+        records[mode] = {'median_ms': medians,
+                         'heavy_after_detection': runs[0]['heavy_after_detection'],
+                         'heavy_modules_loaded': runs[0]['heavy_modules_loaded']}
+        rows += [[mode, stage, f"{value:.1f}"] for stage, value in medians.items()]
+
+    print_table(["Режим", "Стадия", "Медиана, мс"], rows)
+    heavy_detection = records['cold']['heavy_after_detection']
+    heavy = records['cold']['heavy_modules_loaded']
+    print(f"\nТяжелые модули после импорта utils.detection: {', '.join(heavy_detection) or 'нет'}")
+    print(f"Тяжелые модули после импорта utils.visualization: {', '.join(heavy) or 'нет'}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'model': args.model, 'backend': args.backend, 'img_size': args.img_size,
+                       'shape': [height, width], 'runs': args.runs, 'results': records}, f, indent=2)
+        print(f"\nРезультаты сохранены: {args.output}")
+
+    if heavy:
+        print(f"\n❌ Импорт utils загружает тяжелые модули: {', '.join(heavy)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Статистика по классам: словари Python против DetectionStats
+
+Прежний create_statistics_chart() собирал счетчики и списки всех
+уверенностей из словарей детекций. Здесь тот же подсчет сравнивается с
+потоковым DetectionStats на синтетическом потоке кадров, в том числе с
+объединением статистик нескольких воркеров.
+
+Пример:
+    python -m benchmarks.bench_statistics --frames 200000 --detections 5 --workers 4
+"""
+
+import argparse
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.common import measure, print_table
+from config import CLASS_NAMES
+from utils.results import Detections
+from utils.statistics import DetectionStats
+
+def legacy_statistics(frames):
+    """Прежний подсчет: словари и списки всех уверенностей"""
+    class_counts, class_confidences = {}, {}
+    for detections in frames:
+        for detection in detections:
+            class_name = detection['class_name']
+            class_counts[class_name] = class_counts.get(class_name, 0) + 1
+            class_confidences.setdefault(class_name, []).append(detection['confidence'])
+    return {name: (count, np.mean(class_confidences[name])) for name, count in class_counts.items()}
+
+def streaming_statistics(frames, workers: int, chunk: int):
+    """Воркеры ведут свои статистики (кадры по кругу пакетами), затем они объединяются"""
+    shards = [DetectionStats() for _ in range(workers)]
+    for index, start in enumerate(range(0, len(frames), chunk)):
+        shards[index % workers].update_many(frames[start:start + chunk])
+    total = shards[0]
+    for shard in shards[1:]:
+        total.merge(shard)
+    return total
+
+def peak_mb(fn) -> float:
+    """Пиковая память вызова по tracemalloc, МБ"""
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 2 ** 20
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--frames", type=int, default=100000)
+    parser.add_argument("--detections", type=int, default=5, help="Детекций на кадр")
+    parser.add_argument("--workers", type=int, default=4, help="Число объединяемых статистик")
+    parser.add_argument("--chunk", type=int, default=1000, help="Кадров в одном обновлении")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    names = dict(enumerate(CLASS_NAMES))
+    frames = [
+        Detections(
+            np.zeros((args.detections, 4)),
+            rng.uniform(0.3, 1.0, args.detections),
+            rng.integers(0, len(names), args.detections),
+            names
+        )
+        for _ in range(args.frames)
+    ]
+
+    reference = legacy_statistics(frames)
+    stats = streaming_statistics(frames, args.workers, args.chunk)
+    error = max(
+        abs(reference[row['class_name']][1] - row['mean_confidence'])
+        for row in stats.summary()
+    )
+    print(f"Детекций: {stats.total}, макс. расхождение средней уверенности: {error:.2e}")
+
+    modes = {
+        "словари и списки уверенностей": lambda: legacy_statistics(frames),
+        "DetectionStats, по кадру": lambda: streaming_statistics(frames, args.workers, 1),
+        f"DetectionStats, по {args.chunk} кадров": lambda: streaming_statistics(frames, args.workers, args.chunk),
+    }
+    rows = []
+    for name, fn in modes.items():
+        seconds = measure(fn, repeats=1, warmup=0)['best']
+        rows.append([name, f"{seconds:.2f}", f"{stats.total / seconds / 1e6:.2f}", f"{peak_mb(fn):.1f}"])
+
+    print_table(["Способ", "Время, с", "Млн детекций/с", "Пик памяти, МБ"], rows)
+
+if __name__ == "__main__":
+    main()
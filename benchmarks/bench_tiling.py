@@ -0,0 +1,160 @@
+"""
+Нарезка на тайлы против одного прохода: recall и задержка
+
+Изображения разбивки датасета (по желанию увеличенные в --scale раз,
+чтобы имитировать кадры 4K) обрабатываются одним проходом с разными
+img_size и нарезкой на тайлы. Recall и precision считаются по
+разметке YOLO при IoU >= 0.5 с совпадением класса.
+
+Перед этим проверяется склейка тайлов на знаках, лежащих на швах: модель
+заменена сценарием, который в каждом тайле возвращает видимую часть
+знака (обрезанный бокс - с большей уверенностью, чем полный). Сравнивается
+склейка только по IoU (NMS) и со слиянием по IOS; если после слияния
+остаются дубликаты, скрипт завершается с кодом 1.
+
+Пример:
+    TRAFFIC_SIGNS_DATASET=/data/car python -m benchmarks.bench_tiling --split val --scale 4 --sizes 640 1280 1920
+    python -m benchmarks.bench_tiling --seam-only
+"""
+
+import argparse
+import sys
+
+import numpy as np
+
+from benchmarks.common import (
+    add_common_args, evaluate_detection, load_detector, load_labeled_split, print_table
+)
+from config import DATASET_ROOT, TILE_SIZE, TILE_OVERLAP, TILE_MERGE_IOS
+from utils.boxes import box_iou
+from utils.pool import DetectorPool
+from utils.results import Detections
+from utils.tiling import detect_sliced, tile_boxes
+
+class SeamScript:
+    """
+    Подмена модели для проверки склейки: в каждом тайле возвращает части
+    заданных знаков, видимые в нем не меньше чем на min_visible площади
+    """
+
+    def __init__(self, signs: np.ndarray, tiles: np.ndarray, min_visible: float = 0.2):
+        self.signs = signs
+        self.tiles = tiles
+        self.min_visible = min_visible
+        self.class_names = {0: 'sign'}
+
+    def detect_batch(self, crops, **kwargs):
+        results = []
+        for tile in self.tiles[:len(crops)]:
+            visible = np.hstack([np.maximum(self.signs[:, :2], tile[:2]), np.minimum(self.signs[:, 2:], tile[2:])])
+            fraction = (np.prod(np.clip(visible[:, 2:] - visible[:, :2], 0, None), axis=1)
+                        / np.prod(self.signs[:, 2:] - self.signs[:, :2], axis=1))
+            found = fraction >= self.min_visible
+            # Худший случай: обрезанный бокс увереннее полного
+            confidences = np.where(fraction[found] < 1, 0.9, 0.8)
+            results.append({'detections': Detections(
+                (visible[found] - np.tile(tile[:2], 2)).astype(np.float32), confidences.astype(np.float32),
+                np.zeros(found.sum(), dtype=np.int64), self.class_names
+            )})
+        return results
+
+def seam_rows(tile_size: int, overlap: float):
+    """Знаки на вертикальном шве, горизонтальном шве и на стыке четырех тайлов"""
+    shape = (1080, 1920, 3)
+    tiles = tile_boxes(shape, tile_size, overlap)
+    # Знаки по 100 пикселей, сдвинутые через края первого тайла, и контрольный внутри тайла
+    edge_x, edge_y = tiles[0, 2], tiles[0, 3]
+    signs = np.array([
+        [edge_x - 40, 100, edge_x + 60, 200],
+        [100, edge_y - 40, 200, edge_y + 60],
+        [edge_x - 40, edge_y - 40, edge_x + 60, edge_y + 60],
+        [250, 250, 350, 350],
+    ], dtype=np.float32)
+    script = SeamScript(signs, tiles)
+    image = np.zeros(shape, dtype=np.uint8)
+
+    rows, duplicates = [], 0
+    for name, threshold in (("только NMS по IoU", 1.0), (f"слияние по IOS > {TILE_MERGE_IOS} + NMS", TILE_MERGE_IOS)):
+        detections = detect_sliced(script, image, tile_size=tile_size, overlap=overlap,
+                                   full_frame=False, merge_threshold=threshold)['detections']
+        iou = box_iou(signs, detections.bboxes)
+        extra = len(detections) - len(signs)
+        rows.append([name, len(signs), len(detections), extra, f"{iou.max(axis=1).mean():.3f}"])
+        duplicates = extra
+    return rows, duplicates
+
+def quality_row(name, report):
+    """Строка таблицы: качество и задержка режима"""
+    return [
+        name,
+        f"{report['recall']:.1%}",
+        f"{report['precision']:.1%}",
+        f"{report['p50_ms']:.1f}",
+        f"{report['p95_ms']:.1f}"
+    ]
+
+def main():
+    parser = add_common_args(argparse.ArgumentParser(description=__doc__))
+    parser.add_argument("--dataset-root", default=DATASET_ROOT,
+                        help="Корень датасета (по умолчанию из TRAFFIC_SIGNS_DATASET или конфига)")
+    parser.add_argument("--split", default="val", choices=["train", "val", "test"])
+    parser.add_argument("--images", type=int, default=100, help="Максимум изображений разбивки")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="Увеличение изображений (4 - имитация 4K из 960x540)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[640, 1280, 1920],
+                        help="img_size для одного прохода")
+    parser.add_argument("--tile-size", type=int, default=TILE_SIZE)
+    parser.add_argument("--overlap", type=float, default=TILE_OVERLAP)
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Число процессов DetectorPool для тайлов (0 - в текущем процессе)")
+    parser.add_argument("--seam-only", action="store_true",
+                        help="Только проверка склейки на швах, без модели и датасета")
+    args = parser.parse_args()
+
+    rows, duplicates = seam_rows(args.tile_size, args.overlap)
+    print(f"Знаки на швах тайлов {args.tile_size}, перекрытие {args.overlap:.0%}\n")
+    print_table(["Склейка", "Знаков", "Боксов", "Дубликатов", "Средний лучший IoU"], rows)
+    if duplicates:
+        print(f"\n❌ После слияния по IOS остались дубликаты: {duplicates}")
+        sys.exit(1)
+    if args.seam_only:
+        return
+    print()
+
+    detector = load_detector(args)
+    samples = load_labeled_split(args.split, detector.class_names, args.dataset_root,
+                                 limit=args.images, scale=args.scale)
+    params = dict(conf_threshold=args.conf, iou_threshold=args.iou)
+    print(f"Изображений: {len(samples)}, размер: {samples[0][0].shape[1]}x{samples[0][0].shape[0]}")
+
+    # Прогрев
+    detector.detect(samples[0][0], img_size=args.sizes[0], **params)
+
+    headers = ["Режим", "Recall", "Precision", "p50, мс", "p95, мс"]
+    rows = []
+    for size in args.sizes:
+        rows.append(quality_row(f"один проход, img_size={size}", evaluate_detection(
+            lambda image: detector.detect(image, img_size=size, **params), samples
+        )))
+
+    rows.append(quality_row(f"тайлы {args.tile_size}, перекрытие {args.overlap:.0%}", evaluate_detection(
+        lambda image: detector.detect_sliced(image, tile_size=args.tile_size,
+                                             overlap=args.overlap, **params),
+        samples
+    )))
+
+    if args.workers:
+        with DetectorPool(args.model, backend=args.backend, num_workers=args.workers) as pool:
+            # Тайлы кадра расходятся по воркерам пакетами размером с их буфер
+            rows.append(quality_row(f"тайлы, пул из {args.workers} процессов", evaluate_detection(
+                lambda image: detect_sliced(
+                    pool, image, tile_size=args.tile_size, overlap=args.overlap,
+                    batch_size=pool.slots_per_worker, **params
+                ),
+                samples
+            )))
+
+    print_table(headers, rows)
+
+if __name__ == "__main__":
+    main()
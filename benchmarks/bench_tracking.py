@@ -0,0 +1,69 @@
+"""
+Трекинг с ключевыми кадрами: ускорение против потери точности
+
+Эталоном служит полная детекция на каждом кадре. Точность трекинга
+оценивается как доля эталонных боксов, найденных с IoU >= 0.5 и тем же
+классом (recall), и доля выданных боксов, совпавших с эталоном (precision).
+
+Пример:
+    python -m benchmarks.bench_tracking --video clip.mp4 --intervals 2 5 10
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.bench_video import write_synthetic_video
+from benchmarks.common import add_common_args, count_matches, load_detector, print_table
+from utils.video import iter_frames
+
+def main():
+    parser = add_common_args(argparse.ArgumentParser(description=__doc__))
+    parser.add_argument("--video", help="Путь к видеофайлу или папке с кадрами")
+    parser.add_argument("--frames", type=int, default=60,
+                        help="Длина синтетического ролика")
+    parser.add_argument("--intervals", type=int, nargs="+", default=[2, 5, 10],
+                        help="Проверяемые интервалы ключевых кадров")
+    args = parser.parse_args()
+    
+    detector = load_detector(args)
+    params = dict(conf_threshold=args.conf, iou_threshold=args.iou, img_size=args.img_size)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        source = args.video or write_synthetic_video(Path(tmp) / "synthetic.mp4", args.frames, args.seed)
+        frames = [image for _, _, image in iter_frames(source)]
+    
+    # Эталон: полная детекция на каждом кадре
+    start = time.perf_counter()
+    reference = [detector.detect(image, **params)['detections'] for image in frames]
+    full_time = time.perf_counter() - start
+    total_reference = sum(len(r) for r in reference)
+    
+    rows = [["каждый кадр", len(frames), f"{len(frames) / full_time:.1f}", "1.00x", "100.0%", "100.0%"]]
+    
+    for interval in args.intervals:
+        tracker = detector.create_tracker(keyframe_interval=interval, **params)
+        
+        start = time.perf_counter()
+        tracked = [tracker.update(image)['detections'] for image in frames]
+        track_time = time.perf_counter() - start
+        
+        matched = sum(count_matches(t, r) for t, r in zip(tracked, reference))
+        total_tracked = sum(len(t) for t in tracked)
+        recall = matched / total_reference if total_reference else 1.0
+        precision = matched / total_tracked if total_tracked else 1.0
+        
+        rows.append([
+            f"интервал {interval}",
+            tracker.keyframes,
+            f"{len(frames) / track_time:.1f}",
+            f"{full_time / track_time:.2f}x",
+            f"{recall:.1%}",
+            f"{precision:.1%}"
+        ])
+    
+    print_table(["Режим", "Детекций модели", "FPS", "Ускорение", "Recall", "Precision"], rows)
+
+if __name__ == "__main__":
+    main()
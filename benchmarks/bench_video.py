@@ -0,0 +1,72 @@
+"""
+Потоковая детекция на видео: FPS по стадиям конвейера
+
+Если видео не указано, генерируется синтетический ролик.
+
+Пример:
+    python -m benchmarks.bench_video --video clip.mp4 --drop-policy drop_oldest
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.common import add_common_args, load_detector, make_images, print_table
+from utils.video import DROP_POLICIES, VideoWriterSink, iter_frames
+from utils.visualization import create_result_image
+
+def write_synthetic_video(path: Path, frames: int, seed: int) -> Path:
+    """Записывает синтетический ролик 720p"""
+    writer = VideoWriterSink(path, fps=30.0)
+    for image in make_images(frames, shapes=((720, 1280),), seed=seed):
+        writer.write(image)
+    writer.close()
+    return path
+
+def main():
+    parser = add_common_args(argparse.ArgumentParser(description=__doc__))
+    parser.add_argument("--video", help="Путь к видеофайлу или папке с кадрами")
+    parser.add_argument("--frames", type=int, default=60,
+                        help="Длина синтетического ролика")
+    parser.add_argument("--drop-policy", choices=DROP_POLICIES, default="block")
+    parser.add_argument("--inference-batch-size", type=int, default=1)
+    parser.add_argument("--output", help="Путь для записи аннотированного видео")
+    args = parser.parse_args()
+    
+    detector = load_detector(args)
+    params = dict(conf_threshold=args.conf, iou_threshold=args.iou, img_size=args.img_size)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        source = args.video or write_synthetic_video(Path(tmp) / "synthetic.mp4", args.frames, args.seed)
+        
+        # Последовательная обработка для сравнения
+        start = time.perf_counter()
+        frames = 0
+        for _, _, image in iter_frames(source):
+            create_result_image(image, detector.detect(image, **params))
+            frames += 1
+        sequential_fps = frames / (time.perf_counter() - start)
+        
+        writer = VideoWriterSink(args.output) if args.output else None
+        pipeline = detector.detect_video(
+            source,
+            drop_policy=args.drop_policy,
+            inference_batch_size=args.inference_batch_size,
+            writer=writer,
+            **params
+        )
+        for _ in pipeline:
+            pass
+        stats = pipeline.stats()
+    
+    rows = [
+        [name, stats[name]['frames'], stats[name]['dropped'], f"{stats[name]['fps']:.1f}"]
+        for name in ('decode', 'inference', 'render')
+    ]
+    rows.append(["конвейер (итого)", stats['total']['frames'], "-", f"{stats['total']['fps']:.1f}"])
+    rows.append(["последовательно", frames, "-", f"{sequential_fps:.1f}"])
+    print_table(["Стадия", "Кадров", "Отброшено", "FPS"], rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Общие функции для бенчмарков
+"""
+
+import argparse
+import tempfile
+import time
+import cv2
+import numpy as np
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from benchmarks.stub_model import build_stub_model
+from config import MODEL_PATH, INFERENCE_BACKEND, DEFAULT_CONFIDENCE, DEFAULT_IOU, DEFAULT_IMAGE_SIZE
+from utils.backends import BACKENDS
+from utils.boxes import box_iou, greedy_match
+from utils.dataset import load_dataset_config, load_ground_truth, split_image_paths
+from utils.detection import TrafficSignDetector
+from utils.results import Detections
+from utils.reporting import markdown_table
+
+def add_common_args(parser: argparse.ArgumentParser) -> argparse.ArgumentParser:
+    """
+    Добавляет в парсер общие для всех бенчмарков аргументы
+    
+    Args:
+        parser: Парсер аргументов командной строки
+        
+    Returns:
+        Тот же парсер
+    """
+    parser.add_argument("--model", default=str(MODEL_PATH),
+                        help="Путь к весам модели")
+    parser.add_argument("--backend", default=INFERENCE_BACKEND, choices=BACKENDS,
+                        help="Движок инференса")
+    parser.add_argument("--conf", type=float, default=DEFAULT_CONFIDENCE,
+                        help="Порог уверенности")
+    parser.add_argument("--iou", type=float, default=DEFAULT_IOU,
+                        help="Порог IoU для NMS")
+    parser.add_argument("--img-size", type=int, default=DEFAULT_IMAGE_SIZE,
+                        help="Размер входа модели")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Seed для генерации синтетических изображений")
+    parser.add_argument("--stub", action="store_true",
+                        help="Детерминированная модель-заглушка вместо весов "
+                             "(см. benchmarks/stub_model.py)")
+    return parser
+
+def model_path(args: argparse.Namespace) -> str:
+    """
+    Путь к весам по аргументам командной строки
+    
+    С флагом --stub модель-заглушка один раз сохраняется во временный
+    каталог, и дальше args.model указывает на нее (например, для запуска
+    пула процессов)
+    """
+    if args.stub:
+        args.model = str(build_stub_model(Path(tempfile.gettempdir()) / "traffic_signs_stub.pt"))
+        args.stub = False
+    return args.model
+
+def load_detector(args: argparse.Namespace) -> TrafficSignDetector:
+    """Создает детектор по аргументам командной строки"""
+    return TrafficSignDetector(model_path(args), backend=args.backend)
+
+def make_images(count: int,
+                shapes: Sequence[Tuple[int, int]] = ((480, 640), (720, 1280), (1080, 1920)),
+                seed: int = 0) -> List[np.ndarray]:
+    """
+    Генерирует синтетические RGB изображения разных размеров
+    
+    Args:
+        count: Количество изображений
+        shapes: Набор размеров (высота, ширина), перебираемых по кругу
+        seed: Seed генератора случайных чисел
+        
+    Returns:
+        Список изображений uint8
+    """
+    rng = np.random.default_rng(seed)
+    return [
+        rng.integers(0, 256, size=(*shapes[i % len(shapes)], 3), dtype=np.uint8)
+        for i in range(count)
+    ]
+
+def make_photo(width: int, height: int, seed: int = 0, quality: int = 90) -> bytes:
+    """JPEG с плавным градиентом и шумом, похожий по размеру на фотографию"""
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    image = np.dstack([x + 0 * y, y + 0 * x, (x + y) / 2])
+    image += rng.normal(0, 8, image.shape).astype(np.float32)
+    ok, encoded = cv2.imencode('.jpg', np.clip(image, 0, 255).astype(np.uint8),
+                               [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return encoded.tobytes()
+
+def measure(fn: Callable[[], object], repeats: int = 3, warmup: int = 1) -> Dict[str, float]:
+    """
+    Замеряет время выполнения функции
+    
+    Args:
+        fn: Функция без аргументов
+        repeats: Количество замеров
+        warmup: Количество прогревочных запусков
+        
+    Returns:
+        Словарь с лучшим и средним временем в секундах
+    """
+    for _ in range(warmup):
+        fn()
+    
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    
+    return {
+        'best': min(timings),
+        'mean': float(np.mean(timings))
+    }
+
+def print_table(headers: Sequence[str], rows: Sequence[Sequence[object]]) -> None:
+    """Печатает таблицу в формате Markdown"""
+    print(markdown_table(headers, rows))
+
+def match_detections(predicted, reference, iou_threshold: float = 0.5):
+    """
+    Сопоставляет два набора детекций одного изображения
+    
+    Args:
+        predicted: Проверяемые детекции (Detections)
+        reference: Эталонные детекции (Detections)
+        iou_threshold: Минимальный IoU для пары с одинаковым классом
+        
+    Returns:
+        Кортеж индексов сопоставленных пар (predicted, reference) и матрица IoU
+    """
+    iou = box_iou(predicted.bboxes, reference.bboxes)
+    iou[predicted.class_ids[:, None] != reference.class_ids[None, :]] = 0
+    return (*greedy_match(iou, iou_threshold), iou)
+
+def count_matches(predicted, reference, iou_threshold: float = 0.5) -> int:
+    """Число совпавших пар предсказание-эталон с одинаковым классом"""
+    return len(match_detections(predicted, reference, iou_threshold)[0])
+
+def load_labeled_split(split: str,
+                       class_names: Dict[int, str],
+                       dataset_root: Optional[str] = None,
+                       limit: Optional[int] = None,
+                       scale: float = 1.0) -> List[Tuple[np.ndarray, Detections]]:
+    """
+    Загружает изображения разбивки датасета вместе с разметкой
+    
+    Args:
+        split: Разбивка ('train', 'val' или 'test')
+        class_names: Отображение ID класса -> название
+        dataset_root: Корень датасета вместо поля path из конфига
+        limit: Максимум изображений
+        scale: Увеличение изображений (разметка пересчитывается)
+        
+    Returns:
+        Список пар (изображение RGB, эталонные Detections)
+    """
+    config = load_dataset_config(root=dataset_root)
+    samples = []
+    for path in split_image_paths(split, config)[:limit]:
+        image = cv2.cvtColor(cv2.imread(str(path)), cv2.COLOR_BGR2RGB)
+        if scale != 1:
+            image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_LINEAR)
+        samples.append((image, load_ground_truth(path, image.shape, class_names)))
+    return samples
+
+def evaluate_detection(detect: Callable[[np.ndarray], Dict[str, Any]],
+                       samples: Sequence[Tuple[np.ndarray, Detections]],
+                       iou_threshold: float = 0.5) -> Dict[str, Any]:
+    """
+    Качество и задержка функции детекции на размеченной выборке
+    
+    Args:
+        detect: Функция изображение -> результат в формате detect()
+        samples: Результат load_labeled_split()
+        iou_threshold: Минимальный IoU для совпадения с разметкой
+        
+    Returns:
+        Словарь с 'recall', 'precision', 'class_accuracy' (доля верных
+        классов среди боксов, совпавших без учета класса), задержкой
+        'p50_ms', 'p95_ms', 'mean_ms' и списком 'model_info'
+    """
+    matched, located, correct_class, total_true, total_pred = 0, 0, 0, 0, 0
+    timings, model_info = [], []
+    for image, truth in samples:
+        start = time.perf_counter()
+        results = detect(image)
+        timings.append(time.perf_counter() - start)
+        
+        detections = results['detections']
+        matched += count_matches(detections, truth, iou_threshold)
+        total_true += len(truth)
+        total_pred += len(detections)
+        model_info.append(results['model_info'])
+        
+        # Сопоставление без учета класса: насколько верно определен класс найденного знака
+        pred_index, true_index = greedy_match(box_iou(detections.bboxes, truth.bboxes), iou_threshold)
+        located += len(pred_index)
+        correct_class += int(np.sum(detections.class_ids[pred_index] == truth.class_ids[true_index]))
+    
+    ms = np.array(timings) * 1000
+    return {
+        'recall': matched / max(total_true, 1),
+        'precision': matched / max(total_pred, 1),
+        'class_accuracy': correct_class / max(located, 1),
+        'p50_ms': float(np.percentile(ms, 50)),
+        'p95_ms': float(np.percentile(ms, 95)),
+        'mean_ms': float(ms.mean()),
+        'model_info': model_info
+    }
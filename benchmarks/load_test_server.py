@@ -0,0 +1,133 @@
+"""
+Нагрузочный клиент для server.py
+
+Открывает заданное число конкурентных соединений и отправляет
+изображения на /detect. Печатает распределение кодов ответа,
+перцентили задержки и пропускную способность.
+
+Пример:
+    python server.py --port 8000 &
+    python -m benchmarks.load_test_server --url http://127.0.0.1:8000 --concurrency 32 --requests 500
+"""
+
+import argparse
+import asyncio
+import time
+from collections import Counter
+from pathlib import Path
+from typing import List, Tuple
+from urllib.parse import urlsplit
+
+import cv2
+import numpy as np
+
+from benchmarks.common import make_images, print_table
+
+async def read_response(reader: asyncio.StreamReader) -> Tuple[int, bytes]:
+    """Читает HTTP-ответ с Content-Length"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("Соединение закрыто сервером")
+    status = int(status_line.split()[1])
+    
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value.strip())
+    
+    return status, await reader.readexactly(length)
+
+async def wait_ready(host: str, port: int, timeout: float = 120.0):
+    """Ждет, пока /readyz не вернет 200"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+            writer.write(f"GET /readyz HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode())
+            status, _ = await read_response(reader)
+            writer.close()
+            if status == 200:
+                return
+        except (ConnectionError, OSError):
+            pass
+        await asyncio.sleep(0.5)
+    raise TimeoutError("Сервер не перешел в состояние ready")
+
+async def worker(host: str, port: int, path: str, payloads: List[bytes],
+                 counter: List[int], total: int, statuses: Counter, latencies: List[float]):
+    """Отправляет запросы по одному keep-alive соединению"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while counter[0] < total:
+            index = counter[0]
+            counter[0] += 1
+            body = payloads[index % len(payloads)]
+            
+            start = time.perf_counter()
+            writer.write(
+                f"POST {path} HTTP/1.1\r\nHost: {host}\r\n"
+                f"Content-Type: application/octet-stream\r\nContent-Length: {len(body)}\r\n\r\n".encode()
+                + body
+            )
+            await writer.drain()
+            status, _ = await read_response(reader)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] += 1
+    finally:
+        writer.close()
+
+async def run(args: argparse.Namespace):
+    url = urlsplit(args.url)
+    host, port = url.hostname, url.port or 80
+    path = f"/detect?conf={args.conf}&iou={args.iou}&img_size={args.img_size}"
+    
+    if args.images:
+        payloads = [p.read_bytes() for p in sorted(Path(args.images).glob("*.jpg"))]
+    else:
+        payloads = [
+            cv2.imencode(".jpg", cv2.cvtColor(image, cv2.COLOR_RGB2BGR))[1].tobytes()
+            for image in make_images(8, seed=args.seed)
+        ]
+    
+    await wait_ready(host, port)
+    
+    statuses, latencies, counter = Counter(), [], [0]
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        worker(host, port, path, payloads, counter, args.requests, statuses, latencies)
+        for _ in range(args.concurrency)
+    ])
+    elapsed = time.perf_counter() - start
+    
+    ms = np.array(latencies) * 1000
+    print_table(
+        ["Запросов", "Конкурентность", "Запросов/с", "p50, мс", "p95, мс", "p99, мс", "Коды ответа"],
+        [[
+            len(latencies),
+            args.concurrency,
+            f"{statuses[200] / elapsed:.1f}",
+            f"{np.percentile(ms, 50):.1f}",
+            f"{np.percentile(ms, 95):.1f}",
+            f"{np.percentile(ms, 99):.1f}",
+            ", ".join(f"{code}: {count}" for code, count in sorted(statuses.items()))
+        ]]
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--images", help="Папка с JPEG для отправки (по умолчанию синтетические)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--conf", type=float, default=0.5)
+    parser.add_argument("--iou", type=float, default=0.4)
+    parser.add_argument("--img-size", type=int, default=640)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
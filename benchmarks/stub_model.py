@@ -0,0 +1,95 @@
+"""
+Детерминированная модель-заглушка для бенчмарков без весов
+
+Архитектура совпадает с обучаемой (YOLO11n, классы из конфига), поэтому
+предобработка, прямой проход и NMS ultralytics стоят столько же, сколько
+с настоящими весами. Веса случайные с фиксированным seed; головы
+настроены так, чтобы число детекций было реалистичным и слабо зависело от
+содержимого кадра:
+
+- уверенность выше порога выдают только якоря грубого уровня (шаг 32);
+- регрессия боксов константная (каждая сторона - 6 шагов от якоря),
+  поэтому NMS оставляет 15-25 боксов на кадр;
+- класс якоря (в основном один из первых) зависит от кадра через малую
+  случайную добавку к логитам, уверенность держится около 0.72-0.73.
+"""
+
+from pathlib import Path
+from typing import Sequence, Union
+
+import torch
+
+from config import CLASS_NAMES
+
+# Архитектура обучаемой модели (см. README)
+STUB_ARCHITECTURE = "yolo11n.yaml"
+
+# Логит уверенности первого класса на якорях грубого уровня
+# (sigmoid(1.0) ~ 0.73), шаг его уменьшения для следующих классов и
+# разброс логитов, зависящий от кадра
+STUB_LOGIT = 1.0
+STUB_LOGIT_STEP = 0.05
+STUB_LOGIT_STD = 0.3
+
+# Расстояние от якоря до сторон бокса в шагах сетки
+STUB_BOX_DISTANCE = 6
+
+def build_stub_model(path: Union[str, Path],
+                     class_names: Sequence[str] = CLASS_NAMES,
+                     seed: int = 0) -> Path:
+    """
+    Создает чекпойнт модели-заглушки в формате ultralytics
+
+    Args:
+        path: Куда сохранить .pt файл
+        class_names: Названия классов
+        seed: Seed инициализации весов
+
+    Returns:
+        Путь к сохраненному файлу
+    """
+    from ultralytics.nn.tasks import DetectionModel
+
+    path = Path(path)
+    torch.manual_seed(seed)
+    model = DetectionModel(STUB_ARCHITECTURE, nc=len(class_names), verbose=False)
+
+    # Инициализация по умолчанию гасит активации к последним слоям,
+    # и логиты классов перестают зависеть от кадра. Свертка DFL с
+    # фиксированными весами не обучается и не трогается
+    for module in model.modules():
+        if isinstance(module, torch.nn.Conv2d) and module.weight.requires_grad:
+            torch.nn.init.kaiming_normal_(module.weight, nonlinearity='relu')
+    model.eval()
+
+    head = model.model[-1]
+    box_convs = [branch[-1] for branch in head.cv2]
+    class_convs = [branch[-1] for branch in head.cv3]
+
+    # Разброс логитов при нулевом смещении на пробном кадре
+    probe = torch.rand(1, 3, 640, 640, generator=torch.Generator().manual_seed(seed))
+    for conv in class_convs:
+        conv.bias.data.zero_()
+    with torch.no_grad():
+        scores = model(probe)[0][0, 4:].double().clamp(1e-12, 1 - 1e-12)
+    scale = STUB_LOGIT_STD / torch.logit(scores).std().item()
+
+    # Лесенка смещений по классам: побеждают в основном первые классы,
+    # иначе NMS по классам оставляет слишком много пересекающихся боксов
+    ladder = STUB_LOGIT - STUB_LOGIT_STEP * torch.arange(len(class_names), dtype=torch.float32)
+    coarse_level = len(class_convs) - 1
+    for level, conv in enumerate(class_convs):
+        conv.weight.data *= scale
+        conv.bias.data.copy_(ladder if level == coarse_level else torch.full_like(ladder, -10.0))
+
+    # Распределение DFL с единственным пиком: расстояние ровно STUB_BOX_DISTANCE
+    for conv in box_convs:
+        conv.weight.data.zero_()
+        bins = conv.bias.data.view(4, head.reg_max)
+        bins.fill_(-10.0)
+        bins[:, STUB_BOX_DISTANCE] = 10.0
+
+    model.names = dict(enumerate(class_names))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    torch.save({'model': model, 'train_args': {'task': 'detect'}, 'stub_seed': seed}, path)
+    return path
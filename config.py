@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 # Пути к файлам
@@ -6,6 +7,10 @@ MODEL_PATH = PROJECT_ROOT / "models" / "best.pt"
 CONFIG_PATH = PROJECT_ROOT / "models" / "traffic_signs.yaml"
 DEMO_IMAGES_PATH = PROJECT_ROOT / "assets" / "demo_images"
 
+# Корень датасета; переопределяет поле path из CONFIG_PATH
+# (в конфиге указан путь из Colab)
+DATASET_ROOT = os.environ.get("TRAFFIC_SIGNS_DATASET")
+
 # Классы дорожных знаков (как в обучении)
 CLASS_NAMES = [
     'Green Light',
@@ -25,11 +30,87 @@ CLASS_NAMES = [
     'Stop'
 ]
 
+# Движок инференса: "pytorch", "onnx", "openvino" или "openvino-int8"
+# (ONNX и OpenVINO экспортируются локально из MODEL_PATH при первом запуске,
+# INT8 модель создается скриптом quantize.py)
+INFERENCE_BACKEND = "pytorch"
+
 # Настройки по умолчанию
 DEFAULT_CONFIDENCE = 0.5
 DEFAULT_IOU = 0.4
 DEFAULT_IMAGE_SIZE = 640
 
+# Кандидаты для переприменения порогов без повторного инференса:
+# модель запускается один раз с этим минимальным порогом уверенности
+CANDIDATE_CONFIDENCE = 0.1
+CANDIDATE_MAX_DET = 3000
+
+# Нарезка кадров высокого разрешения на перекрывающиеся тайлы
+TILE_SIZE = 640
+TILE_OVERLAP = 0.2
+# Боксы соседних тайлов сливаются, если пересечение больше этой доли
+# площади меньшего из них (обрезанный на шве бокс внутри полного)
+TILE_MERGE_IOS = 0.5
+
+# Каскад: грубый проход с малым входом предлагает области, которые
+# затем увеличиваются и проверяются моделью (сторона области - CROP_SCALE
+# больших сторон бокса, но не меньше MIN_CROP пикселей). Детекция в области
+# подтверждает предложение, только если IoU с ним не ниже CONFIRM_IOU
+CASCADE_COARSE_SIZE = 320
+CASCADE_REFINE_SIZE = 320
+CASCADE_PROPOSAL_CONFIDENCE = 0.25
+CASCADE_CROP_SCALE = 3.0
+CASCADE_MIN_CROP = 64
+CASCADE_CONFIRM_IOU = 0.3
+
+# Адаптивный размер входа под бюджет задержки: лестница размеров (кратны
+# шагу 32), окно последних замеров, квантиль, который сравнивается с
+# целевой задержкой, минимум замеров до снижения и запас, при котором
+# размер повышается. Целевая задержка server.py по умолчанию (None -
+# всегда DEFAULT_IMAGE_SIZE)
+ADAPTIVE_IMAGE_SIZES = (320, 480, 640, 960)
+ADAPTIVE_WINDOW = 32
+ADAPTIVE_QUANTILE = 0.9
+ADAPTIVE_MIN_SAMPLES = 4
+ADAPTIVE_HEADROOM = 0.7
+ADAPTIVE_TARGET_MS = float(os.environ["TRAFFIC_SIGNS_TARGET_MS"]) if os.environ.get("TRAFFIC_SIGNS_TARGET_MS") else None
+
+# Прогрев модели при старте (app.py, server.py, воркеры пула): пустые
+# прогоны на этих размерах входа, чтобы первый запрос не платил за
+# инициализацию графа и ядер
+WARMUP_IMAGE_SIZES = (DEFAULT_IMAGE_SIZE,)
+WARMUP_RUNS = 1
+
+# Реестр моделей: манифест YAML с именами и версиями весов (None - одна
+# модель MODEL_PATH под именем "default") и бюджет памяти на веса всех
+# загруженных моделей; сверх бюджета выгружаются давно не использованные
+MODEL_REGISTRY_PATH = os.environ.get("TRAFFIC_SIGNS_MODEL_REGISTRY")
+REGISTRY_MAX_MB = 1024
+
+# Кэш результатов по содержимому изображения: лимит памяти и
+# необязательный дисковый уровень (папка задается переменной окружения)
+RESULT_CACHE_MAX_MB = 256
+RESULT_CACHE_DIR = os.environ.get("TRAFFIC_SIGNS_CACHE_DIR")
+RESULT_CACHE_MAX_DISK_MB = 2048
+
+# Метрики детектора: файл событий JSON Lines (None - не писать) и порт
+# эндпоинта /metrics для Streamlit (None - не запускать; server.py отдает
+# /metrics на своем порту)
+METRICS_LOG_PATH = os.environ.get("TRAFFIC_SIGNS_METRICS_LOG")
+METRICS_PORT = int(os.environ["TRAFFIC_SIGNS_METRICS_PORT"]) if os.environ.get("TRAFFIC_SIGNS_METRICS_PORT") else None
+
+# Бинарный журнал всех детекций server.py для аудита и аналитики
+# (папка сегментов; None - не вести)
+DETECTION_LOG_DIR = os.environ.get("TRAFFIC_SIGNS_DETECTION_LOG")
+
+# Рекомендации водителю на потоке кадров: порог уверенности для смены
+# состояния, нижний порог для его сохранения, число кадров подтверждения
+# и число кадров без знака до сброса
+RECOMMENDATION_CONFIDENCE = 0.8
+RECOMMENDATION_RELEASE_CONFIDENCE = 0.5
+RECOMMENDATION_CONFIRM_FRAMES = 3
+RECOMMENDATION_RELEASE_FRAMES = 15
+
 # Цвета для классов (BGR формат для OpenCV)
 CLASS_COLORS = {
     'Green Light': (0, 255, 0),
@@ -47,4 +128,22 @@ CLASS_COLORS = {
     'Speed Limit 100': (255, 255, 0),
     'Speed Limit 110': (255, 255, 0),
     'Speed Limit 120': (255, 255, 0),
-}
\ No newline at end of file
+}
+
+# Настройки HTTP-сервера инференса
+SERVER_HOST = "0.0.0.0"
+SERVER_PORT = 8000
+SERVER_MAX_BATCH_SIZE = 8          # Максимальный размер микропакета
+SERVER_MAX_WAIT_MS = 5.0           # Окно ожидания пополнения пакета
+SERVER_MAX_QUEUE_SIZE = 64         # Лимит очереди, сверх него - ответ 429
+SERVER_MAX_BODY_BYTES = 20 * 1024 * 1024
+SERVER_DECODE_WORKERS = 2          # Потоков декодирования тел запросов
+SERVER_MAX_TARGETS = 16            # Разных target_ms (планировщиков размера входа)
+SERVER_MAX_IMAGE_SIZE = 1280       # Наибольший img_size в запросе (кратен 32)
+
+# Асинхронный API детектора (utils/async_api.py): потоков инференса,
+# одновременных вызовов в работе и параметры объединения вызовов в пакеты
+ASYNC_MAX_WORKERS = 1
+ASYNC_MAX_CONCURRENCY = 32
+ASYNC_MAX_BATCH_SIZE = 8
+ASYNC_MAX_WAIT_MS = 5.0
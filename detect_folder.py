@@ -0,0 +1,105 @@
+"""
+Детекция на всех изображениях папки с записью в JSONL или Parquet
+
+Дерево папок обходится в детерминированном порядке, изображения
+декодируются пулом потоков и обрабатываются пакетами. После каждого
+пакета результаты дописываются в файл, а прогресс сохраняется в
+<output>.checkpoint.json: прерванный запуск с теми же аргументами
+продолжается с первого незаписанного изображения.
+
+Примеры:
+    python detect_folder.py assets/demo_images --output demo.jsonl
+    TRAFFIC_SIGNS_DATASET=/data/car python detect_folder.py --split test --output test.parquet
+"""
+
+import argparse
+import sys
+
+from config import *
+from utils.backends import BACKENDS
+from utils.bulk import OUTPUT_FORMATS, detect_folder, output_format
+from utils.cache import ResultCache
+from utils.dataset import load_dataset_config
+from utils.detection import TrafficSignDetector
+
+def main():
+    parser = argparse.ArgumentParser(description="Детекция на всех изображениях папки")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("source", nargs="?", help="Папка с изображениями (обходится рекурсивно)")
+    source.add_argument("--split", choices=["train", "val", "test"],
+                        help="Разбивка датасета из models/traffic_signs.yaml вместо папки")
+    parser.add_argument("--output", required=True,
+                        help="Файл .jsonl или папка .parquet для результатов")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS,
+                        help="Формат вывода (по умолчанию по расширению --output)")
+    parser.add_argument("--dataset-root", default=DATASET_ROOT,
+                        help="Корень датасета (по умолчанию из TRAFFIC_SIGNS_DATASET или конфига)")
+    parser.add_argument("--model", default=str(MODEL_PATH), help="Путь к весам модели")
+    parser.add_argument("--backend", default=INFERENCE_BACKEND, choices=BACKENDS, help="Движок инференса")
+    parser.add_argument("--conf", type=float, default=DEFAULT_CONFIDENCE, help="Порог уверенности")
+    parser.add_argument("--iou", type=float, default=DEFAULT_IOU, help="Порог IoU для NMS")
+    parser.add_argument("--img-size", type=int, default=DEFAULT_IMAGE_SIZE, help="Размер входа модели")
+    parser.add_argument("--batch-size", type=int, default=16, help="Размер пакета инференса")
+    parser.add_argument("--chunk-size", type=int, default=256,
+                        help="Изображений между записями и контрольными точками")
+    parser.add_argument("--decode-workers", type=int, default=4, help="Потоков декодирования")
+    parser.add_argument("--cache-dir", default=RESULT_CACHE_DIR,
+                        help="Дисковый кэш результатов: повторные изображения не запускают модель")
+    parser.add_argument("--restart", action="store_true",
+                        help="Начать заново, игнорируя контрольную точку")
+    args = parser.parse_args()
+
+    if args.split:
+        config = load_dataset_config(CONFIG_PATH, args.dataset_root)
+        if args.split not in config['splits']:
+            parser.error(f"Разбивка '{args.split}' не указана в конфиге датасета")
+        root = config['splits'][args.split]
+    else:
+        root = args.source
+
+    cache = None
+    if args.cache_dir:
+        cache = ResultCache(
+            max_bytes=RESULT_CACHE_MAX_MB * 2 ** 20,
+            disk_dir=args.cache_dir,
+            max_disk_bytes=RESULT_CACHE_MAX_DISK_MB * 2 ** 20
+        )
+    detector = TrafficSignDetector(args.model, backend=args.backend, cache=cache)
+
+    def report(progress):
+        print(f"\r⏳ {progress['processed']} изобр., ошибок: {progress['errors']}, "
+              f"{progress['images_per_second']:.1f} изобр./с", end="", flush=True)
+
+    fmt = args.format or output_format(args.output)
+    try:
+        summary = detect_folder(
+            detector,
+            root,
+            args.output,
+            fmt=fmt,
+            conf_threshold=args.conf,
+            iou_threshold=args.iou,
+            img_size=args.img_size,
+            batch_size=args.batch_size,
+            chunk_size=args.chunk_size,
+            decode_workers=args.decode_workers,
+            resume=not args.restart,
+            progress=report
+        )
+    except (FileNotFoundError, ImportError, ValueError) as error:
+        print(f"\n❌ {error}")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print("\n⏸ Остановлено; повторный запуск продолжит с контрольной точки")
+        sys.exit(130)
+
+    print()
+    if summary['resumed_from']:
+        print(f"↪️ Продолжено с изображения {summary['resumed_from']}")
+    print(f"✅ Обработано: {summary['processed']} изобр., детекций: {summary['detections']}, "
+          f"ошибок чтения: {summary['errors']}")
+    print(f"⚡ {summary['images_per_second']:.1f} изобр./с за {summary['seconds']:.1f} с")
+    print(f"💾 Результаты: {args.output} ({fmt})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Precision, recall, mAP50 и mAP50-95 по классам на разбивке датасета
+
+Разбивки и названия классов берутся из models/traffic_signs.yaml.
+Детектор запускается пакетами с низким порогом уверенности (как
+ultralytics val), предсказания сопоставляются с разметкой векторизованно.
+Для больших разбивок инференс распределяется по процессам DetectorPool.
+Таблица печатается в формате раздела «Метрики качества» README.
+
+Примеры:
+    TRAFFIC_SIGNS_DATASET=/data/car python evaluate.py --split val
+    python evaluate.py --split test --backend openvino --img-size 480 --workers 4 --output test.json
+"""
+
+import argparse
+import json
+import os
+import sys
+from contextlib import nullcontext
+
+from config import *
+from utils.backends import BACKENDS
+from utils.detection import TrafficSignDetector
+from utils.evaluation import EVAL_CONFIDENCE, EVAL_IOU, evaluate_split, metrics_table
+from utils.dataset import load_dataset_config, split_image_paths
+from utils.pool import DetectorPool
+
+# С какого размера разбивки по умолчанию включается пул процессов
+POOL_MIN_IMAGES = 500
+
+def main():
+    parser = argparse.ArgumentParser(description="Метрики качества детектора на разбивке датасета")
+    parser.add_argument("--split", default="val", choices=["train", "val", "test"])
+    parser.add_argument("--dataset-root", default=DATASET_ROOT,
+                        help="Корень датасета (по умолчанию из TRAFFIC_SIGNS_DATASET или конфига)")
+    parser.add_argument("--model", default=str(MODEL_PATH), help="Путь к весам модели")
+    parser.add_argument("--backend", default=INFERENCE_BACKEND, choices=BACKENDS, help="Движок инференса")
+    parser.add_argument("--conf", type=float, default=EVAL_CONFIDENCE, help="Порог уверенности")
+    parser.add_argument("--iou", type=float, default=EVAL_IOU, help="Порог IoU для NMS")
+    parser.add_argument("--img-size", type=int, default=DEFAULT_IMAGE_SIZE, help="Размер входа модели")
+    parser.add_argument("--batch-size", type=int, default=16, help="Размер пакета инференса")
+    parser.add_argument("--decode-workers", type=int, default=4, help="Потоков декодирования")
+    parser.add_argument("--workers", type=int,
+                        help="Процессов DetectorPool (по умолчанию - по числу ядер "
+                             f"для разбивок от {POOL_MIN_IMAGES} изображений, иначе 1)")
+    parser.add_argument("--limit", type=int, help="Максимум изображений разбивки")
+    parser.add_argument("--output", help="Путь для записи метрик в JSON")
+    args = parser.parse_args()
+
+    config = load_dataset_config(CONFIG_PATH, args.dataset_root)
+    try:
+        total = len(split_image_paths(args.split, config)[:args.limit])
+    except (FileNotFoundError, ValueError) as error:
+        print(f"❌ {error}")
+        sys.exit(1)
+    workers = args.workers
+    if workers is None:
+        workers = (os.cpu_count() or 1) if total >= POOL_MIN_IMAGES else 1
+
+    if workers > 1:
+        runner = DetectorPool(args.model, backend=args.backend, num_workers=workers,
+                              slots_per_worker=args.batch_size)
+    else:
+        runner = TrafficSignDetector(args.model, backend=args.backend)
+
+    def report_progress(done, total):
+        print(f"\r⏳ {done}/{total} изобр.", end="", flush=True)
+
+    with runner if isinstance(runner, DetectorPool) else nullcontext(runner):
+        report = evaluate_split(
+            runner,
+            split=args.split,
+            conf_threshold=args.conf,
+            iou_threshold=args.iou,
+            img_size=args.img_size,
+            batch_size=args.batch_size,
+            decode_workers=args.decode_workers,
+            limit=args.limit,
+            dataset_root=args.dataset_root,
+            progress=report_progress
+        )
+
+    print(f"\n\n### Метрики качества ({args.split}, {report['images']} изобр., "
+          f"img_size={args.img_size}, {args.backend})\n")
+    print(metrics_table(report))
+    print(f"\n⚡ {report['images_per_second']:.1f} изобр./с за {report['seconds']:.1f} с")
+    if report['errors']:
+        print(f"⚠️ Пропущено нечитаемых файлов: {len(report['errors'])}")
+        for error in report['errors']:
+            print(f"   {error['path']}: {error['error']}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"💾 Метрики сохранены: {args.output}")
+
+if __name__ == "__main__":
+    main()
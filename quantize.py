@@ -0,0 +1,90 @@
+"""
+INT8 квантование модели с проверкой точности
+
+Калибрует модель на разбивке датасета из models/traffic_signs.yaml,
+сохраняет INT8 модель OpenVINO рядом с весами и сравнивает mAP50 по
+классам и скорость с исходной FP32 моделью. Код возврата 1 означает,
+что падение mAP50 хотя бы в одном классе превысило --max-drop.
+
+Пример:
+    TRAFFIC_SIGNS_DATASET=/data/car python quantize.py --calibration-split train --eval-split val
+"""
+
+import argparse
+import sys
+
+from config import *
+from utils.backends import resolve_model_path
+from utils.dataset import load_dataset_config
+from utils.reporting import markdown_table
+from utils.quantization import (
+    accuracy_gate, compare_per_class, evaluate_model, model_size_mb, quantize_int8
+)
+
+def main():
+    parser = argparse.ArgumentParser(description="INT8 квантование модели с проверкой точности")
+    parser.add_argument("--model", default=str(MODEL_PATH), help="Путь к весам модели")
+    parser.add_argument("--dataset-root", default=DATASET_ROOT,
+                        help="Корень датасета (по умолчанию из TRAFFIC_SIGNS_DATASET или конфига)")
+    parser.add_argument("--calibration-split", default="train", choices=["train", "val", "test"])
+    parser.add_argument("--fraction", type=float, default=0.1,
+                        help="Доля изображений разбивки для калибровки")
+    parser.add_argument("--eval-split", default="val", choices=["train", "val", "test"])
+    parser.add_argument("--img-size", type=int, default=DEFAULT_IMAGE_SIZE)
+    parser.add_argument("--max-drop", type=float, default=0.01,
+                        help="Допустимое падение mAP50 в любом классе (0.01 = 1 п.п.)")
+    parser.add_argument("--skip-quantize", action="store_true",
+                        help="Только сравнить уже созданную INT8 модель")
+    args = parser.parse_args()
+
+    config = load_dataset_config(CONFIG_PATH, args.dataset_root)
+    eval_kwargs = dict(split=args.eval_split, img_size=args.img_size, dataset_root=args.dataset_root)
+
+    if args.skip_quantize:
+        int8_path = resolve_model_path(args.model, 'openvino-int8')
+    else:
+        int8_path = quantize_int8(
+            args.model,
+            calibration_split=args.calibration_split,
+            img_size=args.img_size,
+            fraction=args.fraction,
+            dataset_root=args.dataset_root
+        )
+    fp32_openvino_path = resolve_model_path(args.model, 'openvino', img_size=args.img_size)
+
+    models = {
+        'PyTorch FP32': args.model,
+        'OpenVINO FP32': fp32_openvino_path,
+        'OpenVINO INT8': int8_path,
+    }
+    reports = {name: evaluate_model(path, **eval_kwargs) for name, path in models.items()}
+    baseline = reports['PyTorch FP32']
+
+    rows = compare_per_class(baseline, reports['OpenVINO INT8'], config['names'])
+    print(f"\n### mAP50 по классам ({args.eval_split})\n")
+    print(markdown_table(
+        ["Класс", "FP32", "INT8", "Δ"],
+        [[r['class_name'], f"{r['baseline']:.1%}", f"{r['candidate']:.1%}", f"{r['delta'] * 100:+.1f} п.п."]
+         for r in rows]
+    ))
+
+    print("\n### Скорость и размер\n")
+    print(markdown_table(
+        ["Модель", "mAP50", "мс/изобр.", "Ускорение", "Размер, МБ"],
+        [[
+            name,
+            f"{report['map50']:.1%}",
+            f"{report['ms_per_image']:.1f}",
+            f"{baseline['ms_per_image'] / report['ms_per_image']:.2f}x",
+            f"{model_size_mb(models[name]):.1f}"
+        ] for name, report in reports.items()]
+    ))
+
+    failed = accuracy_gate(rows, args.max_drop)
+    if failed:
+        print(f"\n❌ Падение mAP50 больше {args.max_drop:.1%} в классах: {', '.join(failed)}")
+        sys.exit(1)
+    print(f"\n✅ Проверка точности пройдена (допустимое падение {args.max_drop:.1%})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,488 @@
+"""
+HTTP-сервер инференса с динамическим микробатчингом
+
+Запуск:
+    python server.py --port 8000
+
+Эндпоинты:
+    POST /detect?conf=0.5&iou=0.4&img_size=640&model=default  - тело запроса: JPEG/PNG
+    POST /detect?target_ms=100                   - размер входа под целевую задержку
+    GET  /healthz                                - процесс жив
+    GET  /readyz                                 - модель загружена, прогрета и очередь не переполнена
+    GET  /stats                                  - счетчики микробатчинга и метрики детектора
+    GET  /metrics                                - метрики в формате Prometheus
+    GET  /models                                 - версии моделей, время загрузки и память
+    POST /models/activate?name=default&version=v2 - горячая замена активной версии
+    POST /models/reload                          - перечитать манифест реестра
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import time
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from config import *
+from utils.backends import BACKENDS
+from utils.adaptive import ResolutionScheduler
+from utils.batching import MicroBatcher, QueueFullError
+from utils.detection_log import DetectionLogWriter
+from utils.ingest import decode_image
+from utils.metrics import PROMETHEUS_CONTENT_TYPE, DetectorMetrics, JsonLogSink
+from utils.registry import DEFAULT_MODEL, ModelRegistry
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    411: "Length Required",
+    413: "Payload Too Large",
+    429: "Too Many Requests",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+class BadRequest(ValueError):
+    """Некорректный запрос клиента"""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+def results_to_json(results: Dict[str, Any]) -> Dict[str, Any]:
+    """Преобразует результат detect() в JSON-совместимый словарь"""
+    return {
+        'detections': results['detections'].to_list(),
+        'image_shape': list(results['image_shape']),
+        'model_info': results['model_info']
+    }
+
+def _image_size(value: str) -> int:
+    """img_size из запроса: положительный, кратный 32 и не больше лимита"""
+    img_size = int(value)
+    if img_size <= 0 or img_size % 32 or img_size > SERVER_MAX_IMAGE_SIZE:
+        raise BadRequest(f"img_size должен быть кратен 32 и лежать в (0, {SERVER_MAX_IMAGE_SIZE}]: {img_size}")
+    return img_size
+
+def _fraction(name: str, value: Any) -> float:
+    """Порог из запроса: конечное число в [0, 1]"""
+    number = float(value)
+    if not 0.0 <= number <= 1.0:
+        # NaN тоже не проходит сравнение
+        raise BadRequest(f"{name} должен лежать в [0, 1]: {value}")
+    return number
+
+class InferenceServer:
+    """Асинхронный HTTP-сервер вокруг реестра моделей TrafficSignDetector"""
+
+    def __init__(self,
+                 model_path: str = str(MODEL_PATH),
+                 backend: str = INFERENCE_BACKEND,
+                 max_batch_size: int = SERVER_MAX_BATCH_SIZE,
+                 max_wait_ms: float = SERVER_MAX_WAIT_MS,
+                 max_queue_size: int = SERVER_MAX_QUEUE_SIZE,
+                 max_body_bytes: int = SERVER_MAX_BODY_BYTES,
+                 decode_workers: int = SERVER_DECODE_WORKERS,
+                 metrics: Optional[DetectorMetrics] = None,
+                 detection_log: Optional[DetectionLogWriter] = None,
+                 registry_path: Optional[str] = None,
+                 registry_max_bytes: int = REGISTRY_MAX_MB * 2 ** 20,
+                 target_ms: Optional[float] = ADAPTIVE_TARGET_MS):
+        """
+        Args:
+            model_path: Путь к весам модели
+            backend: Движок инференса (см. TrafficSignDetector)
+            max_batch_size: Максимальный размер микропакета
+            max_wait_ms: Окно ожидания пополнения пакета в миллисекундах
+            max_queue_size: Лимит ожидающих запросов; сверх него - 429
+            max_body_bytes: Максимальный размер тела запроса
+            decode_workers: Потоков декодирования изображений
+            metrics: Метрики детектора (по умолчанию создаются без приемников)
+            detection_log: Журнал всех детекций; номер кадра - порядковый
+                номер изображения с запуска сервера
+            registry_path: Манифест реестра моделей (None - одна модель
+                model_path под именем "default")
+            registry_max_bytes: Бюджет памяти на веса загруженных моделей
+            target_ms: Целевая задержка запроса без img_size: размер входа
+                выбирается по задержкам последних запросов из
+                ADAPTIVE_IMAGE_SIZES (None - DEFAULT_IMAGE_SIZE)
+        """
+        self.model_path = model_path
+        self.backend = backend
+        self.max_body_bytes = max_body_bytes
+        self.metrics = metrics if metrics is not None else DetectorMetrics()
+        self.detection_log = detection_log
+        self.registry_path = registry_path
+        self.target_ms = target_ms
+        # Планировщики размера входа по (модель, целевая задержка)
+        self.schedulers: Dict[Tuple[str, float], ResolutionScheduler] = {}
+        self.images_processed = 0
+        self.model_loaded = False
+        self.load_error: Optional[Exception] = None
+        self._load_task = None
+
+        # Модели прогреваются на размерах одиночного и полного пакета и,
+        # если включен адаптивный размер, на всей лестнице размеров
+        self.registry = ModelRegistry(
+            max_bytes=registry_max_bytes,
+            backend=backend,
+            warmup_batch_sizes=sorted({1, max_batch_size}),
+            warmup_img_sizes=sorted({DEFAULT_IMAGE_SIZE, *(ADAPTIVE_IMAGE_SIZES if target_ms else ())}),
+            metrics=self.metrics
+        )
+        self.default_model = DEFAULT_MODEL
+        try:
+            if registry_path:
+                self.registry.load_manifest(registry_path)
+            else:
+                self.registry.register(DEFAULT_MODEL, model_path)
+            names = self.registry.names()
+            if not names:
+                raise ValueError(f"В манифесте {registry_path} нет моделей")
+            if DEFAULT_MODEL not in names:
+                self.default_model = names[0]
+        except (OSError, ValueError, KeyError) as error:
+            # Ошибка отдается через /readyz, как и ошибка загрузки модели
+            self.load_error = error
+
+        # Один поток для модели: пакеты выполняются строго по очереди;
+        # новые версии загружаются в другом потоке и не задерживают пакеты
+        self._model_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+        self.batcher = MicroBatcher(
+            self._process_batch,
+            max_batch_size=max_batch_size,
+            max_wait_ms=max_wait_ms,
+            max_queue_size=max_queue_size,
+            executor=self._model_executor
+        )
+        # Декодирование JPEG/PNG - в своем пуле: не блокирует цикл событий
+        # и не встает в очередь потока модели
+        self._decode_executor = ThreadPoolExecutor(max_workers=decode_workers, thread_name_prefix="decode")
+
+    @property
+    def ready(self) -> bool:
+        return (
+            self.model_loaded
+            and self.batcher.running
+            and self.batcher.queue_size < self.batcher.max_queue_size
+        )
+
+    def _process_batch(self, key: Tuple[str, float, float, int], images: List[np.ndarray]) -> List[Dict[str, Any]]:
+        name, conf, iou, img_size = key
+        # Версия фиксируется на весь пакет: горячая замена не прерывает его,
+        # а выгруженная из памяти версия загружается заново
+        with self.registry.acquire(name) as detector:
+            results = detector.detect_batch(
+                images,
+                conf_threshold=conf,
+                iou_threshold=iou,
+                img_size=img_size,
+                batch_size=len(images)
+            )
+        # Журнал пишется только из потока модели, поэтому без блокировок
+        if self.detection_log is not None:
+            now = time.time()
+            for offset, result in enumerate(results):
+                self.detection_log.append(result['detections'], self.images_processed + offset, now)
+            self.detection_log.flush()
+        self.images_processed += len(results)
+        return [results_to_json(r) for r in results]
+
+    async def start(self, host: str, port: int) -> asyncio.AbstractServer:
+        """Запускает HTTP-сервер; модель загружается в фоне"""
+        await self.batcher.start()
+        server = await asyncio.start_server(self._handle_connection, host, port)
+        self._load_task = asyncio.create_task(self._load_model())
+        return server
+
+    async def _load_model(self):
+        if self.load_error is not None:
+            print(f"❌ Не удалось загрузить модель: {self.load_error}")
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            # /readyz отвечает 200 только после загрузки и прогрева модели по умолчанию
+            await loop.run_in_executor(
+                self._model_executor,
+                partial(self.registry.get, self.default_model)
+            )
+            self.model_loaded = True
+        except Exception as error:
+            self.load_error = error
+            print(f"❌ Не удалось загрузить модель: {error}")
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, target, headers, body = request
+                status, payload = await self._route(method, target, body)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                self._write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except BadRequest as error:
+            self._write_response(writer, error.status, {'error': str(error)}, keep_alive=False)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader):
+        """Читает один HTTP/1.1 запрос; None, если соединение закрыто"""
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+
+        try:
+            method, target, _ = request_line.decode('latin-1').split()
+        except ValueError:
+            raise BadRequest("Некорректная строка запроса")
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        body = b''
+        if method == 'POST':
+            if 'content-length' not in headers:
+                raise BadRequest("Требуется заголовок Content-Length", status=411)
+            try:
+                length = int(headers['content-length'])
+            except ValueError:
+                raise BadRequest("Некорректный Content-Length")
+            if length < 0:
+                raise BadRequest("Некорректный Content-Length")
+            if length > self.max_body_bytes:
+                raise BadRequest("Слишком большое тело запроса", status=413)
+            body = await reader.readexactly(length)
+
+        return method, target, headers, body
+
+    async def _route(self, method: str, target: str, body: bytes) -> Tuple[int, Union[Dict[str, Any], str]]:
+        url = urlsplit(target)
+
+        if url.path == '/healthz':
+            return 200, {'status': 'ok'}
+
+        if url.path == '/readyz':
+            if self.ready:
+                return 200, {'status': 'ready'}
+            if self.load_error is not None:
+                return 503, {'status': 'failed', 'error': str(self.load_error)}
+            return 503, {'status': 'overloaded' if self.model_loaded else 'loading'}
+
+        if url.path == '/stats':
+            return 200, {
+                'queue_size': self.batcher.queue_size,
+                'batches': self.batcher.batches,
+                'items': self.batcher.items,
+                'rejected': self.batcher.rejected,
+                'average_batch_size': self.batcher.average_batch_size,
+                'adaptive': [
+                    {'model': name, **scheduler.state()}
+                    for (name, _), scheduler in self.schedulers.items()
+                ],
+                'detector': self.metrics.snapshot()
+            }
+
+        if url.path == '/metrics':
+            return 200, self.metrics.to_prometheus()
+
+        if url.path == '/models':
+            return 200, {
+                'default': self.default_model,
+                'resident_bytes': self.registry.resident_bytes,
+                'max_bytes': self.registry.max_bytes,
+                'evictions': self.registry.evictions,
+                'models': self.registry.stats()
+            }
+
+        if url.path in ('/models/activate', '/models/reload'):
+            if method != 'POST':
+                return 405, {'error': "Используйте POST"}
+            return await self._update_models(url.path, parse_qs(url.query))
+
+        if url.path == '/detect':
+            if method != 'POST':
+                return 405, {'error': "Используйте POST"}
+            return await self._detect(parse_qs(url.query), body)
+
+        return 404, {'error': f"Неизвестный путь: {url.path}"}
+
+    async def _update_models(self, path: str, query: Dict[str, List[str]]) -> Tuple[int, Dict[str, Any]]:
+        """Горячая замена: загрузка идет в отдельном потоке, пакеты не ждут"""
+        loop = asyncio.get_running_loop()
+        try:
+            if path == '/models/reload':
+                if not self.registry_path:
+                    return 400, {'error': "Сервер запущен без манифеста реестра"}
+                active = await loop.run_in_executor(
+                    None, partial(self.registry.load_manifest, self.registry_path, preload=True)
+                )
+                return 200, {'active': active}
+
+            name = query.get('name', [self.default_model])[0]
+            if 'version' not in query:
+                return 400, {'error': "Не указана версия"}
+            version = query['version'][0]
+            previous = await loop.run_in_executor(None, self.registry.activate, name, version)
+            return 200, {'name': name, 'version': version, 'previous': previous}
+        except KeyError as error:
+            return 404, {'error': str(error.args[0])}
+        except Exception as error:
+            return 500, {'error': str(error)}
+
+    async def _detect(self, query: Dict[str, List[str]], body: bytes) -> Tuple[int, Dict[str, Any]]:
+        if not self.model_loaded:
+            return 503, {'error': "Модель еще загружается"}
+
+        name = query.get('model', [self.default_model])[0]
+        if name not in self.registry.names():
+            return 404, {'error': f"Неизвестная модель: {name}"}
+
+        try:
+            # Явный img_size отключает адаптивный выбор размера
+            scheduler = None
+            if 'img_size' in query:
+                img_size = _image_size(query['img_size'][0])
+            else:
+                target_ms = self.target_ms
+                if 'target_ms' in query:
+                    target_ms = float(query['target_ms'][0])
+                    if not math.isfinite(target_ms) or target_ms <= 0:
+                        raise BadRequest(f"target_ms должен быть положительным: {target_ms}")
+                if target_ms is not None:
+                    scheduler = self._scheduler(name, target_ms)
+                img_size = scheduler.choose() if scheduler is not None else DEFAULT_IMAGE_SIZE
+            key = (
+                name,
+                _fraction('conf', query.get('conf', [DEFAULT_CONFIDENCE])[0]),
+                _fraction('iou', query.get('iou', [DEFAULT_IOU])[0]),
+                img_size
+            )
+            loop = asyncio.get_running_loop()
+            image = await loop.run_in_executor(self._decode_executor, decode_image, body)
+        except (BadRequest, ValueError) as error:
+            return 400, {'error': str(error)}
+
+        try:
+            start = time.perf_counter()
+            payload = await self.batcher.submit(image, key=key)
+            if scheduler is not None:
+                # Задержка с ожиданием в очереди - та, что видит клиент;
+                # ответы из кэша модель не запускали и в замеры не идут
+                latency_ms = (time.perf_counter() - start) * 1000
+                if not payload['model_info'].get('cached'):
+                    scheduler.observe(img_size, latency_ms)
+                payload['model_info'] = {**payload['model_info'], 'adaptive': {
+                    'target_ms': scheduler.target_ms,
+                    'latency_ms': latency_ms,
+                    'estimate_ms': scheduler.estimate_ms(),
+                    'next_img_size': scheduler.choose(),
+                }}
+            return 200, payload
+        except QueueFullError as error:
+            return 429, {'error': str(error)}
+        except Exception as error:
+            return 500, {'error': str(error)}
+
+    def _scheduler(self, name: str, target_ms: float) -> ResolutionScheduler:
+        """Планировщик размера входа, общий для запросов модели с той же целью"""
+        key = (name, target_ms)
+        if key not in self.schedulers:
+            # Состояние хранится на каждую цель, поэтому их число ограничено
+            if len(self.schedulers) >= SERVER_MAX_TARGETS:
+                raise BadRequest(f"Не более {SERVER_MAX_TARGETS} разных target_ms")
+            self.schedulers[key] = ResolutionScheduler(target_ms)
+        return self.schedulers[key]
+
+    @staticmethod
+    def _write_response(writer: asyncio.StreamWriter,
+                        status: int,
+                        payload: Union[Dict[str, Any], str],
+                        keep_alive: bool):
+        # Строка - текст метрик Prometheus, словарь - ответ JSON
+        if isinstance(payload, str):
+            body, content_type = payload.encode('utf-8'), PROMETHEUS_CONTENT_TYPE
+        else:
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            content_type = "application/json; charset=utf-8"
+        headers = [
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        if status == 429:
+            headers.append("Retry-After: 1")
+        writer.write(("\r\n".join(headers) + "\r\n\r\n").encode('latin-1') + body)
+
+async def serve(args: argparse.Namespace):
+    sinks = [JsonLogSink(args.metrics_log)] if args.metrics_log else []
+    app = InferenceServer(
+        model_path=args.model,
+        backend=args.backend,
+        max_batch_size=args.max_batch_size,
+        max_wait_ms=args.max_wait_ms,
+        max_queue_size=args.max_queue_size,
+        decode_workers=args.decode_workers,
+        metrics=DetectorMetrics(sinks=sinks),
+        detection_log=DetectionLogWriter(args.detection_log) if args.detection_log else None,
+        registry_path=args.registry,
+        registry_max_bytes=args.registry_max_mb * 2 ** 20,
+        target_ms=args.target_ms
+    )
+    server = await app.start(args.host, args.port)
+    print(f"🚀 Сервер запущен: http://{args.host}:{args.port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if app.detection_log is not None:
+            app.detection_log.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP-сервер детекции дорожных знаков")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--model", default=str(MODEL_PATH), help="Путь к весам модели")
+    parser.add_argument("--backend", default=INFERENCE_BACKEND, choices=BACKENDS, help="Движок инференса")
+    parser.add_argument("--max-batch-size", type=int, default=SERVER_MAX_BATCH_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=SERVER_MAX_WAIT_MS)
+    parser.add_argument("--max-queue-size", type=int, default=SERVER_MAX_QUEUE_SIZE)
+    parser.add_argument("--decode-workers", type=int, default=SERVER_DECODE_WORKERS,
+                        help="Потоков декодирования изображений")
+    parser.add_argument("--target-ms", type=float, default=ADAPTIVE_TARGET_MS,
+                        help="Целевая задержка запроса: размер входа подбирается из ADAPTIVE_IMAGE_SIZES")
+    parser.add_argument("--metrics-log", default=METRICS_LOG_PATH,
+                        help="Файл для событий детектора в формате JSON Lines")
+    parser.add_argument("--registry", default=MODEL_REGISTRY_PATH,
+                        help="Манифест YAML реестра моделей (utils/registry.py) вместо --model")
+    parser.add_argument("--registry-max-mb", type=int, default=REGISTRY_MAX_MB,
+                        help="Бюджет памяти на веса загруженных моделей")
+    parser.add_argument("--detection-log", default=DETECTION_LOG_DIR,
+                        help="Папка бинарного журнала всех детекций (utils/detection_log.py)")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+import threading
+import time
+import numpy as np
+from collections import deque
+from typing import Dict, List, Any, Optional, Sequence
+
+from config import (
+    DEFAULT_IMAGE_SIZE, ADAPTIVE_IMAGE_SIZES, ADAPTIVE_WINDOW, ADAPTIVE_QUANTILE,
+    ADAPTIVE_MIN_SAMPLES, ADAPTIVE_HEADROOM
+)
+
+class ResolutionScheduler:
+    """
+    Выбор размера входа модели под целевую задержку
+
+    Размер берется из лестницы sizes. После каждого вызова замер
+    задержки добавляется в окно последних замеров текущего размера, и
+    квантиль окна сравнивается с целевой задержкой:
+
+    - квантиль выше цели - размер сразу снижается до наибольшего, для
+      которого прогноз укладывается в цель (задержка пропорциональна
+      числу пикселей входа, поэтому при скачке нагрузки можно пропустить
+      несколько ступеней);
+    - полное окно с прогнозом для следующей ступени не выше
+      headroom * target_ms - размер повышается на одну ступень.
+
+    После смены размера окно очищается: решения принимаются только по
+    замерам нового размера при текущей нагрузке. Безопасен для
+    использования из нескольких потоков (один планировщик на поток
+    запросов или на весь сервер).
+    """
+
+    def __init__(self,
+                 target_ms: float,
+                 sizes: Sequence[int] = ADAPTIVE_IMAGE_SIZES,
+                 initial_size: int = DEFAULT_IMAGE_SIZE,
+                 window: int = ADAPTIVE_WINDOW,
+                 quantile: float = ADAPTIVE_QUANTILE,
+                 min_samples: int = ADAPTIVE_MIN_SAMPLES,
+                 headroom: float = ADAPTIVE_HEADROOM):
+        """
+        Args:
+            target_ms: Целевая задержка вызова в мс
+            sizes: Лестница размеров входа
+            initial_size: Начальный размер (ближайший из лестницы)
+            window: Число последних замеров для оценки задержки
+            quantile: Квантиль окна, который сравнивается с целью
+            min_samples: Минимум замеров нового размера до снижения
+            headroom: Доля цели, в которую должен укладываться прогноз
+                для следующей ступени, чтобы размер повысился
+        """
+        if target_ms <= 0:
+            raise ValueError(f"target_ms должен быть положительным: {target_ms}")
+        if not sizes:
+            raise ValueError("Пустая лестница размеров")
+        if not 0 < headroom <= 1:
+            raise ValueError(f"headroom должен быть в (0, 1]: {headroom}")
+
+        self.target_ms = target_ms
+        self.sizes = sorted(set(int(size) for size in sizes))
+        self.quantile = quantile
+        self.min_samples = min(min_samples, window)
+        self.headroom = headroom
+        self.switches = 0
+
+        self._level = int(np.argmin([abs(size - initial_size) for size in self.sizes]))
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    @property
+    def img_size(self) -> int:
+        """Текущий размер входа"""
+        return self.sizes[self._level]
+
+    def choose(self) -> int:
+        """Размер входа для очередного вызова"""
+        return self.img_size
+
+    def estimate_ms(self) -> Optional[float]:
+        """Квантиль задержки текущего размера по окну (None - нет замеров)"""
+        with self._lock:
+            return self._estimate()
+
+    def observe(self, img_size: int, latency_ms: float) -> int:
+        """
+        Учитывает замер задержки вызова
+
+        Замеры размера, выбранного до последней смены, не учитываются:
+        они относятся к прежней нагрузке или прежней ступени.
+
+        Args:
+            img_size: Размер входа, с которым выполнялся вызов
+            latency_ms: Задержка вызова в мс
+
+        Returns:
+            Размер входа для следующего вызова
+        """
+        with self._lock:
+            if img_size != self.sizes[self._level]:
+                return self.sizes[self._level]
+            self._samples.append(latency_ms)
+            estimate = self._estimate()
+
+            if estimate > self.target_ms and len(self._samples) >= self.min_samples:
+                self._switch(self._fit_level(estimate, self.target_ms))
+            elif (len(self._samples) == self._samples.maxlen
+                  and self._level + 1 < len(self.sizes)
+                  and self._predict(estimate, self._level + 1) <= self.headroom * self.target_ms):
+                self._switch(self._level + 1)
+            return self.sizes[self._level]
+
+    def state(self) -> Dict[str, Any]:
+        """Текущий размер, оценка задержки и число смен размера"""
+        with self._lock:
+            return {
+                'img_size': self.sizes[self._level],
+                'target_ms': self.target_ms,
+                'estimate_ms': self._estimate(),
+                'samples': len(self._samples),
+                'switches': self.switches,
+            }
+
+    def _estimate(self) -> Optional[float]:
+        if not self._samples:
+            return None
+        return float(np.quantile(np.fromiter(self._samples, dtype=np.float64), self.quantile))
+
+    def _predict(self, estimate: float, level: int) -> float:
+        """Прогноз задержки на ступени level по оценке текущей ступени"""
+        return estimate * (self.sizes[level] / self.sizes[self._level]) ** 2
+
+    def _fit_level(self, estimate: float, target_ms: float) -> int:
+        """Наибольшая ступень ниже текущей с прогнозом в пределах цели"""
+        for level in range(self._level - 1, 0, -1):
+            if self._predict(estimate, level) <= target_ms:
+                return level
+        return 0
+
+    def _switch(self, level: int):
+        if level != self._level:
+            self._level = level
+            self._samples.clear()
+            self.switches += 1
+
+def _annotate(result: Dict[str, Any], adaptive: Dict[str, Any]) -> Dict[str, Any]:
+    """Копия результата с model_info['adaptive'] (результат может быть общим с кэшем)"""
+    result = dict(result)
+    result['model_info'] = {**result['model_info'], 'adaptive': adaptive}
+    return result
+
+class AdaptiveDetector:
+    """
+    Детекция с размером входа под целевую задержку
+
+    Обертка над TrafficSignDetector (или DetectorPool): размер входа для
+    каждого вызова выбирает ResolutionScheduler по замерам предыдущих
+    вызовов. Выбранный размер записывается в model_info['img_size'],
+    а состояние планировщика - в model_info['adaptive']. Вызовы с
+    результатами из кэша детектора (model_info['cached']) в замеры не
+    попадают. Один экземпляр на поток кадров (видео, камера) или общий
+    для запросов сервиса.
+    """
+
+    def __init__(self,
+                 detector: Any,
+                 target_ms: float,
+                 scheduler: Optional[ResolutionScheduler] = None,
+                 **scheduler_kwargs: Any):
+        """
+        Args:
+            detector: Экземпляр TrafficSignDetector или DetectorPool
+            target_ms: Целевая задержка вызова в мс
+            scheduler: Готовый планировщик (например, общий для
+                нескольких оберток); по умолчанию создается новый
+            **scheduler_kwargs: Параметры ResolutionScheduler
+        """
+        self.detector = detector
+        self.scheduler = scheduler or ResolutionScheduler(target_ms, **scheduler_kwargs)
+
+    def warmup(self, **kwargs: Any):
+        """Прогревает TrafficSignDetector на всех размерах лестницы"""
+        self.detector.warmup(img_sizes=self.scheduler.sizes, **kwargs)
+
+    def detect(self, image: np.ndarray, **kwargs: Any) -> Dict[str, Any]:
+        """
+        Детекция на изображении с выбранным размером входа
+
+        Args:
+            image: Изображение в формате numpy array (RGB)
+            **kwargs: Параметры detect(), кроме img_size
+
+        Returns:
+            Словарь с результатами детекции (см. TrafficSignDetector.detect())
+        """
+        return self._run(self.detector.detect, image, **kwargs)
+
+    def detect_batch(self, images: List[np.ndarray], **kwargs: Any) -> List[Dict[str, Any]]:
+        """
+        Детекция на пакете с одним размером входа; цель относится к
+        задержке всего вызова
+
+        Args:
+            images: Список изображений в формате numpy array (RGB)
+            **kwargs: Параметры detect_batch(), кроме img_size
+        """
+        return self._run(self.detector.detect_batch, images, **kwargs)
+
+    def _run(self, method: Any, source: Any, **kwargs: Any) -> Any:
+        if 'img_size' in kwargs:
+            raise ValueError("img_size выбирается планировщиком, задайте target_ms")
+
+        img_size = self.scheduler.choose()
+        start = time.perf_counter()
+        results = method(source, img_size=img_size, **kwargs)
+        latency_ms = (time.perf_counter() - start) * 1000
+        # Попадания в кэш не обращаются к модели и занизили бы оценку
+        # задержки; пакет учитывается, только если в нем нет попаданий
+        batch = results if isinstance(results, list) else [results]
+        if not any(result['model_info'].get('cached') for result in batch):
+            self.scheduler.observe(img_size, latency_ms)
+
+        adaptive = {
+            'target_ms': self.scheduler.target_ms,
+            'latency_ms': latency_ms,
+            'estimate_ms': self.scheduler.estimate_ms(),
+            'next_img_size': self.scheduler.choose(),
+        }
+        if isinstance(results, list):
+            return [_annotate(result, adaptive) for result in results]
+        return _annotate(results, adaptive)
@@ -0,0 +1,235 @@
+import asyncio
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, List, Any, Awaitable, Callable, Hashable, Optional, Tuple
+
+from config import ASYNC_MAX_WORKERS, ASYNC_MAX_CONCURRENCY, ASYNC_MAX_BATCH_SIZE, ASYNC_MAX_WAIT_MS
+from utils.batching import MicroBatcher, QueueFullError
+
+class AsyncDetector:
+    """
+    Асинхронный интерфейс к TrafficSignDetector для сервисов на asyncio
+
+    Инференс выполняется в собственном ограниченном пуле потоков, поэтому
+    цикл событий не блокируется. Число вызовов в работе ограничено
+    семафором, остальные ждут в цикле событий без потоков; сверх
+    max_pending ожидающих вызов сразу получает QueueFullError. Отмена
+    задачи, чей вызов еще не начал выполняться, снимает его из очереди
+    пула; начавшийся вызов дорабатывает, но место в лимите освобождается
+    только после его завершения. С coalesce=True одновременные вызовы с
+    одинаковыми параметрами объединяются в пакеты detect_batch()
+    (MicroBatcher).
+
+    Предиктор ultralytics не рассчитан на одновременные вызовы из разных
+    потоков, поэтому для TrafficSignDetector используется max_workers=1;
+    несколько потоков имеют смысл для DetectorPool.
+    """
+
+    def __init__(self,
+                 detector: Any,
+                 max_workers: int = ASYNC_MAX_WORKERS,
+                 max_concurrency: int = ASYNC_MAX_CONCURRENCY,
+                 max_pending: Optional[int] = None,
+                 coalesce: bool = False,
+                 max_batch_size: int = ASYNC_MAX_BATCH_SIZE,
+                 max_wait_ms: float = ASYNC_MAX_WAIT_MS):
+        """
+        Args:
+            detector: Экземпляр TrafficSignDetector или DetectorPool
+            max_workers: Потоков пула инференса
+            max_concurrency: Вызовов одновременно в пуле и в очереди пакетов
+            max_pending: Лимит вызовов, ожидающих места (None - без лимита)
+            coalesce: Объединять одновременные вызовы в пакеты
+            max_batch_size: Максимальный размер пакета при coalesce
+            max_wait_ms: Окно ожидания пополнения пакета при coalesce
+        """
+        if max_workers < 1 or max_concurrency < 1:
+            raise ValueError(f"max_workers и max_concurrency должны быть положительными: "
+                             f"{max_workers}, {max_concurrency}")
+
+        self.detector = detector
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="async-detector")
+        self.batcher = MicroBatcher(
+            self._process_batch,
+            max_batch_size=max_batch_size,
+            max_wait_ms=max_wait_ms,
+            max_queue_size=max_concurrency,
+            executor=self.executor
+        ) if coalesce else None
+
+        self.completed = 0
+        self.cancelled = 0
+        self.rejected = 0
+        self._pending = 0
+        self._in_flight = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def pending(self) -> int:
+        """Вызовов, ожидающих места в лимите"""
+        return self._pending
+
+    @property
+    def in_flight(self) -> int:
+        """Вызовов в пуле и в очереди пакетов"""
+        return self._in_flight
+
+    async def detect_async(self, image: np.ndarray, **kwargs: Any) -> Dict[str, Any]:
+        """
+        Детекция на изображении без блокировки цикла событий
+
+        Args:
+            image: Изображение в формате numpy array (RGB)
+            **kwargs: Параметры detect()
+
+        Returns:
+            Словарь с результатами детекции (см. TrafficSignDetector.detect())
+
+        Raises:
+            QueueFullError: Если ожидающих вызовов больше max_pending
+        """
+        if self.batcher is not None:
+            return await self._limited(self._submit_coalesced, image, kwargs)
+        return await self._limited(self._offload, partial(self.detector.detect, image, **kwargs))
+
+    async def detect_many_async(self,
+                                images: List[np.ndarray],
+                                batch_size: int = ASYNC_MAX_BATCH_SIZE,
+                                **kwargs: Any) -> List[Dict[str, Any]]:
+        """
+        Детекция на наборе изображений; отмена или ошибка одной из частей
+        отменяет остальные
+
+        Без coalesce изображения делятся на пакеты по batch_size, каждый
+        пакет - один вызов detect_batch() в пуле. С coalesce изображения
+        передаются по одному и объединяются в пакеты вместе с вызовами
+        других задач.
+
+        Args:
+            images: Список изображений в формате numpy array (RGB)
+            batch_size: Размер пакета без coalesce
+            **kwargs: Параметры detect_batch()
+
+        Returns:
+            Список результатов в порядке входных изображений
+        """
+        if batch_size < 1:
+            raise ValueError(f"batch_size должен быть положительным: {batch_size}")
+
+        if self.batcher is not None:
+            return await _gather_or_cancel([self.detect_async(image, **kwargs) for image in images])
+
+        chunks = await _gather_or_cancel([
+            self._limited(self._offload, partial(
+                self.detector.detect_batch, images[start:start + batch_size],
+                batch_size=batch_size, **kwargs
+            ))
+            for start in range(0, len(images), batch_size)
+        ])
+        return [result for chunk in chunks for result in chunk]
+
+    async def aclose(self):
+        """Останавливает пакетирование и пул потоков"""
+        if self.batcher is not None:
+            await self.batcher.stop()
+        await asyncio.get_running_loop().run_in_executor(None, partial(self.executor.shutdown, wait=True))
+
+    async def __aenter__(self) -> "AsyncDetector":
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики вызовов и, при coalesce, пакетов"""
+        stats = {
+            'in_flight': self.in_flight,
+            'pending': self.pending,
+            'completed': self.completed,
+            'cancelled': self.cancelled,
+            'rejected': self.rejected,
+        }
+        if self.batcher is not None:
+            stats['batches'] = self.batcher.batches
+            stats['average_batch_size'] = self.batcher.average_batch_size
+        return stats
+
+    def _bind_loop(self):
+        """Семафор создается в цикле событий первого вызова"""
+        loop = asyncio.get_running_loop()
+        if self._loop is None:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        elif self._loop is not loop:
+            raise RuntimeError("AsyncDetector используется из другого цикла событий")
+
+    async def _limited(self, run: Callable[..., Any], *args: Any) -> Any:
+        """Выполняет вызов в пределах лимита одновременных вызовов"""
+        self._bind_loop()
+        if self.max_pending is not None and self._semaphore.locked() and self._pending >= self.max_pending:
+            self.rejected += 1
+            raise QueueFullError("Слишком много ожидающих вызовов детектора")
+
+        self._pending += 1
+        try:
+            await self._semaphore.acquire()
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self._pending -= 1
+        self._in_flight += 1
+
+        try:
+            result = await run(*args)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        self.completed += 1
+        return result
+
+    async def _offload(self, call: Callable[[], Any]) -> Any:
+        """
+        Вызов в пуле; место в лимите освобождается по завершении потока,
+        а не по отмене ожидающей задачи
+        """
+        loop = asyncio.get_running_loop()
+        future = self.executor.submit(call)
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release))
+        return await asyncio.wrap_future(future)
+
+    async def _submit_coalesced(self, image: np.ndarray, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Запрос в очередь пакетов; место в лимите освобождается, когда
+        запрос покидает батчер (отмененный, но уже попавший в пакет запрос
+        держит место до конца пакета)
+        """
+        await self.batcher.start()
+        return await self.batcher.submit(image, key=_batch_key(kwargs), on_complete=self._release)
+
+    def _release(self):
+        self._in_flight -= 1
+        self._semaphore.release()
+
+    def _process_batch(self, key: Tuple[Tuple[str, Hashable], ...], images: List[np.ndarray]) -> List[Dict[str, Any]]:
+        return self.detector.detect_batch(images, batch_size=len(images), **dict(key))
+
+async def _gather_or_cancel(calls: List[Awaitable[Any]]) -> List[Any]:
+    """Как asyncio.gather, но при первой ошибке отменяет остальные вызовы"""
+    tasks = [asyncio.ensure_future(call) for call in calls]
+    try:
+        return list(await asyncio.gather(*tasks))
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        # Дожидаемся отмены, чтобы вызовы успели освободить места в лимите
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+def _batch_key(kwargs: Dict[str, Any]) -> Tuple[Tuple[str, Hashable], ...]:
+    """В один пакет попадают только вызовы с одинаковыми параметрами"""
+    return tuple(sorted(kwargs.items()))
@@ -0,0 +1,99 @@
+import importlib.util
+from pathlib import Path
+from typing import Union
+
+from config import DEFAULT_IMAGE_SIZE
+
+# Поддерживаемые движки инференса
+BACKENDS = ('pytorch', 'onnx', 'openvino', 'openvino-int8')
+
+# Пакеты, необходимые для каждого движка (кроме PyTorch)
+BACKEND_REQUIREMENTS = {
+    'onnx': ('onnxruntime', "pip install onnx onnxruntime"),
+    'openvino': ('openvino', "pip install openvino"),
+    'openvino-int8': ('openvino', "pip install openvino nncf"),
+}
+
+def check_backend(backend: str):
+    """
+    Проверяет, что движок известен и его зависимости установлены
+
+    Args:
+        backend: Название движка из BACKENDS
+
+    Raises:
+        ValueError: Неизвестный движок
+        ImportError: Не установлен пакет движка
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Неизвестный движок: {backend}. Допустимые: {BACKENDS}")
+
+    if backend in BACKEND_REQUIREMENTS:
+        module, hint = BACKEND_REQUIREMENTS[backend]
+        if importlib.util.find_spec(module) is None:
+            raise ImportError(f"Для движка '{backend}' нужен пакет {module}: {hint}")
+
+def exported_model_path(model_path: Union[str, Path], backend: str) -> Path:
+    """
+    Путь, по которому ultralytics сохраняет экспортированную модель
+
+    Args:
+        model_path: Путь к весам PyTorch (.pt)
+        backend: Название движка
+
+    Returns:
+        Путь к файлу .onnx или к папке модели OpenVINO
+    """
+    model_path = Path(model_path)
+    if backend == 'onnx':
+        return model_path.with_suffix('.onnx')
+    if backend == 'openvino':
+        return model_path.parent / f"{model_path.stem}_openvino_model"
+    if backend == 'openvino-int8':
+        return model_path.parent / f"{model_path.stem}_int8_openvino_model"
+    return model_path
+
+def resolve_model_path(model_path: Union[str, Path],
+                       backend: str = 'pytorch',
+                       img_size: int = DEFAULT_IMAGE_SIZE) -> str:
+    """
+    Возвращает путь к модели для выбранного движка
+
+    Если экспортированной модели нет или она старше весов .pt, она
+    экспортируется локально из model_path. Экспорт выполняется с
+    динамическими осями, чтобы поддерживать пакеты и разные размеры входа.
+
+    Args:
+        model_path: Путь к весам PyTorch (.pt)
+        backend: Название движка из BACKENDS
+        img_size: Размер входа, с которым выполняется экспорт
+
+    Returns:
+        Путь, который можно передать в YOLO()
+    """
+    check_backend(backend)
+
+    model_path = Path(model_path)
+    if backend == 'pytorch':
+        return str(model_path)
+
+    target = exported_model_path(model_path, backend)
+    if target.exists() and target.stat().st_mtime >= model_path.stat().st_mtime:
+        return str(target)
+
+    if backend == 'openvino-int8':
+        # Квантование требует калибровочных данных и проверки точности
+        raise FileNotFoundError(
+            f"INT8 модель не найдена или устарела: {target}. "
+            f"Создайте ее командой: python quantize.py --model {model_path}"
+        )
+
+    from ultralytics import YOLO
+
+    print(f"📦 Экспорт модели в формат {backend}: {target}")
+    exported = YOLO(str(model_path)).export(
+        format=backend,
+        imgsz=img_size,
+        dynamic=True
+    )
+    return str(exported)
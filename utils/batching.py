@@ -0,0 +1,219 @@
+import asyncio
+from concurrent.futures import Executor
+from functools import partial
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+class QueueFullError(RuntimeError):
+    """Очередь запросов переполнена, запрос нужно повторить позже"""
+
+class MicroBatcher:
+    """
+    Динамическое объединение конкурентных запросов в пакеты
+
+    Запросы с одинаковым ключом, пришедшие в пределах окна max_wait_ms,
+    обрабатываются одним вызовом process_batch. Сам вызов блокирующий и
+    выполняется в пуле потоков, чтобы не останавливать цикл событий.
+    """
+
+    def __init__(self,
+                 process_batch: Callable[[Hashable, List[Any]], List[Any]],
+                 max_batch_size: int = 8,
+                 max_wait_ms: float = 5.0,
+                 max_queue_size: int = 64,
+                 executor: Optional[Executor] = None):
+        """
+        Args:
+            process_batch: Функция (ключ, список входов) -> список результатов
+            max_batch_size: Максимальный размер пакета
+            max_wait_ms: Сколько ждать пополнения пакета после первого запроса
+            max_queue_size: Максимальное число ожидающих запросов
+            executor: Пул для process_batch (по умолчанию пул цикла событий)
+        """
+        if max_batch_size < 1:
+            raise ValueError(f"max_batch_size должен быть положительным: {max_batch_size}")
+
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_queue_size = max_queue_size
+        self.executor = executor
+
+        self.batches = 0
+        self.items = 0
+        self.rejected = 0
+
+        self._queue = None
+        self._worker = None
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and not self._worker.done()
+
+    @property
+    def queue_size(self) -> int:
+        """Число запросов, ожидающих обработки"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    @property
+    def average_batch_size(self) -> float:
+        return self.items / self.batches if self.batches else 0.0
+
+    async def start(self):
+        """Запускает фоновую задачу формирования пакетов"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Останавливает обработку; все незавершенные запросы, в том числе
+        уже собранные в пакет, получают отмену. on_complete запросов
+        пакета, который выполняется в потоке, вызывается после его
+        завершения
+        """
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+        while self._queue is not None and not self._queue.empty():
+            _, _, future, on_complete = self._queue.get_nowait()
+            _cancel([(future, on_complete)])
+
+    async def submit(self,
+                     item: Any,
+                     key: Hashable = None,
+                     on_complete: Optional[Callable[[], None]] = None) -> Any:
+        """
+        Ставит запрос в очередь и ждет его результата
+
+        Отмена ожидающей задачи не останавливает пакет, в который запрос
+        уже попал; момент, когда запрос действительно покинул батчер,
+        сообщает on_complete.
+
+        Args:
+            item: Входные данные запроса
+            key: Ключ группировки; в один пакет попадают только запросы
+                с одинаковым ключом (например, с одинаковыми параметрами)
+            on_complete: Вызывается в цикле событий ровно один раз: после
+                обработки пакета с запросом, при пропуске отмененного
+                запроса, при остановке или отказе в постановке в очередь
+
+        Returns:
+            Результат process_batch для этого запроса
+
+        Raises:
+            QueueFullError: Если очередь переполнена
+        """
+        if not self.running:
+            _complete(on_complete)
+            raise RuntimeError("MicroBatcher не запущен")
+
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((key, item, future, on_complete))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            _complete(on_complete)
+            raise QueueFullError("Очередь запросов переполнена")
+
+        return await future
+
+    async def _collect(self, batch: List[Any]):
+        """
+        Собирает пакет в batch: первый запрос ждет без ограничений,
+        остальные - до max_wait. Список передается снаружи, чтобы при
+        остановке были видны уже взятые из очереди запросы
+        """
+        loop = asyncio.get_running_loop()
+        batch.append(await self._queue.get())
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            # Запросы, взятые из очереди, stop() уже не видит: при
+            # остановке они отменяются здесь
+            batch: List[Any] = []
+            try:
+                await self._collect(batch)
+            except asyncio.CancelledError:
+                _cancel((future, on_complete) for _, _, future, on_complete in batch)
+                raise
+
+            # Группируем по ключу, пропуская отмененные запросы
+            groups: Dict[Hashable, List[Any]] = {}
+            for key, item, future, on_complete in batch:
+                if future.done():
+                    _complete(on_complete)
+                else:
+                    groups.setdefault(key, []).append((item, future, on_complete))
+
+            group_list = list(groups.items())
+            for index, (key, entries) in enumerate(group_list):
+                items = [item for item, _, _ in entries]
+                job = loop.run_in_executor(self.executor, self.process_batch, key, items)
+                try:
+                    # Остановка не прерывает поток с пакетом, поэтому
+                    # ожидание защищено от отмены, а on_complete этих
+                    # запросов вызывается только по завершении потока
+                    results = await asyncio.shield(job)
+                except asyncio.CancelledError:
+                    for _, future, _ in entries:
+                        future.cancel()
+                    job.add_done_callback(partial(
+                        _complete_after_job, [on_complete for _, _, on_complete in entries]
+                    ))
+                    _cancel(
+                        (future, on_complete)
+                        for _, rest in group_list[index + 1:]
+                        for _, future, on_complete in rest
+                    )
+                    raise
+                except Exception as error:
+                    for _, future, _ in entries:
+                        if not future.done():
+                            future.set_exception(error)
+                    results = None
+
+                for _, _, on_complete in entries:
+                    _complete(on_complete)
+                if results is None:
+                    continue
+
+                self.batches += 1
+                self.items += len(entries)
+                for (_, future, _), result in zip(entries, results):
+                    if not future.done():
+                        future.set_result(result)
+
+def _complete(on_complete: Optional[Callable[[], None]]):
+    if on_complete is not None:
+        on_complete()
+
+def _cancel(requests: Iterable[Tuple[asyncio.Future, Optional[Callable[[], None]]]]):
+    """Отменяет запросы, которые еще не начали обрабатываться"""
+    for future, on_complete in requests:
+        future.cancel()
+        _complete(on_complete)
+
+def _complete_after_job(callbacks: List[Optional[Callable[[], None]]], job: asyncio.Future):
+    """on_complete запросов пакета, дорабатывавшего в потоке после остановки"""
+    if not job.cancelled():
+        job.exception()
+    for on_complete in callbacks:
+        _complete(on_complete)
@@ -0,0 +1,302 @@
+import importlib.util
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import Dict, List, Any, Callable, Iterator, Optional, Union
+
+from utils.dataset import IMAGE_SUFFIXES
+from utils.ingest import decode_ahead
+
+# Форматы вывода: JSONL - один файл, Parquet - папка с частями по пакетам
+OUTPUT_FORMATS = ('jsonl', 'parquet')
+
+def iter_image_paths(root: Union[str, Path]) -> Iterator[Path]:
+    """
+    Обходит дерево папок и выдает изображения в детерминированном порядке
+
+    Папки и файлы сортируются на каждом уровне, поэтому при повторном
+    запуске на том же дереве порядок совпадает и продолжение с N-го
+    изображения корректно. Список всех путей не строится.
+
+    Args:
+        root: Корневая папка
+
+    Yields:
+        Пути к изображениям
+    """
+    root = Path(root)
+    if not root.is_dir():
+        raise FileNotFoundError(f"Папка не найдена: {root}")
+
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        with os.scandir(directory) as entries:
+            entries = sorted(entries, key=lambda entry: entry.name)
+        subdirs = []
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(Path(entry.path))
+            elif Path(entry.name).suffix.lower() in IMAGE_SUFFIXES:
+                yield Path(entry.path)
+        stack.extend(reversed(subdirs))
+
+def output_format(path: Union[str, Path]) -> str:
+    """Формат вывода по расширению пути ('.parquet' - Parquet, иначе JSONL)"""
+    return 'parquet' if Path(path).suffix.lower() == '.parquet' else 'jsonl'
+
+class JsonlWriter:
+    """Запись результатов в один файл JSON Lines с позицией для продолжения"""
+
+    def __init__(self, path: Union[str, Path], state: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            path: Путь к файлу
+            state: Состояние из checkpoint (None - новый файл)
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        offset = state['offset'] if state else 0
+
+        if offset and not self.path.exists():
+            raise FileNotFoundError(f"Файл результатов для продолжения не найден: {self.path}")
+
+        # Строки, записанные после последней контрольной точки, отбрасываются
+        self._file = open(self.path, 'r+b' if offset else 'wb')
+        self._file.truncate(offset)
+        self._file.seek(offset)
+
+    def write(self, records: List[Dict[str, Any]]):
+        lines = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+        self._file.write(lines.encode('utf-8'))
+
+    def checkpoint(self) -> Dict[str, Any]:
+        """Сбрасывает данные на диск и возвращает состояние для продолжения"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return {'offset': self._file.tell()}
+
+    def close(self):
+        self._file.close()
+
+class ParquetWriter:
+    """
+    Запись результатов в папку Parquet: одна часть на пакет изображений
+
+    Детекции хранятся списком структур с полями bbox, confidence,
+    class_id и class_name. Нужен пакет pyarrow.
+    """
+
+    def __init__(self, path: Union[str, Path], state: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            path: Папка для частей
+            state: Состояние из checkpoint (None - новая папка)
+        """
+        if importlib.util.find_spec('pyarrow') is None:
+            raise ImportError("Для вывода в Parquet нужен пакет pyarrow: pip install pyarrow")
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa, self._pq = pa, pq
+        self.schema = pa.schema([
+            ('path', pa.string()),
+            ('width', pa.int32()),
+            ('height', pa.int32()),
+            ('error', pa.string()),
+            ('detections', pa.list_(pa.struct([
+                ('bbox', pa.list_(pa.int32(), 4)),
+                ('confidence', pa.float32()),
+                ('class_id', pa.int32()),
+                ('class_name', pa.string()),
+            ]))),
+        ])
+
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.parts = state['parts'] if state else 0
+
+        # Части после последней контрольной точки отбрасываются
+        for part in self.path.glob('part-*.parquet'):
+            if int(part.stem.split('-')[1]) >= self.parts:
+                part.unlink()
+
+    def write(self, records: List[Dict[str, Any]]):
+        table = self._pa.Table.from_pylist(
+            [{'detections': None, 'width': None, 'height': None, 'error': None, **record}
+             for record in records],
+            schema=self.schema
+        )
+        self._pq.write_table(table, self.path / f"part-{self.parts:06d}.parquet")
+        self.parts += 1
+
+    def checkpoint(self) -> Dict[str, Any]:
+        return {'parts': self.parts}
+
+    def close(self):
+        pass
+
+def open_writer(path: Union[str, Path], fmt: str, state: Optional[Dict[str, Any]] = None):
+    """Создает JsonlWriter или ParquetWriter"""
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"Неизвестный формат вывода: {fmt}. Допустимые: {OUTPUT_FORMATS}")
+    return ParquetWriter(path, state) if fmt == 'parquet' else JsonlWriter(path, state)
+
+def load_checkpoint(path: Path) -> Optional[Dict[str, Any]]:
+    """Читает контрольную точку (None, если ее нет)"""
+    if not path.exists():
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def save_checkpoint(path: Path, state: Dict[str, Any]):
+    """Атомарно записывает контрольную точку (через временный файл)"""
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+def detect_folder(detector,
+                  root: Union[str, Path],
+                  output: Union[str, Path],
+                  fmt: Optional[str] = None,
+                  conf_threshold: float = 0.5,
+                  iou_threshold: float = 0.4,
+                  img_size: int = 640,
+                  batch_size: int = 16,
+                  chunk_size: int = 256,
+                  decode_workers: int = 4,
+                  resume: bool = True,
+                  progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """
+    Детекция на всех изображениях дерева папок с записью по пакетам
+
+    Изображения декодируются пулом потоков; следующий пакет декодируется,
+    пока модель обрабатывает текущий, и в памяти держатся только пакеты
+    по batch_size изображений (на каждый воркер DetectorPool). Результаты
+    записываются порциями по chunk_size изображений, после каждой
+    сохраняется контрольная точка (<output>.checkpoint.json), и
+    прерванный запуск продолжается с первого незаписанного изображения.
+    Файлы, которые не удалось прочитать, записываются с полем 'error'.
+
+    Args:
+        detector: TrafficSignDetector (или совместимый объект с detect_batch())
+        root: Корневая папка с изображениями
+        output: Файл .jsonl или папка .parquet
+        fmt: 'jsonl' или 'parquet' (по умолчанию по расширению output)
+        conf_threshold: Порог уверенности
+        iou_threshold: Порог IoU для NMS
+        img_size: Размер входа модели
+        batch_size: Размер пакета detect_batch()
+        chunk_size: Изображений между записями и контрольными точками
+            (округляется вверх до целого числа пакетов); на память под
+            изображения не влияет
+        decode_workers: Потоков декодирования
+        resume: Продолжить по контрольной точке (False - начать заново)
+        progress: Функция, получающая сводку после каждой записи
+
+    Returns:
+        Сводка: 'processed', 'errors', 'detections', 'seconds',
+        'images_per_second' (за этот запуск) и 'resumed_from'
+    """
+    root, output = Path(root), Path(output)
+    fmt = fmt or output_format(output)
+    checkpoint_path = output.with_name(output.name + '.checkpoint.json')
+    params = {
+        'root': str(root.resolve()),
+        'format': fmt,
+        'conf_threshold': conf_threshold,
+        'iou_threshold': iou_threshold,
+        'img_size': img_size,
+        'model_version': getattr(detector, 'model_version', None),
+    }
+
+    if not resume and checkpoint_path.exists():
+        checkpoint_path.unlink()
+    state = load_checkpoint(checkpoint_path)
+    if state is not None and state['params'] != params:
+        raise ValueError(
+            f"Контрольная точка {checkpoint_path} создана с другими параметрами: "
+            f"{state['params']}. Начните заново (resume=False или --restart)"
+        )
+
+    writer = open_writer(output, fmt, state['writer'] if state else None)
+    processed = state['processed'] if state else 0
+    errors = state['errors'] if state else 0
+    detections = state['detections'] if state else 0
+    resumed_from = processed
+
+    start = time.perf_counter()
+
+    def flush(records: List[Dict[str, Any]], processed: int) -> int:
+        """Записывает порцию и сохраняет контрольную точку"""
+        writer.write(records)
+        processed += len(records)
+        save_checkpoint(checkpoint_path, {
+            'params': params,
+            'processed': processed,
+            'errors': errors,
+            'detections': detections,
+            'writer': writer.checkpoint(),
+        })
+        if progress is not None:
+            progress({
+                'processed': processed,
+                'errors': errors,
+                'images_per_second': (processed - resumed_from) / (time.perf_counter() - start),
+            })
+        return processed
+
+    # Шаг декодирования - пакет на каждый воркер пула (один для
+    # TrafficSignDetector); chunk_size задает только частоту записи
+    step = batch_size * getattr(detector, 'num_workers', 1)
+    paths = islice(iter_image_paths(root), processed, None)
+    records = []
+    with ThreadPoolExecutor(max_workers=decode_workers, thread_name_prefix="decode") as pool:
+        try:
+            for batch in decode_ahead(paths, pool, step):
+                images = [image for _, image in batch if not isinstance(image, Exception)]
+                results = iter(detector.detect_batch(
+                    images,
+                    conf_threshold=conf_threshold,
+                    iou_threshold=iou_threshold,
+                    img_size=img_size,
+                    batch_size=batch_size
+                ))
+                del images
+
+                for path, image in batch:
+                    record = {'path': path.relative_to(root).as_posix()}
+                    if isinstance(image, Exception):
+                        record['error'] = str(image)
+                        errors += 1
+                    else:
+                        result = next(results)
+                        record['width'], record['height'] = image.shape[1], image.shape[0]
+                        record['detections'] = result['detections'].to_list()
+                        detections += len(result['detections'])
+                    records.append(record)
+                # Декодированные кадры не должны дожидаться следующего пакета
+                del batch, image
+
+                if len(records) >= chunk_size:
+                    processed = flush(records, processed)
+                    records = []
+
+            if records:
+                processed = flush(records, processed)
+        finally:
+            writer.close()
+
+    seconds = time.perf_counter() - start
+    return {
+        'processed': processed,
+        'errors': errors,
+        'detections': detections,
+        'seconds': seconds,
+        'images_per_second': (processed - resumed_from) / seconds if seconds > 0 else 0.0,
+        'resumed_from': resumed_from,
+    }
@@ -0,0 +1,245 @@
+import hashlib
+import os
+import pickle
+import threading
+import numpy as np
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, Optional, Union
+
+# Оценка накладных расходов на одну запись (словари, ключ, Python-объекты)
+ENTRY_OVERHEAD_BYTES = 512
+
+def model_fingerprint(path: Union[str, Path]) -> str:
+    """
+    Хэш содержимого модели (файла весов или папки экспорта)
+
+    Args:
+        path: Путь к модели
+
+    Returns:
+        Шестнадцатеричный хэш; меняется при любом изменении весов
+    """
+    path = Path(path)
+    files = [path] if path.is_file() else sorted(p for p in path.rglob('*') if p.is_file())
+
+    digest = hashlib.blake2b(digest_size=16)
+    for file in files:
+        digest.update(str(file.relative_to(path) if file != path else file.name).encode())
+        with open(file, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+def cache_key(image: np.ndarray, model_version: str, **params: Any) -> str:
+    """
+    Ключ кэша по содержимому изображения, версии модели и параметрам
+
+    Args:
+        image: Изображение в формате numpy array
+        model_version: Результат model_fingerprint()
+        **params: Параметры детекции (conf, iou, img_size и т.д.)
+
+    Returns:
+        Шестнадцатеричный ключ
+    """
+    image = np.ascontiguousarray(image)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{image.shape}{image.dtype.str}{model_version}".encode())
+    digest.update(repr(sorted(params.items())).encode())
+    digest.update(memoryview(image).cast('B'))
+    return digest.hexdigest()
+
+def _entry_nbytes(value: Any) -> int:
+    """Оценка размера результата detect() или CandidateSet в памяти"""
+    detections = value['detections'] if isinstance(value, dict) else value.detections
+    return detections.nbytes + ENTRY_OVERHEAD_BYTES
+
+class ResultCache:
+    """
+    LRU-кэш результатов детекции с ограничением по памяти
+
+    Ключ строится по содержимому изображения, поэтому повторные запуски
+    Streamlit и пересекающиеся наборы фотографий не запускают модель
+    повторно. Необязательный дисковый уровень переживает перезапуск
+    процесса; из него вытесняются давно не использованные файлы, когда
+    общий размер превышает лимит. Безопасен для использования из
+    нескольких потоков.
+    """
+
+    def __init__(self,
+                 max_bytes: int = 256 * 2 ** 20,
+                 disk_dir: Optional[Union[str, Path]] = None,
+                 max_disk_bytes: int = 2 * 2 ** 30):
+        """
+        Args:
+            max_bytes: Лимит памяти для результатов
+            disk_dir: Папка дискового уровня (None - только память)
+            max_disk_bytes: Лимит суммарного размера файлов на диске
+        """
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.disk_dir = Path(disk_dir) if disk_dir is not None else None
+
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._nbytes = 0
+        self._disk_entries: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_nbytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            # Порядок LRU на диске восстанавливаем по времени изменения файлов
+            files = sorted(self.disk_dir.glob('*.pkl'), key=lambda p: p.stat().st_mtime)
+            for file in files:
+                size = file.stat().st_size
+                self._disk_entries[file.stem] = size
+                self._disk_nbytes += size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries or key in self._disk_entries
+
+    @property
+    def nbytes(self) -> int:
+        """Оценка занятой памяти в байтах"""
+        return self._nbytes
+
+    @property
+    def disk_nbytes(self) -> int:
+        """Суммарный размер файлов дискового уровня в байтах"""
+        return self._disk_nbytes
+
+    @property
+    def hit_rate(self) -> float:
+        """Доля запросов, обслуженных из кэша"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Результат по ключу или None
+
+        Args:
+            key: Ключ из cache_key()
+
+        Returns:
+            Сохраненный результат (при попадании в диск он переносится в память)
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+        value = self._load_from_disk(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._store(key, value)
+        return value
+
+    def put(self, key: str, value: Any):
+        """
+        Сохраняет результат в память и (если включен) на диск
+
+        Args:
+            key: Ключ из cache_key()
+            value: Результат detect() или CandidateSet
+        """
+        with self._lock:
+            self._store(key, value)
+        if self.disk_dir is not None:
+            self._save_to_disk(key, value)
+
+    def clear(self):
+        """Очищает уровень в памяти (файлы на диске остаются)"""
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._nbytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики попаданий и заполненность кэша"""
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': self.hit_rate,
+            'evictions': self.evictions,
+            'entries': len(self._entries),
+            'memory_bytes': self._nbytes,
+            'disk_entries': len(self._disk_entries),
+            'disk_bytes': self._disk_nbytes
+        }
+
+    def _store(self, key: str, value: Any):
+        """Добавляет запись в память и вытесняет старые (под блокировкой)"""
+        size = _entry_nbytes(value)
+        if size > self.max_bytes:
+            return
+
+        if key in self._entries:
+            self._nbytes -= self._sizes[key]
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        self._sizes[key] = size
+        self._nbytes += size
+
+        while self._nbytes > self.max_bytes:
+            old_key, _ = self._entries.popitem(last=False)
+            self._nbytes -= self._sizes.pop(old_key)
+            self.evictions += 1
+
+    def _disk_path(self, key: str) -> Path:
+        return self.disk_dir / f"{key}.pkl"
+
+    def _load_from_disk(self, key: str) -> Optional[Any]:
+        if self.disk_dir is None:
+            return None
+        with self._lock:
+            if key not in self._disk_entries:
+                return None
+            self._disk_entries.move_to_end(key)
+
+        path = self._disk_path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+            # Время изменения файла - порядок LRU после перезапуска
+            os.utime(path)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            with self._lock:
+                self._disk_nbytes -= self._disk_entries.pop(key, 0)
+            return None
+        return value
+
+    def _save_to_disk(self, key: str, value: Any):
+        path = self._disk_path(key)
+        # Запись через временный файл, чтобы не оставить оборванный pickle
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        size = path.stat().st_size
+
+        with self._lock:
+            self._disk_nbytes += size - self._disk_entries.get(key, 0)
+            self._disk_entries[key] = size
+            self._disk_entries.move_to_end(key)
+
+            while self._disk_nbytes > self.max_disk_bytes and len(self._disk_entries) > 1:
+                old_key, old_size = self._disk_entries.popitem(last=False)
+                self._disk_nbytes -= old_size
+                self._disk_path(old_key).unlink(missing_ok=True)
@@ -0,0 +1,152 @@
+import numpy as np
+from typing import Dict, List, Any
+
+from config import (
+    CASCADE_COARSE_SIZE, CASCADE_REFINE_SIZE, CASCADE_PROPOSAL_CONFIDENCE,
+    CASCADE_CROP_SCALE, CASCADE_MIN_CROP, CASCADE_CONFIRM_IOU
+)
+from utils.boxes import batched_nms, box_iou
+from utils.results import Detections
+
+def proposal_crops(proposals: np.ndarray,
+                   image_shape: tuple,
+                   crop_scale: float = CASCADE_CROP_SCALE,
+                   min_crop: int = CASCADE_MIN_CROP) -> np.ndarray:
+    """
+    Квадратные области с контекстом вокруг предложенных боксов
+
+    Args:
+        proposals: Массив (N, 4) боксов первой стадии [x1, y1, x2, y2]
+        image_shape: Форма изображения (высота, ширина, ...)
+        crop_scale: Сторона области относительно большей стороны бокса
+        min_crop: Минимальная сторона области в пикселях
+
+    Returns:
+        Массив (N, 4) int с областями [x1, y1, x2, y2] внутри изображения
+    """
+    height, width = image_shape[:2]
+    centers = (proposals[:, :2] + proposals[:, 2:]) / 2
+    sides = np.maximum((proposals[:, 2:] - proposals[:, :2]).max(axis=1) * crop_scale, min_crop)
+    sides = np.minimum(sides, min(height, width))
+
+    # Область сдвигается внутрь кадра, а не обрезается, чтобы сохранить контекст
+    top_left = centers - sides[:, None] / 2
+    top_left = np.clip(top_left, 0, np.array([width, height]) - sides[:, None])
+    crops = np.hstack([top_left, top_left + sides[:, None]])
+    return np.round(crops).astype(np.int64)
+
+def confirm_proposals(crop_detections: List[Detections],
+                      crops: np.ndarray,
+                      proposals: np.ndarray,
+                      class_names: Dict[int, str],
+                      min_iou: float = CASCADE_CONFIRM_IOU) -> Detections:
+    """
+    Выбирает в каждой области детекцию, соответствующую предложению
+
+    Класс и уверенность берутся из второй стадии у детекции с наибольшим
+    IoU с предложением. Предложение отбрасывается, если в области ничего
+    не найдено или лучший IoU ниже min_iou (найден другой объект рядом).
+
+    Args:
+        crop_detections: Детекции второй стадии в координатах областей
+        crops: Массив (N, 4) областей
+        proposals: Массив (N, 4) боксов первой стадии
+        class_names: Отображение ID класса -> название
+        min_iou: Минимальный IoU детекции с предложением
+
+    Returns:
+        Подтвержденные детекции в координатах кадра
+    """
+    bboxes, confidences, class_ids = [], [], []
+    for detections, crop, proposal in zip(crop_detections, crops, proposals):
+        if len(detections) == 0:
+            continue
+        boxes = detections.bboxes + np.tile(crop[:2], 2)
+        iou = box_iou(proposal[None], boxes)[0]
+        best = int(np.argmax(iou))
+        if iou[best] < min_iou:
+            continue
+        bboxes.append(boxes[best])
+        confidences.append(detections.confidences[best])
+        class_ids.append(detections.class_ids[best])
+
+    if not bboxes:
+        return Detections.empty(class_names)
+    return Detections(np.array(bboxes), np.array(confidences), np.array(class_ids), class_names)
+
+def detect_cascade(runner: Any,
+                   image: np.ndarray,
+                   conf_threshold: float = 0.5,
+                   iou_threshold: float = 0.4,
+                   coarse_size: int = CASCADE_COARSE_SIZE,
+                   refine_size: int = CASCADE_REFINE_SIZE,
+                   proposal_conf: float = CASCADE_PROPOSAL_CONFIDENCE,
+                   crop_scale: float = CASCADE_CROP_SCALE,
+                   min_crop: int = CASCADE_MIN_CROP,
+                   confirm_iou: float = CASCADE_CONFIRM_IOU) -> Dict[str, Any]:
+    """
+    Двухстадийная детекция: грубый проход и уточнение по областям
+
+    Первая стадия - проход с малым img_size и пониженным порогом
+    уверенности, который только предлагает области. Если предложений
+    нет, кадр на этом заканчивается. Иначе области с контекстом вокруг
+    предложений увеличиваются до refine_size и проходят через модель
+    одним пакетом; класс (в том числе похожие ограничения скорости)
+    и уверенность берутся из этой стадии.
+
+    Args:
+        runner: Объект с методами detect(), detect_batch() и атрибутом
+            class_names (TrafficSignDetector или DetectorPool)
+        image: Изображение в формате numpy array (RGB)
+        conf_threshold: Итоговый порог уверенности
+        iou_threshold: Порог IoU для NMS
+        coarse_size: img_size первой стадии
+        refine_size: img_size второй стадии (размер увеличенных областей)
+        proposal_conf: Порог уверенности предложений первой стадии
+        crop_scale: Сторона области относительно большей стороны бокса
+        min_crop: Минимальная сторона области в пикселях
+        confirm_iou: Минимальный IoU детекции второй стадии с предложением
+
+    Returns:
+        Словарь с результатами в формате detect(); в 'model_info'
+        добавлены 'proposals' и 'stages' (1 - кадр завершен после
+        грубого прохода)
+    """
+    coarse = runner.detect(
+        image,
+        conf_threshold=min(proposal_conf, conf_threshold),
+        iou_threshold=iou_threshold,
+        img_size=coarse_size
+    )['detections']
+
+    detections = Detections.empty(runner.class_names)
+    if len(coarse):
+        crops = proposal_crops(coarse.bboxes, image.shape, crop_scale, min_crop)
+        refined = runner.detect_batch(
+            [np.ascontiguousarray(image[y1:y2, x1:x2]) for x1, y1, x2, y2 in crops],
+            conf_threshold=conf_threshold,
+            iou_threshold=iou_threshold,
+            img_size=refine_size
+        )
+        confirmed = confirm_proposals(
+            [result['detections'] for result in refined],
+            crops,
+            coarse.bboxes,
+            runner.class_names,
+            confirm_iou
+        )
+        # Соседние предложения могут подтвердить один и тот же знак
+        keep = batched_nms(confirmed.bboxes, confirmed.confidences, confirmed.class_ids, iou_threshold)
+        detections = confirmed.select(keep)
+
+    return {
+        'detections': detections,
+        'image_shape': image.shape,
+        'model_info': {
+            'conf_threshold': conf_threshold,
+            'iou_threshold': iou_threshold,
+            'img_size': refine_size,
+            'proposals': len(coarse),
+            'stages': 2 if len(coarse) else 1
+        }
+    }
@@ -0,0 +1,151 @@
+import yaml
+import numpy as np
+from pathlib import Path
+from typing import Dict, List, Any, Mapping, Optional, Sequence, Union
+
+from config import CONFIG_PATH, DATASET_ROOT
+from utils.results import Detections
+
+# Разбивки датасета, которые могут быть указаны в конфиге
+SPLITS = ('train', 'val', 'test')
+
+# Расширения файлов изображений датасета
+IMAGE_SUFFIXES = {'.jpg', '.jpeg', '.png', '.bmp'}
+
+def load_dataset_config(config_path: Union[str, Path] = CONFIG_PATH,
+                        root: Optional[Union[str, Path]] = DATASET_ROOT) -> Dict[str, Any]:
+    """
+    Читает конфиг датасета и разрешает пути к разбивкам
+
+    Args:
+        config_path: Путь к YAML-конфигу датасета
+        root: Корень датасета вместо поля path из конфига
+
+    Returns:
+        Словарь конфига; поле 'path' - абсолютный корень, а 'splits' -
+        словарь {название разбивки: путь к папке изображений}
+    """
+    config_path = Path(config_path)
+    with open(config_path, encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+
+    dataset_root = Path(root or config.get('path') or config_path.parent)
+    if not dataset_root.is_absolute():
+        dataset_root = (config_path.parent / dataset_root).resolve()
+
+    config['path'] = str(dataset_root)
+    config['splits'] = {
+        split: dataset_root / config[split]
+        for split in SPLITS
+        if config.get(split)
+    }
+    return config
+
+def split_image_paths(split: str, config: Optional[Dict[str, Any]] = None) -> List[Path]:
+    """
+    Список изображений разбивки в лексикографическом порядке
+
+    Args:
+        split: Название разбивки ('train', 'val' или 'test')
+        config: Конфиг из load_dataset_config() (по умолчанию читается заново)
+
+    Returns:
+        Список путей к изображениям
+    """
+    config = config or load_dataset_config()
+    if split not in config['splits']:
+        raise ValueError(f"Разбивка '{split}' не указана в конфиге датасета")
+
+    split_dir = config['splits'][split]
+    if not split_dir.is_dir():
+        raise FileNotFoundError(
+            f"Папка разбивки не найдена: {split_dir}. "
+            f"Укажите корень датасета в переменной окружения TRAFFIC_SIGNS_DATASET"
+        )
+
+    return sorted(
+        p for p in split_dir.rglob('*')
+        if p.suffix.lower() in IMAGE_SUFFIXES
+    )
+
+def write_data_yaml(path: Union[str, Path],
+                    config: Optional[Dict[str, Any]] = None,
+                    val_split: str = 'val') -> Path:
+    """
+    Записывает конфиг датасета для ultralytics с разрешенным корнем
+
+    Args:
+        path: Куда записать YAML
+        config: Конфиг из load_dataset_config()
+        val_split: Разбивка, которую ultralytics будет использовать как
+            'val' (для валидации и калибровки INT8)
+
+    Returns:
+        Путь к записанному файлу
+    """
+    config = config or load_dataset_config()
+    if val_split not in config['splits']:
+        raise ValueError(f"Разбивка '{val_split}' не указана в конфиге датасета")
+
+    data = {
+        'path': config['path'],
+        'nc': config['nc'],
+        'names': config['names'],
+    }
+    for split in SPLITS:
+        if config.get(split):
+            data[split] = config[split]
+    data['val'] = config[val_split]
+
+    path = Path(path)
+    with open(path, 'w', encoding='utf-8') as f:
+        yaml.safe_dump(data, f, allow_unicode=True)
+    return path
+
+def label_path(image_path: Union[str, Path]) -> Path:
+    """
+    Путь к файлу разметки YOLO для изображения
+
+    Как в ultralytics: последняя папка 'images' в пути заменяется на
+    'labels', расширение - на .txt.
+
+    Args:
+        image_path: Путь к изображению
+
+    Returns:
+        Путь к файлу разметки
+    """
+    parts = list(Path(image_path).parts)
+    for i in range(len(parts) - 1, -1, -1):
+        if parts[i] == 'images':
+            parts[i] = 'labels'
+            break
+    return Path(*parts).with_suffix('.txt')
+
+def load_ground_truth(image_path: Union[str, Path],
+                      image_shape: Sequence[int],
+                      class_names: Mapping[int, str]) -> Detections:
+    """
+    Эталонная разметка изображения в виде Detections
+
+    Args:
+        image_path: Путь к изображению
+        image_shape: Форма изображения (высота, ширина, ...)
+        class_names: Отображение ID класса -> название
+
+    Returns:
+        Детекции в пикселях с уверенностью 1.0 (пустые, если файла нет)
+    """
+    path = label_path(image_path)
+    if not path.exists():
+        return Detections.empty(class_names)
+
+    labels = np.loadtxt(path, dtype=np.float32, ndmin=2)
+    if labels.size == 0:
+        return Detections.empty(class_names)
+
+    # [cls, cx, cy, w, h] в долях -> [x1, y1, x2, y2] в пикселях
+    height, width = image_shape[:2]
+    centers, sizes = labels[:, 1:3], labels[:, 3:5]
+    bboxes = np.hstack([centers - sizes / 2, centers + sizes / 2]) * [width, height, width, height]
+    return Detections(bboxes, np.ones(len(labels)), labels[:, 0], class_names)
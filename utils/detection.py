@@ -1,33 +1,244 @@
-import cv2
+import ctypes
+import gc
+import time
 import numpy as np
-from ultralytics import YOLO
-from typing import Dict, List, Tuple, Any
+from typing import TYPE_CHECKING, Dict, List, Tuple, Any, Optional, Sequence, Union
 from pathlib import Path
 
+from config import (
+    INFERENCE_BACKEND, CANDIDATE_CONFIDENCE, CANDIDATE_MAX_DET, TILE_SIZE, TILE_OVERLAP,
+    WARMUP_IMAGE_SIZES, WARMUP_RUNS
+)
+from utils.adaptive import AdaptiveDetector
+from utils.backends import resolve_model_path
+from utils.cache import ResultCache, cache_key, model_fingerprint
+from utils.metrics import DetectorMetrics
+from utils.cascade import detect_cascade
+from utils.results import CandidateSet, Detections
+from utils.tiling import detect_sliced
+from utils.tracking import KeyframeTracker
+
+# ultralytics (torch), чтение файлов (OpenCV) и конвейер видео (plotly
+# через визуализацию) импортируются при первом использовании: импорт
+# модуля остается дешевым
+if TYPE_CHECKING:
+    from utils.video import VideoPipeline
+
+def model_input(image: np.ndarray) -> np.ndarray:
+    """
+    Представление RGB изображения в порядке BGR, который ожидает ultralytics
+    
+    Возвращается вид с обратным шагом по каналам, без копирования:
+    letterbox в ultralytics все равно создает новый массив.
+    """
+    return image[..., ::-1]
+
+def _result_copy(result: Dict[str, Any], **model_info: Any) -> Dict[str, Any]:
+    """
+    Копия результата для вызывающего кода: кэш хранит свой экземпляр, и
+    изменение ответа или его model_info не должно менять кэш
+    """
+    return {**result, 'model_info': {**result['model_info'], **model_info}}
+
+def _from_cache(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Копия результата из кэша с пометкой model_info['cached']"""
+    return _result_copy(result, cached=True)
+
+def release_freed_memory():
+    """
+    Возвращает системе освобожденную память кучи
+
+    Тензоры весов выделяются malloc, и после освобождения страницы
+    остаются за процессом; malloc_trim (glibc) отдает их системе.
+    На других платформах - только сборка мусора.
+    """
+    gc.collect()
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+_PREDICTOR_CLASS = None
+
+def _predictor_class() -> type:
+    """
+    DetectionPredictor ultralytics, который сохраняет боксы до обрезки
+
+    ultralytics подавляет пересечения до обрезки боксов по краю
+    изображения. Чтобы NMS по кандидатам (CandidateSet.filter) совпадал
+    с detect(), предиктор дополнительно записывает в Results атрибут
+    unclipped_boxes - те же боксы в координатах изображения без обрезки.
+    Используется только detect_candidates(): остальные вызовы идут через
+    стандартный предиктор без лишнего пересчета и переноса боксов. Класс
+    создается при первом вызове: импорт модуля не загружает ultralytics.
+    """
+    global _PREDICTOR_CLASS
+    if _PREDICTOR_CLASS is None:
+        import torch.nn.functional as F
+        from ultralytics.models.yolo.detect import DetectionPredictor
+        from ultralytics.utils import ops
+
+        class UnclippedBoxesPredictor(DetectionPredictor):
+            def construct_result(self, pred, img, orig_img, img_path):
+                # Углы боксов как xywh нулевого размера: scale_boxes не
+                # обрезает xywh, а вычисления те же, что для xyxy
+                corners = F.pad(pred[:, :4].reshape(-1, 2), (0, 2))
+                corners = ops.scale_boxes(img.shape[2:], corners, orig_img.shape, xywh=True)
+                result = super().construct_result(pred, img, orig_img, img_path)
+                result.unclipped_boxes = corners[:, :2].reshape(-1, 4).cpu().numpy()
+                return result
+
+        _PREDICTOR_CLASS = UnclippedBoxesPredictor
+    return _PREDICTOR_CLASS
+
 class TrafficSignDetector:
     """Класс для детекции дорожных знаков с помощью YOLO"""
     
-    def __init__(self, model_path: str):
+    def __init__(self,
+                 model_path: str,
+                 backend: str = INFERENCE_BACKEND,
+                 cache: Optional[ResultCache] = None,
+                 metrics: Optional[DetectorMetrics] = None):
         """
         Инициализация детектора
         
         Args:
             model_path: Путь к файлу модели (.pt)
+            backend: Движок инференса: 'pytorch', 'onnx', 'openvino' или
+                'openvino-int8'. Для ONNX и OpenVINO модель экспортируется
+                из .pt при первом запуске и сохраняется рядом с весами;
+                INT8 модель создается заранее скриптом quantize.py
+            cache: Кэш результатов по содержимому изображения; повторный
+                вызов с тем же изображением и параметрами не запускает модель
+            metrics: Счетчики и гистограммы задержки вызовов модели
+                (None - без замеров)
         """
         self.model_path = Path(model_path)
         if not self.model_path.exists():
             raise FileNotFoundError(f"Модель не найдена: {model_path}")
         
-        # Загружаем модель
-        self.model = YOLO(model_path)
+        # Загружаем модель выбранного движка
+        self.backend = backend
+        self.runtime_path = resolve_model_path(self.model_path, backend)
+        from ultralytics import YOLO
+        self.model = YOLO(self.runtime_path, task='detect')
+        
+        # Версия модели входит в ключ кэша: новые веса не используют старые результаты
+        self.cache = cache
+        self.model_version = model_fingerprint(self.runtime_path)
+        self.metrics = metrics
+        self._candidates_predictor = None
         
         # Получаем названия классов из модели
         self.class_names = self.model.names
         
-        print(f"✅ Модель загружена: {model_path}")
+        print(f"✅ Модель загружена: {self.runtime_path} ({backend})")
         print(f"📊 Классов: {len(self.class_names)}")
-    
-    def detect(self, 
+
+    def warmup(self,
+               img_sizes: Sequence[int] = WARMUP_IMAGE_SIZES,
+               batch_sizes: Sequence[int] = (1,),
+               runs: int = WARMUP_RUNS) -> Dict[Tuple[int, int], float]:
+        """
+        Прогревает модель пустыми прогонами на заданных размерах входа
+
+        Первый вызов модели инициализирует предиктор ultralytics, граф
+        движка и ядра под форму входа; после прогрева эту цену не платит
+        первый настоящий запрос. Кэш и метрики не затрагиваются.
+
+        Args:
+            img_sizes: Размеры входа модели
+            batch_sizes: Размеры пакета (для движков с отдельной
+                инициализацией под каждую форму)
+            runs: Прогонов на каждую комбинацию
+
+        Returns:
+            Время первого прогона в мс для каждой пары (img_size, batch_size)
+        """
+        timings = {}
+        for img_size in img_sizes:
+            image = np.full((img_size, img_size, 3), 114, dtype=np.uint8)
+            for batch_size in batch_sizes:
+                source = [model_input(image)] * batch_size
+                for run in range(runs):
+                    start = time.perf_counter()
+                    self._predict(source, imgsz=img_size)
+                    if run == 0:
+                        timings[(img_size, batch_size)] = (time.perf_counter() - start) * 1000
+        return timings
+
+    def _inference_module(self) -> Any:
+        """
+        nn.Module, которым предиктор ultralytics выполняет прогоны
+
+        Это слитая (fuse) копия весов, отличная от self.model.model;
+        предиктор создается первым прогоном, поэтому при необходимости
+        модель прогревается. Для ONNX и OpenVINO - None.
+        """
+        if self.model.predictor is None:
+            self.warmup()
+        import torch
+        module = getattr(self.model.predictor.model, 'model', None)
+        return module if isinstance(module, torch.nn.Module) else None
+
+    def weights_nbytes(self) -> int:
+        """
+        Память под веса модели в байтах
+
+        Для pytorch - параметры и буферы исходной и слитой копий модели,
+        для экспортированных движков - размер файлов модели на диске.
+        """
+        module = self._inference_module()
+        if module is None:
+            path = Path(self.runtime_path)
+            files = [path] if path.is_file() else [p for p in path.rglob('*') if p.is_file()]
+            return sum(p.stat().st_size for p in files)
+
+        import torch
+        modules = [m for m in (module, self.model.model) if isinstance(m, torch.nn.Module)]
+        tensors = {
+            id(tensor): tensor
+            for m in modules
+            for tensor in list(m.parameters()) + list(m.buffers())
+        }
+        return sum(tensor.nbytes for tensor in tensors.values())
+
+    def shared_weights(self) -> Optional[Dict[str, Any]]:
+        """
+        Переносит веса слитой модели в общую память
+
+        Возвращаемый state_dict передается в процессы-воркеры (см.
+        DetectorPool): тензоры сериализуются как ссылки на общую память,
+        и воркеры используют одну копию весов вместо своей.
+
+        Returns:
+            state_dict в общей памяти или None для ONNX и OpenVINO
+        """
+        module = self._inference_module()
+        if module is None:
+            return None
+        module.share_memory()
+        return module.state_dict()
+
+    def use_shared_weights(self, state_dict: Dict[str, Any]):
+        """
+        Подменяет веса слитой модели тензорами из shared_weights()
+
+        Тензоры не копируются (load_state_dict с assign=True). Собственные
+        копии весов процесса освобождаются: слитая заменяется общей, а
+        неслитая из чекпойнта больше не нужна - модель ultralytics дальше
+        ссылается на тот же слитый модуль. Детектор после этого
+        используется только для инференса (процесс-воркер DetectorPool).
+        """
+        module = self._inference_module()
+        if module is None:
+            raise ValueError(f"Общие веса поддерживаются только для движка pytorch, не {self.backend}")
+        module.load_state_dict(state_dict, assign=True)
+        self.model.model = module
+        self.model.ckpt = {}
+        release_freed_memory()
+
+    def detect(self,
                image: np.ndarray, 
                conf_threshold: float = 0.5,
                iou_threshold: float = 0.4,
@@ -42,49 +253,309 @@ class TrafficSignDetector:
             img_size: Размер изображения для модели
             
         Returns:
-            Словарь с результатами детекции
+            Словарь с результатами детекции. Ключ 'detections' содержит
+            объект Detections: колоночные массивы bboxes, confidences и
+            class_ids, которые также доступны как список словарей.
+            model_info['speed'] - время стадий на изображение в мс:
+            'preprocess', 'inference', 'postprocess' (замеры ultralytics)
+            и 'parse' (перевод результата в Detections). У результата из
+            кэша model_info['cached'] = True, а 'speed' - замеры исходного
+            вызова
         """
+        key = None
+        if self.cache is not None:
+            key = cache_key(image, self.model_version, conf=conf_threshold,
+                            iou=iou_threshold, img_size=img_size)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return _from_cache(cached)
         
         # Запускаем модель
-        results = self.model(
-            image,
+        start = time.perf_counter()
+        results = self._run_model(
+            model_input(image),
             conf=conf_threshold,
             iou=iou_threshold,
+            imgsz=img_size
+        )
+        
+        result = self._parse_result(
+            results[0] if len(results) > 0 else None,
+            image.shape,
+            conf_threshold,
+            iou_threshold,
+            img_size
+        )
+        if self.metrics is not None:
+            self.metrics.observe([result], (time.perf_counter() - start) * 1000)
+        if key is not None:
+            self.cache.put(key, result)
+            return _result_copy(result)
+        return result
+    
+    def detect_candidates(self,
+                          image: np.ndarray,
+                          img_size: int = 640,
+                          conf_floor: float = CANDIDATE_CONFIDENCE) -> CandidateSet:
+        """
+        Запускает модель один раз и сохраняет всех кандидатов
+        
+        Модель выполняется с минимальным порогом уверенности и без
+        подавления пересечений (iou=1.0); боксы сохраняются без обрезки
+        по краю изображения. Результат для конкретных порогов затем
+        получается через CandidateSet.filter() без повторного прохода
+        модели и совпадает с detect() при тех же порогах.
+        
+        Args:
+            image: Изображение в формате numpy array (RGB)
+            img_size: Размер изображения для модели
+            conf_floor: Минимальный порог уверенности кандидатов
+            
+        Returns:
+            Набор кандидатов
+        """
+        key = None
+        if self.cache is not None:
+            key = cache_key(image, self.model_version, kind='candidates', boxes='unclipped',
+                            conf=conf_floor, img_size=img_size)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        
+        start = time.perf_counter()
+        results = self._run_model(
+            model_input(image),
+            conf=conf_floor,
+            iou=1.0,
             imgsz=img_size,
-            verbose=False
+            max_det=CANDIDATE_MAX_DET,
+            kind='candidates'
+        )
+        
+        candidates = CandidateSet(
+            self._unclipped_detections(results[0] if len(results) > 0 else None),
+            image.shape,
+            img_size,
+            conf_floor
+        )
+        if self.metrics is not None:
+            # Кандидаты - не итоговые детекции, по классам они не учитываются
+            self.metrics.record(1, (time.perf_counter() - start) * 1000,
+                                [results[0].speed] if len(results) > 0 else (), kind='candidates')
+        if key is not None:
+            self.cache.put(key, candidates)
+        return candidates
+    
+    def detect_cascade(self, image: np.ndarray, **kwargs) -> Dict[str, Any]:
+        """
+        Двухстадийная детекция для разреженных сцен
+        
+        Дешевый проход с малым входом предлагает области; кадры без
+        предложений на этом заканчиваются. Иначе модель повторно
+        запускается только на увеличенных областях вокруг кандидатов,
+        что уточняет класс похожих знаков ограничения скорости.
+        
+        Args:
+            image: Изображение в формате numpy array (RGB)
+            **kwargs: Параметры utils.cascade.detect_cascade()
+            
+        Returns:
+            Словарь с результатами в формате detect()
+        """
+        return detect_cascade(self, image, **kwargs)
+    
+    def detect_sliced(self,
+                      image: np.ndarray,
+                      tile_size: int = TILE_SIZE,
+                      overlap: float = TILE_OVERLAP,
+                      **kwargs) -> Dict[str, Any]:
+        """
+        Детекция по перекрывающимся тайлам для кадров высокого разрешения
+        
+        Мелкие знаки на кадрах 4K после уменьшения до img_size занимают
+        несколько пикселей. Тайлы обрабатываются без уменьшения одним
+        пакетом, результаты объединяются NMS в координатах кадра.
+        
+        Args:
+            image: Изображение в формате numpy array (RGB)
+            tile_size: Размер тайла в пикселях
+            overlap: Доля перекрытия соседних тайлов
+            **kwargs: Параметры utils.tiling.detect_sliced()
+            
+        Returns:
+            Словарь с результатами в формате detect()
+        """
+        return detect_sliced(self, image, tile_size=tile_size, overlap=overlap, **kwargs)
+    
+    def detect_batch(self,
+                     images: List[np.ndarray],
+                     conf_threshold: float = 0.5,
+                     iou_threshold: float = 0.4,
+                     img_size: int = 640,
+                     batch_size: int = 16) -> List[Dict[str, Any]]:
+        """
+        Выполняет детекцию на наборе изображений пакетами
+        
+        Изображения разного размера приводятся letterbox-преобразованием
+        к img_size и склеиваются в один тензор, поэтому на каждый пакет
+        приходится один прямой проход модели.
+        
+        При включенном кэше в модель передаются только изображения,
+        которых в нем нет.
+        
+        Args:
+            images: Список изображений в формате numpy array (RGB)
+            conf_threshold: Порог уверенности для детекции
+            iou_threshold: Порог IoU для NMS
+            img_size: Размер изображения для модели
+            batch_size: Максимальное число изображений в одном проходе
+            
+        Returns:
+            Список результатов в том же порядке и формате, что и detect()
+        """
+        if batch_size < 1:
+            raise ValueError(f"batch_size должен быть положительным: {batch_size}")
+        
+        images = list(images)
+        if self.cache is None:
+            return self._detect_chunks(images, conf_threshold, iou_threshold, img_size, batch_size)
+        
+        keys = [
+            cache_key(image, self.model_version, conf=conf_threshold,
+                      iou=iou_threshold, img_size=img_size)
+            for image in images
+        ]
+        batch_results = [self.cache.get(key) for key in keys]
+        batch_results = [result if result is None else _from_cache(result) for result in batch_results]
+        missing = [i for i, result in enumerate(batch_results) if result is None]
+        
+        computed = self._detect_chunks(
+            [images[i] for i in missing], conf_threshold, iou_threshold, img_size, batch_size
         )
+        for i, result in zip(missing, computed):
+            self.cache.put(keys[i], result)
+            batch_results[i] = _result_copy(result)
         
-        # Обрабатываем результаты
-        detections = []
+        return batch_results
+    
+    def _detect_chunks(self,
+                       images: List[np.ndarray],
+                       conf_threshold: float,
+                       iou_threshold: float,
+                       img_size: int,
+                       batch_size: int) -> List[Dict[str, Any]]:
+        """Прямые проходы модели пакетами по batch_size изображений"""
+        batch_results = []
         
-        if len(results) > 0 and results[0].boxes is not None:
-            boxes = results[0].boxes
+        for start in range(0, len(images), batch_size):
+            chunk = images[start:start + batch_size]
             
-            for i in range(len(boxes)):
-                # Извлекаем данные о детекции
-                bbox = boxes.xyxy[i].cpu().numpy()  # координаты бокса
-                confidence = float(boxes.conf[i].cpu().numpy())  # уверенность
-                class_id = int(boxes.cls[i].cpu().numpy())  # ID класса
-                
-                # Получаем название класса
-                class_name = self.class_names[class_id]
-                
-                detection = {
-                    'bbox': bbox.astype(int),  # [x1, y1, x2, y2]
-                    'confidence': confidence,
-                    'class_id': class_id,
-                    'class_name': class_name
-                }
-                
-                detections.append(detection)
+            # Один прямой проход на весь пакет
+            t0 = time.perf_counter()
+            results = self._run_model(
+                [model_input(image) for image in chunk],
+                conf=conf_threshold,
+                iou=iou_threshold,
+                imgsz=img_size,
+                kind='batch'
+            )
+            
+            chunk_results = [
+                self._parse_result(result, image.shape, conf_threshold, iou_threshold, img_size)
+                for image, result in zip(chunk, results)
+            ]
+            if self.metrics is not None:
+                self.metrics.observe(chunk_results, (time.perf_counter() - t0) * 1000, kind='batch')
+            batch_results.extend(chunk_results)
+        
+        return batch_results
+    
+    def _predict(self, source: Any, candidates: bool = False, **kwargs) -> List[Any]:
+        """
+        Прямой проход модели
+
+        Для кандидатов используется предиктор с необрезанными боксами. Он
+        хранится отдельно и подставляется в модель только на время вызова:
+        при смене класса предиктора YOLO пересоздал бы его вместе с копией
+        весов.
+        """
+        if not candidates:
+            return self.model(source, verbose=False, **kwargs)
+
+        stock = self.model.predictor
+        self.model.predictor = self._candidate_predictor()
+        try:
+            return self.model(source, verbose=False, predictor=_predictor_class(), **kwargs)
+        finally:
+            self._candidates_predictor = self.model.predictor
+            self.model.predictor = stock
+
+    def _candidate_predictor(self) -> Any:
+        """Предиктор кандидатов на той же загруженной модели, что и основной"""
+        if self._candidates_predictor is None:
+            if self.model.predictor is None:
+                self.warmup()
+            stock = self.model.predictor
+            predictor = _predictor_class()(overrides=dict(vars(stock.args)), _callbacks=self.model.callbacks)
+            # setup_model() копирует веса; общий AutoBackend - нет
+            predictor.model = stock.model
+            predictor.device = stock.device
+            self._candidates_predictor = predictor
+        return self._candidates_predictor
+
+    def _run_model(self, source: Any, kind: str = 'detect', **kwargs) -> List[Any]:
+        """Прямой проход модели; исключения учитываются в метриках"""
+        candidates = kind == 'candidates'
+        if self.metrics is None:
+            return self._predict(source, candidates=candidates, **kwargs)
+        try:
+            return self._predict(source, candidates=candidates, **kwargs)
+        except Exception as error:
+            self.metrics.record_error(error, kind)
+            raise
+
+    def _unclipped_detections(self, result: Any) -> Detections:
+        """Детекции из Results с боксами до обрезки по краю изображения"""
+        detections = Detections.from_result(result, self.class_names)
+        if len(detections) == 0:
+            return detections
+        return Detections(result.unclipped_boxes, detections.confidences, detections.class_ids, self.class_names)
+    
+    def _parse_result(self,
+                      result: Any,
+                      image_shape: Tuple[int, ...],
+                      conf_threshold: float,
+                      iou_threshold: float,
+                      img_size: int) -> Dict[str, Any]:
+        """
+        Преобразует результат YOLO для одного изображения в словарь detect()
+        
+        Args:
+            result: Объект Results из ultralytics (или None)
+            image_shape: Форма исходного изображения
+            conf_threshold: Порог уверенности, с которым выполнялась детекция
+            iou_threshold: Порог IoU, с которым выполнялась детекция
+            img_size: Размер изображения для модели
+            
+        Returns:
+            Словарь с результатами детекции
+        """
+        # Один перенос с устройства на все боксы изображения
+        start = time.perf_counter()
+        detections = Detections.from_result(result, self.class_names)
+        
+        # Замеры ultralytics уже поделены на число изображений в пакете
+        speed = dict(getattr(result, 'speed', None) or {})
+        speed['parse'] = (time.perf_counter() - start) * 1000
         
         return {
             'detections': detections,
-            'image_shape': image.shape,
+            'image_shape': image_shape,
             'model_info': {
                 'conf_threshold': conf_threshold,
                 'iou_threshold': iou_threshold,
-                'img_size': img_size
+                'img_size': img_size,
+                'speed': speed
             }
         }
     
@@ -99,12 +570,54 @@ class TrafficSignDetector:
         Returns:
             Результаты детекции
         """
+        from utils.ingest import read_image
+
         # Загружаем изображение
-        image = cv2.imread(image_path)
-        if image is None:
-            raise ValueError(f"Не удалось загрузить изображение: {image_path}")
+        image = read_image(image_path)
+        
+        return self.detect(image, **kwargs)
+    
+    def detect_video(self, source: Union[str, Path], **kwargs) -> "VideoPipeline":
+        """
+        Потоковая детекция на видеофайле или папке с кадрами
+        
+        Декодирование, инференс и отрисовка идут параллельно в отдельных
+        стадиях. Статистика FPS по стадиям доступна через stats().
         
-        # Конвертируем BGR -> RGB
-        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        Args:
+            source: Путь к видеофайлу или папке с кадрами
+            **kwargs: Параметры VideoPipeline и detect_batch()
+            
+        Returns:
+            Итерируемый конвейер; каждый элемент - словарь с ключами
+            'frame_index', 'timestamp', 'image', 'results' и
+            'result_image' (если включена отрисовка)
+        """
+        from utils.video import VideoPipeline
+        return VideoPipeline(self, source, **kwargs)
+    
+    def create_tracker(self, keyframe_interval: int = 5, **kwargs) -> KeyframeTracker:
+        """
+        Создает трекер, запускающий детекцию только на ключевых кадрах
         
-        return self.detect(image_rgb, **kwargs)
\ No newline at end of file
+        Args:
+            keyframe_interval: Максимальное число кадров между детекциями
+            **kwargs: Параметры KeyframeTracker и detect()
+            
+        Returns:
+            Трекер; кадры передаются в его метод update()
+        """
+        return KeyframeTracker(self, keyframe_interval=keyframe_interval, **kwargs)
+
+    def create_adaptive(self, target_ms: float, **kwargs) -> AdaptiveDetector:
+        """
+        Создает обертку, выбирающую размер входа под целевую задержку
+
+        Args:
+            target_ms: Целевая задержка вызова в мс
+            **kwargs: Параметры ResolutionScheduler
+
+        Returns:
+            Обертка с методами detect()/detect_batch() без img_size
+        """
+        return AdaptiveDetector(self, target_ms, **kwargs)
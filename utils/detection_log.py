@@ -0,0 +1,375 @@
+import json
+import os
+import time
+import numpy as np
+from pathlib import Path
+from typing import Dict, List, Any, Iterable, Mapping, Optional, Sequence, Union
+
+from utils.results import Detections
+
+# Запись лога фиксированной ширины (23 байта, без выравнивания)
+RECORD_DTYPE = np.dtype([
+    ('time', '<f8'),          # Unix-время кадра, с
+    ('frame', '<u4'),         # Номер кадра или запроса
+    ('class_id', 'u1'),
+    ('confidence', '<f2'),
+    ('bbox', '<i2', (4,)),    # [x1, y1, x2, y2] в пикселях
+])
+
+# Записей в сегменте по умолчанию (~23 МБ)
+SEGMENT_RECORDS = 1_000_000
+
+def segment_paths(directory: Union[str, Path], number: int) -> Dict[str, Path]:
+    """
+    Файлы сегмента: записи (.bin), позиции записей по классам (.order.npy)
+    и индекс (.json). Индекс пишется последним: его наличие означает,
+    что сегмент закрыт и больше не меняется.
+    """
+    base = Path(directory) / f"segment-{number:06d}"
+    return {
+        'records': base.with_suffix('.bin'),
+        'order': base.with_suffix('.order.npy'),
+        'index': base.with_suffix('.json'),
+    }
+
+def map_records(path: Union[str, Path]) -> np.ndarray:
+    """
+    Отображает файл сегмента в память без копирования
+
+    Недописанная последняя запись (после сбоя) не учитывается.
+    """
+    count = os.path.getsize(path) // RECORD_DTYPE.itemsize
+    if count == 0:
+        return np.empty(0, dtype=RECORD_DTYPE)
+    return np.memmap(path, dtype=RECORD_DTYPE, mode='r', shape=(count,))
+
+def seal_segment(directory: Union[str, Path], number: int) -> Dict[str, Any]:
+    """
+    Строит индекс сегмента по классам и времени
+
+    Позиции записей сортируются по классу (внутри класса - по порядку
+    записи) и сохраняются в .order.npy; для каждого класса в индексе
+    хранятся границы его позиций и диапазон времени.
+
+    Returns:
+        Индекс сегмента
+    """
+    paths = segment_paths(directory, number)
+    records = map_records(paths['records'])
+    times = np.asarray(records['time'])
+    class_ids = np.asarray(records['class_id'])
+
+    order = np.argsort(class_ids, kind='stable').astype(np.uint32)
+    sorted_ids = class_ids[order]
+    present = np.unique(sorted_ids)
+    starts = np.searchsorted(sorted_ids, present, side='left')
+    ends = np.searchsorted(sorted_ids, present, side='right')
+
+    classes = {}
+    for class_id, start, end in zip(present, starts, ends):
+        class_times = times[order[start:end]]
+        classes[str(int(class_id))] = {
+            'start': int(start),
+            'end': int(end),
+            'time_min': float(class_times.min()),
+            'time_max': float(class_times.max()),
+        }
+
+    index = {
+        'records': len(records),
+        'time_min': float(times.min()) if len(times) else None,
+        'time_max': float(times.max()) if len(times) else None,
+        # Время не убывает - диапазон ищется бинарным поиском
+        'time_sorted': bool(np.all(times[1:] >= times[:-1])),
+        'classes': classes,
+    }
+
+    np.save(paths['order'], order)
+    tmp = paths['index'].with_name(paths['index'].name + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=2)
+    os.replace(tmp, paths['index'])
+    return index
+
+def detections_to_records(detections: Sequence[Detections],
+                          frames: Sequence[int],
+                          timestamps: Sequence[float]) -> np.ndarray:
+    """
+    Переводит детекции нескольких кадров в записи лога одним проходом
+
+    Args:
+        detections: Детекции каждого кадра
+        frames: Номера кадров
+        timestamps: Unix-время кадров
+
+    Raises:
+        ValueError: ID класса не помещается в uint8
+    """
+    counts = [len(d) for d in detections]
+    records = np.empty(sum(counts), dtype=RECORD_DTYPE)
+    if not len(records):
+        return records
+
+    class_ids = np.concatenate([d.class_ids for d in detections])
+    if class_ids.min() < 0 or class_ids.max() > 255:
+        raise ValueError(f"ID класса вне диапазона uint8: {class_ids.min()}..{class_ids.max()}")
+    records['time'] = np.repeat(np.asarray(timestamps, dtype=np.float64), counts)
+    records['frame'] = np.repeat(np.asarray(frames, dtype=np.uint32), counts)
+    records['class_id'] = class_ids
+    records['confidence'] = np.concatenate([d.confidences for d in detections])
+    records['bbox'] = np.clip(np.rint(np.concatenate([d.bboxes for d in detections])), -32768, 32767)
+    return records
+
+def records_to_detections(records: np.ndarray, class_names: Mapping[int, str]) -> Detections:
+    """Переводит записи лога обратно в Detections"""
+    return Detections(records['bbox'], records['confidence'], records['class_id'], class_names)
+
+class DetectionLogWriter:
+    """
+    Журнал детекций только на дозапись: колоночные записи по сегментам
+
+    Записи фиксированной ширины (RECORD_DTYPE) пишутся в текущий сегмент;
+    заполненный сегмент закрывается и индексируется по классам и времени.
+    Кадры копятся в буфере и переводятся в записи пачкой: для кадров с
+    несколькими детекциями накладные расходы NumPy на вызов больше
+    самого перевода.
+    При повторном открытии запись продолжается в последний незакрытый
+    сегмент (недописанная запись после сбоя отбрасывается).
+    Не потокобезопасен: записывать должен один поток.
+    """
+
+    def __init__(self,
+                 directory: Union[str, Path],
+                 segment_records: int = SEGMENT_RECORDS,
+                 buffer_records: int = 65536):
+        """
+        Args:
+            directory: Папка журнала
+            segment_records: Записей в сегменте
+            buffer_records: Детекций в буфере до записи в файл
+        """
+        if segment_records < 1:
+            raise ValueError(f"segment_records должен быть положительным: {segment_records}")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_records = segment_records
+        self.buffer_records = buffer_records
+        self._pending: List[Detections] = []
+        self._pending_frames: List[int] = []
+        self._pending_times: List[float] = []
+        self._pending_records = 0
+
+        existing = sorted(self.directory.glob('segment-*.bin'))
+        self.segment = int(existing[-1].stem.split('-')[1]) if existing else 0
+        if existing and segment_paths(self.directory, self.segment)['index'].exists():
+            self.segment += 1
+        self._open_segment()
+
+    def _open_segment(self):
+        path = segment_paths(self.directory, self.segment)['records']
+        self.segment_size = path.stat().st_size // RECORD_DTYPE.itemsize if path.exists() else 0
+        self._file = open(path, 'ab')
+        self._file.truncate(self.segment_size * RECORD_DTYPE.itemsize)
+
+    def append(self, detections: Detections, frame: int = 0, timestamp: Optional[float] = None):
+        """
+        Дописывает детекции одного кадра
+
+        Args:
+            detections: Детекции кадра
+            frame: Номер кадра или запроса
+            timestamp: Unix-время кадра (по умолчанию - текущее)
+        """
+        if not len(detections):
+            return
+        self._pending.append(detections)
+        self._pending_frames.append(frame)
+        self._pending_times.append(time.time() if timestamp is None else timestamp)
+        self._pending_records += len(detections)
+        if self._pending_records >= self.buffer_records:
+            self._drain()
+
+    def _drain(self):
+        if self._pending:
+            records = detections_to_records(self._pending, self._pending_frames, self._pending_times)
+            self._pending, self._pending_frames, self._pending_times = [], [], []
+            self._pending_records = 0
+            self.write(records)
+
+    def write(self, records: np.ndarray):
+        """Дописывает готовые записи RECORD_DTYPE (после буфера append())"""
+        self._drain()
+        records = np.ascontiguousarray(records, dtype=RECORD_DTYPE)
+        while len(records):
+            part = records[:self.segment_records - self.segment_size]
+            self._file.write(part.tobytes())
+            self.segment_size += len(part)
+            records = records[len(part):]
+            if self.segment_size >= self.segment_records:
+                self._seal()
+
+    def _seal(self):
+        self._file.close()
+        seal_segment(self.directory, self.segment)
+        self.segment += 1
+        self._open_segment()
+
+    def flush(self, fsync: bool = False):
+        """Делает записанное видимым для читателей (fsync - и надежным при сбое)"""
+        self._drain()
+        self._file.flush()
+        if fsync:
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        """Закрывает текущий сегмент с индексом (пустой сегмент удаляется)"""
+        if self._file.closed:
+            return
+        self._drain()
+        self._file.close()
+        if self.segment_size:
+            seal_segment(self.directory, self.segment)
+        else:
+            segment_paths(self.directory, self.segment)['records'].unlink(missing_ok=True)
+
+    def __enter__(self) -> "DetectionLogWriter":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class DetectionLogReader:
+    """
+    Запросы к журналу детекций через np.memmap
+
+    Закрытые сегменты отбрасываются по диапазону времени из индекса, а
+    записи класса находятся по позициям из .order.npy без просмотра
+    остальных. Незакрытый сегмент просматривается целиком. Журнал можно
+    читать, пока в него пишут: видны записи до последнего flush().
+    """
+
+    def __init__(self, directory: Union[str, Path]):
+        """
+        Args:
+            directory: Папка журнала
+        """
+        self.directory = Path(directory)
+        if not self.directory.is_dir():
+            raise FileNotFoundError(f"Журнал детекций не найден: {self.directory}")
+
+    def segments(self) -> List[Dict[str, Any]]:
+        """Сегменты по порядку: номер, пути и индекс (None у незакрытого)"""
+        segments = []
+        for path in sorted(self.directory.glob('segment-*.bin')):
+            number = int(path.stem.split('-')[1])
+            paths = segment_paths(self.directory, number)
+            index = None
+            if paths['index'].exists():
+                with open(paths['index'], encoding='utf-8') as f:
+                    index = json.load(f)
+            segments.append({'number': number, 'paths': paths, 'index': index})
+        return segments
+
+    def query(self,
+              class_ids: Optional[Iterable[int]] = None,
+              start: Optional[float] = None,
+              end: Optional[float] = None) -> np.ndarray:
+        """
+        Записи заданных классов за интервал времени [start, end)
+
+        Например, все знаки Stop за последний час:
+        reader.query(class_ids=[stop_id], start=time.time() - 3600)
+
+        Args:
+            class_ids: ID классов (None - все)
+            start: Начало интервала, Unix-время (None - без ограничения)
+            end: Конец интервала (None - без ограничения)
+
+        Returns:
+            Массив RECORD_DTYPE в порядке записи. Если выборка - непрерывный
+            участок одного сегмента, возвращается вид memmap без копирования
+        """
+        class_ids = None if class_ids is None else sorted({int(c) for c in class_ids})
+        start = -np.inf if start is None else start
+        end = np.inf if end is None else end
+
+        parts = []
+        for segment in self.segments():
+            index = segment['index']
+            if index is not None:
+                if not index['records'] or index['time_max'] < start or index['time_min'] >= end:
+                    continue
+                part = self._query_sealed(segment, class_ids, start, end)
+            else:
+                records = map_records(segment['paths']['records'])
+                mask = (records['time'] >= start) & (records['time'] < end)
+                if class_ids is not None:
+                    mask &= np.isin(records['class_id'], class_ids)
+                part = records[mask]
+            if len(part):
+                parts.append(part)
+
+        if not parts:
+            return np.empty(0, dtype=RECORD_DTYPE)
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def _query_sealed(self,
+                      segment: Dict[str, Any],
+                      class_ids: Optional[List[int]],
+                      start: float,
+                      end: float) -> np.ndarray:
+        index = segment['index']
+        records = map_records(segment['paths']['records'])
+
+        # Границы интервала в позициях записей (при монотонном времени)
+        lo, hi = 0, len(records)
+        if index['time_sorted']:
+            lo, hi = np.searchsorted(records['time'], [start, end], side='left')
+
+        if class_ids is None:
+            if index['time_sorted']:
+                return records[lo:hi]
+            times = records['time']
+            return records[(times >= start) & (times < end)]
+
+        order = np.load(segment['paths']['order'], mmap_mode='r')
+        positions = []
+        for class_id in class_ids:
+            entry = index['classes'].get(str(class_id))
+            if entry is None or entry['time_max'] < start or entry['time_min'] >= end:
+                continue
+            # Позиции класса возрастают, поэтому интервал - их непрерывный участок
+            class_positions = order[entry['start']:entry['end']]
+            first, last = np.searchsorted(class_positions, [lo, hi], side='left')
+            positions.append(np.asarray(class_positions[first:last]))
+
+        if not positions:
+            return np.empty(0, dtype=RECORD_DTYPE)
+        positions = np.sort(np.concatenate(positions)) if len(positions) > 1 else positions[0]
+        selected = records[positions]
+        if not index['time_sorted']:
+            selected = selected[(selected['time'] >= start) & (selected['time'] < end)]
+        return selected
+
+    def class_counts(self, start: Optional[float] = None, end: Optional[float] = None) -> Dict[int, int]:
+        """
+        Число записей по классам за интервал [start, end)
+
+        Сегменты, целиком попадающие в интервал, считаются по индексу
+        без чтения записей.
+        """
+        start = -np.inf if start is None else start
+        end = np.inf if end is None else end
+
+        counts = np.zeros(256, dtype=np.int64)
+        for segment in self.segments():
+            index = segment['index']
+            if index is not None and index['records'] and start <= index['time_min'] and index['time_max'] < end:
+                for class_id, entry in index['classes'].items():
+                    counts[int(class_id)] += entry['end'] - entry['start']
+                continue
+            records = map_records(segment['paths']['records'])
+            times = records['time']
+            selected = records['class_id'][(times >= start) & (times < end)]
+            counts += np.bincount(selected, minlength=256)
+        return {class_id: int(count) for class_id, count in enumerate(counts) if count}
@@ -0,0 +1,315 @@
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Any, Callable, Mapping, Optional, Union
+
+from config import CONFIG_PATH, DATASET_ROOT, DEFAULT_IMAGE_SIZE
+from utils.boxes import box_iou
+from utils.dataset import load_dataset_config, load_ground_truth, split_image_paths
+from utils.ingest import decode_ahead
+from utils.reporting import markdown_table
+from utils.results import Detections
+
+# Пороги IoU для mAP50-95 (как в COCO и ultralytics)
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+
+# np.trapz переименован в NumPy 2.0
+_trapezoid = getattr(np, 'trapezoid', None) or np.trapz
+
+# Пороги детекции при валидации (как в ultralytics val)
+EVAL_CONFIDENCE = 0.001
+EVAL_IOU = 0.7
+
+def match_predictions(detections: Detections,
+                      truth: Detections,
+                      iou_thresholds: np.ndarray = IOU_THRESHOLDS) -> np.ndarray:
+    """
+    Отмечает верные предсказания одного изображения для набора порогов IoU
+
+    Предсказания перебираются по убыванию уверенности (как в ultralytics):
+    каждое забирает свободный эталонный бокс того же класса с наибольшим
+    IoU, если IoU не ниже порога. Каждый эталонный бокс участвует не более
+    чем в одной паре. Матрица IoU считается один раз, все пороги
+    обрабатываются одновременно.
+
+    Args:
+        detections: Предсказания
+        truth: Эталонная разметка
+        iou_thresholds: Пороги IoU
+
+    Returns:
+        Булев массив (N предсказаний, число порогов)
+    """
+    correct = np.zeros((len(detections), len(iou_thresholds)), dtype=bool)
+    if len(detections) == 0 or len(truth) == 0:
+        return correct
+
+    iou = box_iou(truth.bboxes, detections.bboxes)
+    iou[truth.class_ids[:, None] != detections.class_ids[None, :]] = 0
+
+    columns = np.arange(len(iou_thresholds))
+    # Эталонные боксы, уже занятые на каждом пороге
+    matched = np.zeros((len(truth), len(iou_thresholds)), dtype=bool)
+    order = np.argsort(-detections.confidences, kind='stable')
+    for j in order[(iou[:, order] >= np.min(iou_thresholds)).any(0)]:
+        available = np.where(matched, 0, iou[:, j, None])
+        best = available.argmax(0)
+        correct[j] = available[best, columns] >= iou_thresholds
+        matched[best, columns] |= correct[j]
+    return correct
+
+def smooth(values: np.ndarray, fraction: float = 0.05) -> np.ndarray:
+    """Скользящее среднее с окном fraction длины (края дополняются)"""
+    window = round(len(values) * fraction * 2) // 2 + 1
+    pad = np.ones(window // 2)
+    padded = np.concatenate([pad * values[0], values, pad * values[-1]])
+    return np.convolve(padded, np.ones(window) / window, mode='valid')
+
+def average_precision(recall: np.ndarray, precision: np.ndarray) -> np.ndarray:
+    """
+    AP по 101 точке для каждого столбца (порога IoU)
+
+    Args:
+        recall: Массив (K, T) полноты по убыванию уверенности
+        precision: Массив (K, T) точности
+
+    Returns:
+        Массив (T,) значений AP
+    """
+    thresholds = recall.shape[1]
+    last = recall[-1] if len(recall) else np.ones(thresholds)
+    # После последней точки точность падает до нуля, а не линейно до полноты 1
+    recall = np.vstack([np.zeros(thresholds), recall, last, np.ones(thresholds)])
+    precision = np.vstack([np.ones(thresholds), precision, np.zeros((2, thresholds))])
+
+    # Огибающая точности: максимум справа
+    envelope = np.flip(np.maximum.accumulate(np.flip(precision, axis=0), axis=0), axis=0)
+
+    grid = np.linspace(0, 1, 101)
+    return np.array([
+        _trapezoid(np.interp(grid, recall[:, t], envelope[:, t]), grid)
+        for t in range(thresholds)
+    ])
+
+class DetectionEvaluator:
+    """
+    Накопитель сопоставлений для precision, recall, mAP50 и mAP50-95
+
+    Для каждого изображения хранятся только булевы отметки верных
+    предсказаний по порогам IoU, уверенности и классы, поэтому
+    накопители разных частей разбивки объединяются через merge().
+    Метрики считаются так же, как ultralytics val: precision и recall
+    берутся при уверенности с максимальным средним F1.
+    """
+
+    def __init__(self,
+                 class_names: Mapping[int, str],
+                 iou_thresholds: np.ndarray = IOU_THRESHOLDS):
+        """
+        Args:
+            class_names: Отображение ID класса -> название
+            iou_thresholds: Пороги IoU (первый - для mAP50)
+        """
+        self.class_names = dict(class_names)
+        self.iou_thresholds = np.asarray(iou_thresholds)
+        self.images = 0
+        self._correct: List[np.ndarray] = []
+        self._confidences: List[np.ndarray] = []
+        self._pred_classes: List[np.ndarray] = []
+        self._true_classes: List[np.ndarray] = []
+
+    def update(self, detections: Detections, truth: Detections):
+        """Добавляет предсказания и разметку одного изображения"""
+        self.images += 1
+        self._correct.append(match_predictions(detections, truth, self.iou_thresholds))
+        self._confidences.append(detections.confidences)
+        self._pred_classes.append(detections.class_ids)
+        self._true_classes.append(truth.class_ids)
+
+    def merge(self, other: "DetectionEvaluator") -> "DetectionEvaluator":
+        """Добавляет сопоставления другого накопителя"""
+        if not np.array_equal(self.iou_thresholds, other.iou_thresholds):
+            raise ValueError("Нельзя объединить оценки с разными порогами IoU")
+        self.images += other.images
+        self._correct += other._correct
+        self._confidences += other._confidences
+        self._pred_classes += other._pred_classes
+        self._true_classes += other._true_classes
+        return self
+
+    def compute(self) -> Dict[str, Any]:
+        """
+        Метрики по классам и общие
+
+        Returns:
+            Словарь с 'per_class' (список словарей 'class_id',
+            'class_name', 'instances', 'precision', 'recall', 'map50',
+            'map50_95' для классов, встречающихся в разметке) и средними
+            по этим классам 'precision', 'recall', 'map50', 'map50_95'
+        """
+        thresholds = len(self.iou_thresholds)
+        correct = np.concatenate(self._correct) if self._correct else np.zeros((0, thresholds), bool)
+        confidences = np.concatenate(self._confidences) if self._confidences else np.zeros(0)
+        pred_classes = np.concatenate(self._pred_classes) if self._pred_classes else np.zeros(0, int)
+        true_classes = np.concatenate(self._true_classes) if self._true_classes else np.zeros(0, int)
+
+        order = np.argsort(-confidences, kind='stable')
+        correct, confidences, pred_classes = correct[order], confidences[order], pred_classes[order]
+
+        classes, instances = np.unique(true_classes.astype(int), return_counts=True)
+        grid = np.linspace(0, 1, 1000)
+        ap = np.zeros((len(classes), thresholds))
+        precision_curve = np.zeros((len(classes), len(grid)))
+        recall_curve = np.zeros((len(classes), len(grid)))
+
+        for row, (class_id, count) in enumerate(zip(classes, instances)):
+            mask = pred_classes == class_id
+            if not mask.any():
+                continue
+            true_positives = correct[mask].cumsum(axis=0)
+            false_positives = (~correct[mask]).cumsum(axis=0)
+            recall = true_positives / (count + 1e-16)
+            precision = true_positives / (true_positives + false_positives)
+
+            # Кривые на общей сетке уверенностей (уверенность убывает)
+            recall_curve[row] = np.interp(-grid, -confidences[mask], recall[:, 0], left=0)
+            precision_curve[row] = np.interp(-grid, -confidences[mask], precision[:, 0], left=1)
+            ap[row] = average_precision(recall, precision)
+
+        f1 = 2 * precision_curve * recall_curve / (precision_curve + recall_curve + 1e-16)
+        best = int(smooth(f1.mean(axis=0), 0.1).argmax()) if len(classes) else 0
+        precision, recall = precision_curve[:, best], recall_curve[:, best]
+
+        per_class = [
+            {
+                'class_id': int(class_id),
+                'class_name': self.class_names.get(int(class_id), str(class_id)),
+                'instances': int(count),
+                'precision': float(precision[row]),
+                'recall': float(recall[row]),
+                'map50': float(ap[row, 0]),
+                'map50_95': float(ap[row].mean())
+            }
+            for row, (class_id, count) in enumerate(zip(classes, instances))
+        ]
+
+        def mean(values):
+            return float(np.mean(values)) if len(values) else 0.0
+
+        return {
+            'images': self.images,
+            'per_class': per_class,
+            'precision': mean(precision),
+            'recall': mean(recall),
+            'map50': mean(ap[:, 0]),
+            'map50_95': mean(ap.mean(axis=1)) if len(ap) else 0.0
+        }
+
+def metrics_table(report: Mapping[str, Any]) -> str:
+    """
+    Таблица метрик в формате README
+
+    Args:
+        report: Результат DetectionEvaluator.compute()
+
+    Returns:
+        Таблица Markdown: класс, precision, recall, mAP50, mAP50-95
+        и строка с общими значениями
+    """
+    rows = [
+        [row['class_name'], f"{row['precision']:.1%}", f"{row['recall']:.1%}",
+         f"{row['map50']:.1%}", f"{row['map50_95']:.1%}"]
+        for row in report['per_class']
+    ]
+    rows.append([
+        "**Общее**",
+        f"**{report['precision']:.1%}**",
+        f"**{report['recall']:.1%}**",
+        f"**{report['map50']:.1%}**",
+        f"**{report['map50_95']:.1%}**"
+    ])
+    return markdown_table(["Класс", "Precision", "Recall", "mAP50", "mAP50-95"], rows)
+
+def evaluate_split(runner,
+                   split: str = 'val',
+                   conf_threshold: float = EVAL_CONFIDENCE,
+                   iou_threshold: float = EVAL_IOU,
+                   img_size: int = DEFAULT_IMAGE_SIZE,
+                   batch_size: int = 16,
+                   decode_workers: int = 4,
+                   limit: Optional[int] = None,
+                   config_path: Union[str, Path] = CONFIG_PATH,
+                   dataset_root: Optional[Union[str, Path]] = DATASET_ROOT,
+                   progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
+    """
+    Precision, recall, mAP50 и mAP50-95 по классам на разбивке датасета
+
+    Разбивки и названия классов берутся из конфига датасета. Изображения
+    декодируются пулом потоков пакетами по batch_size на каждый воркер
+    (следующий пакет - пока модель обрабатывает текущий) и проходят через
+    runner.detect_batch(); для больших разбивок runner - DetectorPool с
+    процессами-воркерами. Файлы, которые не удалось прочитать,
+    пропускаются и перечисляются в 'errors'.
+
+    Args:
+        runner: TrafficSignDetector или DetectorPool
+        split: Разбивка ('train', 'val' или 'test')
+        conf_threshold: Порог уверенности (низкий, как в ultralytics val)
+        iou_threshold: Порог IoU для NMS
+        img_size: Размер входа модели
+        batch_size: Размер пакета detect_batch()
+        decode_workers: Потоков декодирования
+        limit: Максимум изображений разбивки
+        config_path: Путь к конфигу датасета
+        dataset_root: Корень датасета вместо поля path из конфига
+        progress: Функция (обработано, всего), вызываемая после пакета
+
+    Returns:
+        Результат DetectionEvaluator.compute() с дополнительными 'split',
+        'seconds', 'images_per_second' и 'errors' (список словарей 'path',
+        'error' для пропущенных файлов)
+    """
+    config = load_dataset_config(config_path, dataset_root)
+    names = config['names']
+    class_names = dict(enumerate(names)) if isinstance(names, list) else {int(k): v for k, v in names.items()}
+    paths = split_image_paths(split, config)[:limit]
+
+    evaluator = DetectionEvaluator(class_names)
+    errors = []
+    # Пакет на каждый воркер пула, чтобы все воркеры были заняты
+    step = batch_size * getattr(runner, 'num_workers', 1)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=decode_workers, thread_name_prefix="decode") as pool:
+        for batch in decode_ahead(paths, pool, step):
+            decoded = []
+            for path, image in batch:
+                if isinstance(image, Exception):
+                    errors.append({'path': str(path), 'error': str(image)})
+                else:
+                    decoded.append((path, image))
+            del batch
+
+            results = runner.detect_batch(
+                [image for _, image in decoded],
+                conf_threshold=conf_threshold,
+                iou_threshold=iou_threshold,
+                img_size=img_size,
+                batch_size=batch_size
+            )
+            for (path, image), result in zip(decoded, results):
+                evaluator.update(result['detections'], load_ground_truth(path, image.shape, class_names))
+            del decoded, image
+
+            if progress is not None:
+                progress(evaluator.images + len(errors), len(paths))
+
+    seconds = time.perf_counter() - start
+    report = evaluator.compute()
+    report.update({
+        'split': split,
+        'seconds': seconds,
+        'images_per_second': len(paths) / seconds if seconds > 0 else 0.0,
+        'errors': errors
+    })
+    return report
@@ -0,0 +1,130 @@
+import cv2
+import numpy as np
+from concurrent.futures import Executor
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator, List, Tuple, Union
+
+# Флаги cv2.imdecode для декодирования с уменьшением в 1, 2, 4 или 8 раз.
+# JPEG при уменьшении декодируется сразу в малый размер (DCT scaling),
+# без промежуточного полноразмерного буфера
+REDUCE_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+ImageBytes = Union[bytes, bytearray, memoryview, np.ndarray]
+
+def bgr_to_rgb(image: np.ndarray) -> np.ndarray:
+    """
+    Переставляет каналы BGR -> RGB на месте, без нового буфера
+
+    Args:
+        image: Изображение (H, W, 3) uint8 в порядке BGR
+
+    Returns:
+        То же изображение в порядке RGB
+    """
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=image)
+
+def decode_image(data: ImageBytes, reduce: int = 1) -> np.ndarray:
+    """
+    Декодирует JPEG/PNG из памяти в RGB массив
+
+    Байты не копируются: imdecode читает их через буфер NumPy, а порядок
+    каналов меняется в декодированном массиве на месте.
+
+    Args:
+        data: Закодированное изображение (bytes, memoryview или массив uint8,
+            в том числе np.memmap файла)
+        reduce: Уменьшение при декодировании: 1, 2, 4 или 8
+
+    Returns:
+        Изображение (H, W, 3) uint8 в порядке RGB
+
+    Raises:
+        ValueError: Данные не являются поддерживаемым изображением
+    """
+    if reduce not in REDUCE_FLAGS:
+        raise ValueError(f"reduce должен быть одним из {tuple(REDUCE_FLAGS)}: {reduce}")
+
+    buffer = data if isinstance(data, np.ndarray) else np.frombuffer(data, dtype=np.uint8)
+    if buffer.size == 0:
+        raise ValueError("Пустые данные изображения")
+
+    image = cv2.imdecode(buffer, REDUCE_FLAGS[reduce])
+    if image is None:
+        raise ValueError("Не удалось декодировать изображение (ожидается JPEG или PNG)")
+    return bgr_to_rgb(image)
+
+def read_image(path: Union[str, Path], reduce: int = 1) -> np.ndarray:
+    """
+    Читает изображение из файла через отображение в память
+
+    Файл не читается в промежуточный буфер Python: imdecode работает
+    напрямую со страницами np.memmap.
+
+    Args:
+        path: Путь к изображению
+        reduce: Уменьшение при декодировании: 1, 2, 4 или 8
+
+    Returns:
+        Изображение (H, W, 3) uint8 в порядке RGB
+    """
+    path = Path(path)
+    if not path.is_file():
+        raise FileNotFoundError(f"Изображение не найдено: {path}")
+    if path.stat().st_size == 0:
+        raise ValueError(f"Пустой файл изображения: {path}")
+
+    # Отображение закрывается, когда на него не остается ссылок
+    mapped = np.memmap(path, dtype=np.uint8, mode='r')
+    try:
+        return decode_image(mapped, reduce)
+    except ValueError as error:
+        raise ValueError(f"{error}: {path}") from None
+
+def decode_ahead(paths: Iterable[Path],
+                 executor: Executor,
+                 batch_size: int) -> Iterator[List[Tuple[Path, Union[np.ndarray, Exception]]]]:
+    """
+    Читает изображения пакетами, опережая потребителя на один пакет
+
+    Следующий пакет декодируется в executor, пока обрабатывается
+    текущий, поэтому в памяти одновременно не больше трех пакетов
+    декодированных изображений (предыдущий, текущий и следующий)
+    независимо от длины списка путей.
+
+    Args:
+        paths: Пути к изображениям (в том числе ленивый итератор)
+        executor: Пул потоков декодирования
+        batch_size: Изображений в пакете
+
+    Yields:
+        Список пар (путь, изображение); для файлов, которые не удалось
+        прочитать, вместо изображения - исключение (OSError или ValueError)
+    """
+    if batch_size < 1:
+        raise ValueError(f"batch_size должен быть положительным: {batch_size}")
+
+    paths = iter(paths)
+
+    def submit():
+        return [(path, executor.submit(read_image, path)) for path in islice(paths, batch_size)]
+
+    pending = submit()
+    try:
+        while pending:
+            batch = []
+            for path, future in pending:
+                try:
+                    batch.append((path, future.result()))
+                except (OSError, ValueError) as error:
+                    batch.append((path, error))
+            pending = submit()
+            yield batch
+    finally:
+        for _, future in pending:
+            future.cancel()
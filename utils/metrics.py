@@ -0,0 +1,324 @@
+import bisect
+import json
+import threading
+import time
+import numpy as np
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Any, IO, Iterable, List, Mapping, Optional, Sequence, Union
+
+from config import CLASS_NAMES
+
+# Границы корзин гистограмм задержки, мс
+DEFAULT_LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Стадии detect(): замеры ultralytics, разбор результата и весь вызов
+STAGES = ('preprocess', 'inference', 'postprocess', 'parse', 'total')
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+class LatencyHistogram:
+    """Гистограмма задержек с фиксированными корзинами (как в Prometheus)"""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS_MS):
+        """
+        Args:
+            buckets: Возрастающие верхние границы корзин в мс
+        """
+        self.buckets = tuple(float(b) for b in buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value_ms: float, count: int = 1):
+        """Добавляет значение (или count одинаковых значений)"""
+        self.counts[bisect.bisect_left(self.buckets, value_ms)] += count
+        self.count += count
+        self.sum += value_ms * count
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Оценка квантиля линейной интерполяцией внутри корзины
+
+        Returns:
+            Значение в мс или None, если замеров нет
+        """
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count and cumulative + bucket_count >= rank:
+                if index == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index]
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.buckets[-1]
+
+    @property
+    def mean(self) -> Optional[float]:
+        """Средняя задержка в мс"""
+        return self.sum / self.count if self.count else None
+
+class JsonLogSink:
+    """
+    Приемник событий: одна строка JSON на вызов детектора
+
+    Подходит для сборщиков логов (Loki, ELK); файл открывается на дозапись.
+    """
+
+    def __init__(self, target: Union[str, Path, IO[str]]):
+        """
+        Args:
+            target: Путь к файлу или открытый текстовый поток
+        """
+        if isinstance(target, (str, Path)):
+            self._stream = open(target, 'a', encoding='utf-8')
+            self._owned = True
+        else:
+            self._stream = target
+            self._owned = False
+        self._lock = threading.Lock()
+
+    def emit(self, event: Dict[str, Any]):
+        line = json.dumps(event, ensure_ascii=False)
+        with self._lock:
+            self._stream.write(line + "\n")
+            self._stream.flush()
+
+    def close(self):
+        if self._owned:
+            self._stream.close()
+
+class DetectorMetrics:
+    """
+    Счетчики и гистограммы задержки детектора
+
+    Считает обработанные изображения, детекции по классам и ошибки по
+    типу исключения, а также задержку каждой стадии detect() на
+    изображение. Каждый вызов детектора дополнительно передается
+    подключенным приемникам (например, JsonLogSink). Агрегаты
+    отдаются в текстовом формате Prometheus через to_prometheus().
+    Безопасен для использования из нескольких потоков.
+
+    Детектор без метрик (metrics=None) не делает лишних замеров.
+    """
+
+    def __init__(self,
+                 class_names: Optional[Mapping[int, str]] = None,
+                 sinks: Iterable[Any] = (),
+                 buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS_MS,
+                 namespace: str = "traffic_signs"):
+        """
+        Args:
+            class_names: Отображение ID класса -> название
+                (по умолчанию CLASS_NAMES из конфига)
+            sinks: Приемники событий с методом emit(event)
+            buckets: Границы корзин гистограмм в мс
+            namespace: Префикс имен метрик Prometheus
+        """
+        self.class_names = dict(class_names) if class_names is not None else dict(enumerate(CLASS_NAMES))
+        self.sinks: List[Any] = list(sinks)
+        self.namespace = namespace
+
+        self.images = 0
+        self.calls = 0
+        self.detections = np.zeros(max(self.class_names) + 1 if self.class_names else 0, dtype=np.int64)
+        self.errors: Dict[str, int] = {}
+        self.latency = {stage: LatencyHistogram(buckets) for stage in STAGES}
+        self._lock = threading.Lock()
+
+    def observe(self, results: Sequence[Dict[str, Any]], elapsed_ms: float, kind: str = 'detect'):
+        """
+        Учитывает результаты одного вызова detect()/detect_batch()
+
+        Args:
+            results: Результаты в формате detect()
+            elapsed_ms: Время всего вызова; делится поровну между изображениями
+            kind: Тип вызова для событий приемников
+        """
+        if not results:
+            return
+        class_ids = np.concatenate([result['detections'].class_ids for result in results])
+        speeds = [result['model_info'].get('speed', {}) for result in results]
+        self.record(len(results), elapsed_ms, speeds, class_ids, kind)
+
+    def record(self,
+               images: int,
+               elapsed_ms: float,
+               speeds: Sequence[Mapping[str, float]] = (),
+               class_ids: Optional[np.ndarray] = None,
+               kind: str = 'detect'):
+        """
+        Учитывает вызов детектора, заданный замерами
+
+        Args:
+            images: Число изображений в вызове
+            elapsed_ms: Время всего вызова в мс
+            speeds: Время стадий на изображение (model_info['speed'])
+            class_ids: ID классов итоговых детекций (None - не учитывать)
+            kind: Тип вызова для событий приемников
+        """
+        per_image = elapsed_ms / images
+        counts = None
+        if class_ids is not None and len(self.detections):
+            counts = np.bincount(np.asarray(class_ids, dtype=np.intp), minlength=len(self.detections))
+
+        with self._lock:
+            self.calls += 1
+            self.images += images
+            self.latency['total'].observe(per_image, images)
+            for speed in speeds:
+                for stage, value in speed.items():
+                    histogram = self.latency.get(stage)
+                    if histogram is not None:
+                        histogram.observe(value)
+            if counts is not None:
+                self.detections += counts[:len(self.detections)]
+
+        if self.sinks:
+            stage_means = {
+                stage: float(np.mean([speed[stage] for speed in speeds if stage in speed]))
+                for stage in STAGES[:-1]
+                if any(stage in speed for speed in speeds)
+            }
+            event = {
+                'time': time.time(),
+                'event': kind,
+                'images': images,
+                'latency_ms': per_image,
+                'stages_ms': stage_means,
+            }
+            if counts is not None:
+                event['detections'] = {
+                    self.class_names.get(class_id, str(class_id)): int(count)
+                    for class_id, count in enumerate(counts) if count
+                }
+            self._emit(event)
+
+    def record_error(self, error: BaseException, kind: str = 'detect'):
+        """Учитывает исключение при вызове модели"""
+        name = type(error).__name__
+        with self._lock:
+            self.errors[name] = self.errors.get(name, 0) + 1
+        if self.sinks:
+            self._emit({'time': time.time(), 'event': kind, 'error': name, 'message': str(error)})
+
+    def _emit(self, event: Dict[str, Any]):
+        for sink in self.sinks:
+            sink.emit(event)
+
+    def latency_ms(self, stage: str = 'total', q: float = 0.5) -> Optional[float]:
+        """Квантиль задержки стадии на изображение в мс (None без замеров)"""
+        with self._lock:
+            return self.latency[stage].quantile(q)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-совместимая сводка текущих значений"""
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'images': self.images,
+                'errors': dict(self.errors),
+                'detections': {
+                    self.class_names.get(class_id, str(class_id)): int(count)
+                    for class_id, count in enumerate(self.detections) if count
+                },
+                'latency_ms': {
+                    stage: {
+                        'count': histogram.count,
+                        'mean': histogram.mean,
+                        'p50': histogram.quantile(0.5),
+                        'p95': histogram.quantile(0.95),
+                        'p99': histogram.quantile(0.99)
+                    }
+                    for stage, histogram in self.latency.items()
+                }
+            }
+
+    def to_prometheus(self) -> str:
+        """
+        Метрики в текстовом формате Prometheus
+
+        Задержки отдаются в секундах, как принято в Prometheus.
+        """
+        ns = self.namespace
+        with self._lock:
+            lines = [
+                f"# HELP {ns}_calls_total Вызовов детектора",
+                f"# TYPE {ns}_calls_total counter",
+                f"{ns}_calls_total {self.calls}",
+                f"# HELP {ns}_images_total Обработанных моделью изображений",
+                f"# TYPE {ns}_images_total counter",
+                f"{ns}_images_total {self.images}",
+                f"# HELP {ns}_detections_total Детекций по классам",
+                f"# TYPE {ns}_detections_total counter",
+            ]
+            for class_id, count in enumerate(self.detections):
+                name = _escape_label(self.class_names.get(class_id, str(class_id)))
+                lines.append(f'{ns}_detections_total{{class="{name}"}} {int(count)}')
+
+            lines += [
+                f"# HELP {ns}_errors_total Ошибок модели по типу исключения",
+                f"# TYPE {ns}_errors_total counter",
+            ]
+            for name, count in sorted(self.errors.items()):
+                lines.append(f'{ns}_errors_total{{type="{_escape_label(name)}"}} {count}')
+
+            lines += [
+                f"# HELP {ns}_stage_latency_seconds Задержка стадии на изображение",
+                f"# TYPE {ns}_stage_latency_seconds histogram",
+            ]
+            for stage, histogram in self.latency.items():
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(
+                        f'{ns}_stage_latency_seconds_bucket{{stage="{stage}",le="{bound / 1000:g}"}} {cumulative}'
+                    )
+                lines += [
+                    f'{ns}_stage_latency_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}',
+                    f'{ns}_stage_latency_seconds_sum{{stage="{stage}"}} {histogram.sum / 1000:.6f}',
+                    f'{ns}_stage_latency_seconds_count{{stage="{stage}"}} {histogram.count}',
+                ]
+        return "\n".join(lines) + "\n"
+
+def _escape_label(value: str) -> str:
+    """Экранирование значения метки Prometheus"""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def serve_prometheus(metrics: DetectorMetrics, host: str = "0.0.0.0", port: int = 9100) -> ThreadingHTTPServer:
+    """
+    Запускает в фоновом потоке HTTP-эндпоинт /metrics для Prometheus
+
+    Нужен процессам без собственного HTTP-сервера (например, Streamlit);
+    server.py отдает те же метрики по пути /metrics.
+
+    Args:
+        metrics: Метрики детектора
+        host: Адрес
+        port: Порт
+
+    Returns:
+        Запущенный сервер; остановка - shutdown()
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = metrics.to_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
@@ -0,0 +1,466 @@
+import multiprocessing as mp
+import os
+import queue
+import threading
+import numpy as np
+from concurrent.futures import Future
+from multiprocessing import connection, shared_memory
+from typing import Dict, List, Any, Optional, Sequence, Tuple
+
+from config import INFERENCE_BACKEND
+from utils.backends import resolve_model_path
+
+# Максимальный размер кадра по умолчанию: 4K RGB
+DEFAULT_SLOT_BYTES = 3840 * 2160 * 3
+
+# Период проверки, что процессы-воркеры живы, в секундах
+WATCHDOG_INTERVAL = 0.5
+
+class WorkerCrashedError(RuntimeError):
+    """Процесс-воркер завершился, не вернув результат задачи"""
+
+def _worker_main(worker_id: int,
+                 model_path: str,
+                 backend: str,
+                 shm_name: str,
+                 slot_bytes: int,
+                 num_threads: int,
+                 shared_weights: Optional[Dict[str, Any]],
+                 requests: Any,
+                 responses: Any):
+    """
+    Основной цикл процесса-воркера
+
+    Кадры читаются напрямую из общего кольцевого буфера воркера, по
+    очереди передаются только номера слотов, формы и параметры; ответы
+    отправляются в канал responses. Веса
+    из shared_weights (общая память главного процесса) подменяют
+    собственную копию модели воркера.
+    """
+    import torch
+
+    # Фиксируем число потоков до загрузки модели
+    torch.set_num_threads(num_threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        from utils.detection import TrafficSignDetector, release_freed_memory
+        detector = TrafficSignDetector(model_path, backend=backend)
+        detector.warmup()
+        if shared_weights is not None:
+            detector.use_shared_weights(shared_weights)
+            del shared_weights
+        # Память, занятая на время загрузки и прогрева, возвращается системе
+        release_freed_memory()
+    except Exception as error:
+        responses.send(('error', worker_id, None, error))
+        shm.close()
+        return
+
+    responses.send(('ready', worker_id, None, dict(detector.class_names)))
+
+    try:
+        while True:
+            message = requests.get()
+            if message is None:
+                break
+
+            task_id, frames, kwargs = message
+            try:
+                images = [
+                    np.ndarray(shape, dtype=np.uint8, buffer=shm.buf, offset=slot * slot_bytes)
+                    for slot, shape in frames
+                ]
+                results = detector.detect_batch(images, batch_size=len(images), **kwargs)
+                # Результаты не должны ссылаться на общую память
+                del images
+                responses.send(('result', worker_id, task_id, results))
+            except Exception as error:
+                responses.send(('result', worker_id, task_id, error))
+    finally:
+        shm.close()
+
+class _WorkerHandle:
+    """Состояние воркера на стороне главного процесса"""
+
+    def __init__(self, worker_id: int, slots: int, slot_bytes: int):
+        self.worker_id = worker_id
+        self.slot_bytes = slot_bytes
+        self.shm = shared_memory.SharedMemory(create=True, size=slots * slot_bytes)
+        self.free_slots = queue.Queue()
+        for slot in range(slots):
+            self.free_slots.put(slot)
+        # Захват нескольких слотов одним вызывающим без взаимоблокировок
+        self.acquire_lock = threading.Lock()
+        self.requests = None
+        self.responses = None
+        self.process = None
+        self.in_flight = 0
+        # ready - модель загружена; failed - воркер выведен из пула
+        self.ready = False
+        self.failed = False
+
+    def slot_view(self, slot: int, shape: Sequence[int]) -> np.ndarray:
+        return np.ndarray(shape, dtype=np.uint8, buffer=self.shm.buf, offset=slot * self.slot_bytes)
+
+class DetectorPool:
+    """
+    Пул процессов с репликами TrafficSignDetector для CPU
+
+    Каждый воркер загружает свою копию модели и использует фиксированное
+    число потоков torch; с shared_weights веса слитой модели берутся из
+    общей памяти главного процесса. Кадры передаются через кольцевой буфер
+    multiprocessing.shared_memory, а не сериализацией массивов.
+    Интерфейс detect()/detect_batch() совпадает с TrafficSignDetector.
+
+    Если воркер завершается во время работы (падение, OOM killer),
+    задачи воркера завершаются ошибкой WorkerCrashedError, слоты
+    освобождаются, а воркер перезапускается. Воркер, который не смог
+    заново загрузить модель, выводится из пула; когда таких не остается,
+    submit() сообщает об ошибке.
+    """
+
+    def __init__(self,
+                 model_path: str,
+                 backend: str = INFERENCE_BACKEND,
+                 num_workers: Optional[int] = None,
+                 threads_per_worker: Optional[int] = None,
+                 slots_per_worker: int = 8,
+                 max_image_bytes: int = DEFAULT_SLOT_BYTES,
+                 start_method: str = 'spawn',
+                 shared_weights: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            model_path: Путь к файлу модели (.pt)
+            backend: Движок инференса (см. TrafficSignDetector)
+            num_workers: Число процессов (по умолчанию - число ядер)
+            threads_per_worker: Потоков torch на воркер
+                (по умолчанию ядра делятся поровну)
+            slots_per_worker: Размер кольцевого буфера воркера в кадрах;
+                он же - максимальный размер пакета на воркер
+            max_image_bytes: Размер одного слота в байтах
+            start_method: Способ запуска процессов multiprocessing
+            shared_weights: Веса из TrafficSignDetector.shared_weights();
+                воркеры используют их вместо своей копии (только pytorch)
+        """
+        cpu_count = os.cpu_count() or 1
+        self.model_path = str(model_path)
+        self.backend = backend
+        # Экспорт ONNX/OpenVINO выполняется здесь один раз: воркеры,
+        # запущенные одновременно, иначе экспортировали бы модель в один и
+        # тот же файл и могли загрузить его недописанным. Воркеры находят
+        # свежий экспорт и только открывают его
+        self.runtime_path = resolve_model_path(self.model_path, backend)
+        self.num_workers = num_workers or cpu_count
+        self.threads_per_worker = threads_per_worker or max(1, cpu_count // self.num_workers)
+        self.slots_per_worker = slots_per_worker
+        self.max_image_bytes = max_image_bytes
+        self.class_names: Dict[int, str] = {}
+        self.restarts = 0
+
+        self._context = mp.get_context(start_method)
+        self._shared_weights = shared_weights
+        self._workers: List[_WorkerHandle] = []
+        self._futures: Dict[int, Future] = {}
+        # Задача -> (воркер, занятые слоты его буфера)
+        self._tasks: Dict[int, Tuple[_WorkerHandle, List[int]]] = {}
+        self._lock = threading.Lock()
+        self._next_task = 0
+        self._closed = False
+
+        for worker_id in range(self.num_workers):
+            handle = _WorkerHandle(worker_id, slots_per_worker, max_image_bytes)
+            handle.requests = self._context.Queue()
+            self._start_worker(handle)
+            self._workers.append(handle)
+
+        try:
+            self._wait_ready()
+        except Exception:
+            self.close()
+            raise
+
+        self._collector = threading.Thread(target=self._collect, daemon=True)
+        self._collector.start()
+
+        print(f"✅ Пул детекторов запущен: {self.num_workers} процессов "
+              f"по {self.threads_per_worker} потоков")
+
+    def _start_worker(self, handle: _WorkerHandle):
+        """
+        Запускает процесс воркера
+
+        Задачи воркер читает из handle.requests, ответы пишет в свой канал
+        handle.responses: общий канал ответов мог бы остаться заблокированным
+        воркером, завершившимся во время записи.
+        """
+        handle.ready = False
+        handle.responses, writer = self._context.Pipe(duplex=False)
+        handle.process = self._context.Process(
+            target=_worker_main,
+            args=(handle.worker_id, self.model_path, self.backend, handle.shm.name, self.max_image_bytes,
+                  self.threads_per_worker, self._shared_weights, handle.requests, writer),
+            daemon=True
+        )
+        handle.process.start()
+        # Конец записи остается только у воркера: после его завершения чтение дает EOF
+        writer.close()
+
+    def _receive(self, handle: _WorkerHandle) -> Optional[tuple]:
+        """Следующее сообщение воркера или None, если он завершился"""
+        try:
+            return handle.responses.recv()
+        except (EOFError, OSError):
+            return None
+
+    def _wait_ready(self):
+        """Ждет загрузки модели во всех воркерах"""
+        pending = {handle.responses: handle for handle in self._workers}
+        while pending:
+            sentinels = {handle.process.sentinel: handle for handle in pending.values()}
+            for ready in connection.wait(list(pending) + list(sentinels)):
+                handle = pending.get(ready) or sentinels[ready]
+                if handle.responses not in pending:
+                    continue
+                message = self._receive(handle)
+                if message is None:
+                    # Воркер завершился, не успев сообщить об ошибке
+                    handle.process.join()
+                    raise RuntimeError(f"Воркер {handle.worker_id} завершился "
+                                       f"с кодом {handle.process.exitcode}")
+                del pending[handle.responses]
+                kind, worker_id, _, payload = message
+                if kind == 'error':
+                    raise RuntimeError(f"Воркер {worker_id} не смог загрузить модель: {payload}")
+                handle.ready = True
+                self.class_names = payload
+
+    def _collect(self):
+        """Фоновый поток: раздает результаты, освобождает слоты и следит за воркерами"""
+        while not self._closed:
+            handles = [handle for handle in self._workers if not handle.failed]
+            readers = {handle.responses: handle for handle in handles}
+            sentinels = {handle.process.sentinel: handle for handle in handles}
+            # Таймаут - чтобы заметить close()
+            for ready in connection.wait(list(readers) + list(sentinels), timeout=WATCHDOG_INTERVAL):
+                handle = readers.get(ready) or sentinels[ready]
+                # Воркер мог быть перезапущен или выведен из пула в этой же итерации
+                if handle.failed or self._closed:
+                    continue
+                if ready is handle.responses:
+                    message = self._receive(handle)
+                    if message is not None:
+                        self._dispatch(*message)
+                elif ready == handle.process.sentinel:
+                    self._worker_exited(handle)
+
+    def _worker_exited(self, handle: _WorkerHandle):
+        """Обрабатывает завершение процесса-воркера"""
+        # Ответы, отправленные до завершения, еще доставляются
+        while handle.responses.poll():
+            message = self._receive(handle)
+            if message is None:
+                break
+            self._dispatch(*message)
+        if handle.failed:
+            return
+
+        handle.process.join()
+        error = WorkerCrashedError(f"Воркер {handle.worker_id} завершился с кодом {handle.process.exitcode}")
+        # Воркер, упавший до загрузки модели, при перезапуске упал бы снова
+        self._fail_worker(handle, error, restart=handle.ready)
+
+    def _dispatch(self, kind: str, worker_id: int, task_id: Optional[int], payload: Any):
+        """Обрабатывает сообщение воркера"""
+        handle = self._workers[worker_id]
+        if kind == 'ready':
+            handle.ready = True
+            return
+        if kind == 'error':
+            # Перезапущенный воркер не смог загрузить модель
+            self._fail_worker(handle, RuntimeError(f"Воркер {worker_id} не смог загрузить модель: {payload}"),
+                              restart=False)
+            return
+
+        with self._lock:
+            future = self._futures.pop(task_id, None)
+            if future is None:
+                # Задача уже завершена ошибкой после падения воркера
+                return
+            _, slots = self._tasks.pop(task_id)
+            handle.in_flight -= 1
+
+        for slot in slots:
+            handle.free_slots.put(slot)
+
+        if isinstance(payload, Exception):
+            future.set_exception(payload)
+        else:
+            future.set_result(payload)
+
+    def _fail_worker(self, handle: _WorkerHandle, error: Exception, restart: bool):
+        """
+        Завершает задачи воркера ошибкой и перезапускает его или выводит из пула
+
+        Очередь задач заменяется под блокировкой пула, поэтому задача,
+        отправленная после этого, попадет к новому процессу, а не
+        потеряется в очереди завершившегося (ее блокировка чтения могла
+        остаться захваченной им).
+        """
+        with self._lock:
+            task_ids = [task_id for task_id, (owner, _) in self._tasks.items() if owner is handle]
+            failed = [(self._futures.pop(task_id), self._tasks.pop(task_id)[1]) for task_id in task_ids]
+            handle.in_flight = 0
+            restart = restart and not self._closed
+            if restart:
+                handle.requests = self._context.Queue()
+                self.restarts += 1
+            else:
+                handle.failed = True
+
+        handle.responses.close()
+        if restart:
+            print(f"⚠️ {error}, перезапуск")
+            self._start_worker(handle)
+        else:
+            print(f"❌ {error}, воркер выведен из пула")
+
+        for future, slots in failed:
+            for slot in slots:
+                handle.free_slots.put(slot)
+            future.set_exception(error)
+
+    def _pick_worker(self) -> _WorkerHandle:
+        with self._lock:
+            workers = [w for w in self._workers if not w.failed]
+            if not workers:
+                raise RuntimeError("В пуле детекторов не осталось работающих воркеров")
+            # Перезапускаемые воркеры получают задачи в последнюю очередь
+            return min(workers, key=lambda w: (not w.ready, w.in_flight, -w.free_slots.qsize()))
+
+    def submit(self, images: List[np.ndarray], **kwargs) -> Future:
+        """
+        Отправляет пакет изображений одному воркеру
+
+        Args:
+            images: Не более slots_per_worker изображений uint8
+            **kwargs: Параметры detect_batch()
+
+        Returns:
+            Future со списком результатов detect_batch()
+        """
+        if self._closed:
+            raise RuntimeError("Пул детекторов закрыт")
+        if len(images) > self.slots_per_worker:
+            raise ValueError(f"Пакет больше кольцевого буфера воркера: {len(images)} > {self.slots_per_worker}")
+
+        for image in images:
+            if image.dtype != np.uint8:
+                raise ValueError(f"Ожидается изображение uint8, получено {image.dtype}")
+            if image.nbytes > self.max_image_bytes:
+                raise ValueError(f"Изображение {image.shape} не помещается в слот "
+                                 f"({self.max_image_bytes} байт), увеличьте max_image_bytes")
+
+        handle = self._pick_worker()
+        with handle.acquire_lock:
+            slots = [handle.free_slots.get() for _ in images]
+
+        frames = []
+        for slot, image in zip(slots, images):
+            np.copyto(handle.slot_view(slot, image.shape), image)
+            frames.append((slot, image.shape))
+
+        kwargs.pop('batch_size', None)
+        future = Future()
+        with self._lock:
+            if not handle.failed:
+                task_id = self._next_task
+                self._next_task += 1
+                self._futures[task_id] = future
+                self._tasks[task_id] = (handle, slots)
+                handle.in_flight += 1
+                # Под блокировкой: очередь не подменится после падения воркера
+                handle.requests.put((task_id, frames, kwargs))
+                return future
+
+        for slot in slots:
+            handle.free_slots.put(slot)
+        raise RuntimeError(f"Воркер {handle.worker_id} выведен из пула")
+
+    def detect(self, image: np.ndarray, **kwargs) -> Dict[str, Any]:
+        """
+        Детекция на одном изображении в одном из воркеров
+
+        Args:
+            image: Изображение в формате numpy array (RGB)
+            **kwargs: Параметры detect()
+
+        Returns:
+            Словарь с результатами детекции
+        """
+        return self.submit([image], **kwargs).result()[0]
+
+    def detect_batch(self,
+                     images: List[np.ndarray],
+                     batch_size: int = 16,
+                     **kwargs) -> List[Dict[str, Any]]:
+        """
+        Детекция на наборе изображений; пакеты распределяются по воркерам
+
+        Args:
+            images: Список изображений в формате numpy array (RGB)
+            batch_size: Максимальный размер пакета на один воркер
+                (ограничен slots_per_worker)
+            **kwargs: Параметры detect_batch()
+
+        Returns:
+            Список результатов в порядке входных изображений
+        """
+        if batch_size < 1:
+            raise ValueError(f"batch_size должен быть положительным: {batch_size}")
+
+        images = list(images)
+        chunk = min(batch_size, self.slots_per_worker)
+        futures = [
+            self.submit(images[start:start + chunk], **kwargs)
+            for start in range(0, len(images), chunk)
+        ]
+
+        results = []
+        for future in futures:
+            results.extend(future.result())
+        return results
+
+    def close(self):
+        """Останавливает воркеры и освобождает общую память"""
+        if self._closed:
+            return
+        self._closed = True
+
+        for handle in self._workers:
+            if handle.process is not None and handle.process.is_alive():
+                handle.requests.put(None)
+        for handle in self._workers:
+            if handle.process is not None:
+                handle.process.join(timeout=10)
+                if handle.process.is_alive():
+                    handle.process.terminate()
+
+        if getattr(self, '_collector', None) is not None:
+            self._collector.join()
+
+        for handle in self._workers:
+            if handle.responses is not None:
+                handle.responses.close()
+            handle.shm.close()
+            handle.shm.unlink()
+
+    def __enter__(self) -> "DetectorPool":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
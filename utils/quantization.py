@@ -0,0 +1,155 @@
+import shutil
+import tempfile
+import numpy as np
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Union
+
+from config import CONFIG_PATH, DATASET_ROOT, DEFAULT_IMAGE_SIZE
+from utils.backends import check_backend, exported_model_path
+from utils.dataset import load_dataset_config, write_data_yaml
+
+def quantize_int8(model_path: Union[str, Path],
+                  calibration_split: str = 'val',
+                  img_size: int = DEFAULT_IMAGE_SIZE,
+                  fraction: float = 1.0,
+                  config_path: Union[str, Path] = CONFIG_PATH,
+                  dataset_root: Optional[Union[str, Path]] = DATASET_ROOT) -> Path:
+    """
+    Пост-тренировочное INT8 квантование модели в формат OpenVINO
+
+    Калибровка выполняется через NNCF на изображениях разбивки из конфига
+    датасета. Результат сохраняется рядом с весами и загружается
+    TrafficSignDetector с backend='openvino-int8'.
+
+    Args:
+        model_path: Путь к весам PyTorch (.pt)
+        calibration_split: Разбивка для калибровки ('train', 'val' или 'test')
+        img_size: Размер входа модели
+        fraction: Доля изображений разбивки, используемых для калибровки
+        config_path: Путь к конфигу датасета
+        dataset_root: Корень датасета вместо поля path из конфига
+
+    Returns:
+        Путь к папке INT8 модели
+    """
+    check_backend('openvino-int8')
+    from ultralytics import YOLO
+
+    model_path = Path(model_path)
+    config = load_dataset_config(config_path, dataset_root)
+    target = exported_model_path(model_path, 'openvino-int8')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_yaml = write_data_yaml(Path(tmp) / "data.yaml", config, val_split=calibration_split)
+        exported = Path(YOLO(str(model_path)).export(
+            format='openvino',
+            int8=True,
+            data=str(data_yaml),
+            fraction=fraction,
+            imgsz=img_size,
+            dynamic=True
+        ))
+
+    # Разные версии ultralytics называют папку по-разному
+    if exported.resolve() != target.resolve():
+        if target.exists():
+            shutil.rmtree(target)
+        shutil.move(str(exported), str(target))
+
+    print(f"✅ INT8 модель сохранена: {target}")
+    return target
+
+def evaluate_model(runtime_path: Union[str, Path],
+                   split: str = 'val',
+                   img_size: int = DEFAULT_IMAGE_SIZE,
+                   batch_size: int = 1,
+                   config_path: Union[str, Path] = CONFIG_PATH,
+                   dataset_root: Optional[Union[str, Path]] = DATASET_ROOT) -> Dict[str, Any]:
+    """
+    Валидация модели на разбивке датасета средствами ultralytics
+
+    Args:
+        runtime_path: Путь к модели (.pt, .onnx или папка OpenVINO)
+        split: Разбивка для валидации
+        img_size: Размер входа модели
+        batch_size: Размер пакета при валидации
+        config_path: Путь к конфигу датасета
+        dataset_root: Корень датасета вместо поля path из конфига
+
+    Returns:
+        Словарь с общим 'map50', 'per_class' ({название: mAP50}) и
+        'ms_per_image' (время инференса на изображение)
+    """
+    from ultralytics import YOLO
+
+    config = load_dataset_config(config_path, dataset_root)
+    with tempfile.TemporaryDirectory() as tmp:
+        data_yaml = write_data_yaml(Path(tmp) / "data.yaml", config, val_split=split)
+        metrics = YOLO(str(runtime_path), task='detect').val(
+            data=str(data_yaml),
+            imgsz=img_size,
+            batch=batch_size,
+            plots=False,
+            verbose=False,
+            project=tmp
+        )
+
+    names = config['names']
+    per_class = {
+        names[int(class_id)]: float(ap50)
+        for class_id, ap50 in zip(metrics.box.ap_class_index, metrics.box.ap50)
+    }
+    return {
+        'map50': float(metrics.box.map50),
+        'per_class': per_class,
+        'ms_per_image': float(metrics.speed['inference'])
+    }
+
+def compare_per_class(baseline: Dict[str, Any],
+                      candidate: Dict[str, Any],
+                      class_names: List[str]) -> List[Dict[str, Any]]:
+    """
+    Изменение mAP50 по классам между двумя моделями
+
+    Args:
+        baseline: Результат evaluate_model() для исходной модели
+        candidate: Результат evaluate_model() для квантованной модели
+        class_names: Порядок классов в отчете
+
+    Returns:
+        Список словарей с ключами 'class_name', 'baseline', 'candidate', 'delta'
+        (классы, которых нет в разбивке, пропускаются)
+    """
+    rows = []
+    for class_name in class_names:
+        if class_name not in baseline['per_class']:
+            continue
+        before = baseline['per_class'][class_name]
+        after = candidate['per_class'].get(class_name, 0.0)
+        rows.append({
+            'class_name': class_name,
+            'baseline': before,
+            'candidate': after,
+            'delta': after - before
+        })
+    return rows
+
+def accuracy_gate(rows: List[Dict[str, Any]], max_drop: float) -> List[str]:
+    """
+    Проверяет, что падение mAP50 ни в одном классе не превышает порог
+
+    Args:
+        rows: Результат compare_per_class()
+        max_drop: Допустимое падение mAP50 (например, 0.01 = 1 п.п.)
+
+    Returns:
+        Список классов, не прошедших проверку (пустой - проверка пройдена)
+    """
+    deltas = np.array([row['delta'] for row in rows])
+    return [row['class_name'] for row, failed in zip(rows, deltas < -max_drop) if failed]
+
+def model_size_mb(path: Union[str, Path]) -> float:
+    """Размер модели на диске (файл или папка) в мегабайтах"""
+    path = Path(path)
+    files = [path] if path.is_file() else [p for p in path.rglob('*') if p.is_file()]
+    return sum(p.stat().st_size for p in files) / 2 ** 20
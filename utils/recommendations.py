@@ -0,0 +1,309 @@
+import numpy as np
+from functools import lru_cache
+from typing import Dict, List, Any, Iterable, Mapping, Optional, Tuple, Union
+
+from config import (
+    CLASS_NAMES, RECOMMENDATION_CONFIDENCE, RECOMMENDATION_RELEASE_CONFIDENCE,
+    RECOMMENDATION_CONFIRM_FRAMES, RECOMMENDATION_RELEASE_FRAMES
+)
+from utils.results import Detections
+
+# Действия, которые вызывает класс знака
+ACTION_NONE = 0
+ACTION_SPEED_LIMIT = 1
+ACTION_STOP = 2
+ACTION_RED_LIGHT = 3
+ACTION_GREEN_LIGHT = 4
+NUM_ACTIONS = 5
+
+MESSAGES = {
+    ACTION_SPEED_LIMIT: ('warning', "🚗 Ограничение скорости: {speed_limit} км/ч"),
+    ACTION_STOP: ('warning', "🛑 Обязательная остановка!"),
+    ACTION_RED_LIGHT: ('warning', "🔴 Красный свет - остановитесь!"),
+    ACTION_GREEN_LIGHT: ('success', "🟢 Зеленый свет - можно продолжать движение"),
+}
+
+EVENTS = {
+    ACTION_SPEED_LIMIT: 'speed_limit',
+    ACTION_STOP: 'stop',
+    ACTION_RED_LIGHT: 'red_light',
+    ACTION_GREEN_LIGHT: 'green_light',
+}
+
+@lru_cache(maxsize=8)
+def _rule_table(names: Tuple[Tuple[int, str], ...]) -> Tuple[np.ndarray, np.ndarray]:
+    size = max(class_id for class_id, _ in names) + 1 if names else 0
+    actions = np.full(size, ACTION_NONE, dtype=np.uint8)
+    speeds = np.zeros(size, dtype=np.int16)
+    for class_id, name in names:
+        if name.startswith("Speed Limit"):
+            actions[class_id] = ACTION_SPEED_LIMIT
+            speeds[class_id] = int(name.split()[-1])
+        elif name == "Stop":
+            actions[class_id] = ACTION_STOP
+        elif name == "Red Light":
+            actions[class_id] = ACTION_RED_LIGHT
+        elif name == "Green Light":
+            actions[class_id] = ACTION_GREEN_LIGHT
+    actions.flags.writeable = False
+    speeds.flags.writeable = False
+    return actions, speeds
+
+def build_rule_table(class_names: Mapping[int, str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Таблицы ID класса -> действие и ID класса -> ограничение скорости
+
+    Названия классов разбираются один раз (таблицы кэшируются), дальше
+    правила применяются индексированием массивов.
+
+    Returns:
+        Кортеж (actions uint8, speeds int16; 0 - не знак ограничения)
+    """
+    return _rule_table(tuple(sorted((int(k), v) for k, v in class_names.items())))
+
+class _Latch:
+    """
+    Состояние с подтверждением и гистерезисом
+
+    Включается после confirm кадров уверенного наблюдения (пропуски
+    кадров между ними допустимы, пока их меньше release) и выключается
+    только после release кадров подряд без наблюдения выше нижнего порога.
+    """
+
+    __slots__ = ('confirm', 'release', 'active', 'hits', 'misses')
+
+    def __init__(self, confirm: int, release: int):
+        self.confirm = confirm
+        self.release = release
+        self.reset()
+
+    def reset(self):
+        self.active = False
+        self.hits = 0
+        self.misses = 0
+
+    def update(self, enter: bool, keep: bool) -> bool:
+        """Возвращает True, если состояние включилось на этом кадре"""
+        if self.active:
+            self.misses = 0 if keep else self.misses + 1
+            if self.misses >= self.release:
+                self.reset()
+            return False
+
+        if enter:
+            self.hits += 1
+            self.misses = 0
+        elif self.hits:
+            self.misses += 1
+            if self.misses >= self.release:
+                self.hits = self.misses = 0
+
+        if self.hits >= self.confirm:
+            self.active = True
+            self.hits = self.misses = 0
+            return True
+        return False
+
+class RecommendationEngine:
+    """
+    Рекомендации водителю на потоке кадров
+
+    Правила заданы таблицей по ID класса, построенной из названий
+    классов один раз; на кадре считается только максимальная уверенность
+    по каждому действию (для пакета кадров - одним проходом NumPy).
+    Между кадрами хранится состояние: текущее ограничение скорости, знак
+    Stop и сигнал светофора. Состояние меняется после подтверждения на
+    нескольких кадрах (debounce) и сбрасывается только после серии кадров
+    без знака с нижним порогом уверенности (гистерезис). update()
+    возвращает только изменения, поэтому один и тот же знак на 30 кадрах
+    в секунду дает одно сообщение.
+    """
+
+    def __init__(self,
+                 class_names: Optional[Mapping[int, str]] = None,
+                 confidence: float = RECOMMENDATION_CONFIDENCE,
+                 release_confidence: float = RECOMMENDATION_RELEASE_CONFIDENCE,
+                 confirm_frames: int = RECOMMENDATION_CONFIRM_FRAMES,
+                 release_frames: int = RECOMMENDATION_RELEASE_FRAMES):
+        """
+        Args:
+            class_names: Отображение ID класса -> название
+                (по умолчанию CLASS_NAMES из конфига)
+            confidence: Порог уверенности для включения состояния
+            release_confidence: Нижний порог, выше которого состояние сохраняется
+            confirm_frames: Кадров с уверенным знаком до смены состояния
+            release_frames: Кадров без знака до сброса состояния
+        """
+        self.class_names = dict(class_names) if class_names is not None else dict(enumerate(CLASS_NAMES))
+        self.actions, self.speeds = build_rule_table(self.class_names)
+        self._action_list = self.actions.tolist()
+        self._speed_list = self.speeds.tolist()
+        self.confidence = confidence
+        self.release_confidence = release_confidence
+        self.confirm_frames = confirm_frames
+        self.release_frames = release_frames
+
+        self.reset()
+
+    def reset(self):
+        """Сбрасывает состояние (например, при смене видео)"""
+        self.frame = 0
+        self.speed_limit: Optional[int] = None
+        self._speed_candidate: Optional[int] = None
+        self._speed_hits = 0
+        self._speed_misses = 0
+        self._latches = {
+            action: _Latch(self.confirm_frames, self.release_frames)
+            for action in (ACTION_STOP, ACTION_RED_LIGHT, ACTION_GREEN_LIGHT)
+        }
+
+    def state(self) -> Dict[str, Any]:
+        """Текущее состояние: ограничение скорости, Stop и сигнал светофора"""
+        light = None
+        if self._latches[ACTION_RED_LIGHT].active:
+            light = 'red'
+        elif self._latches[ACTION_GREEN_LIGHT].active:
+            light = 'green'
+        return {
+            'speed_limit': self.speed_limit,
+            'stop': self._latches[ACTION_STOP].active,
+            'light': light,
+        }
+
+    def update(self, detections: Detections) -> List[Dict[str, Any]]:
+        """
+        Обрабатывает детекции очередного кадра
+
+        Args:
+            detections: Детекции кадра
+
+        Returns:
+            Изменения состояния на этом кадре: словари с ключами 'type'
+            ('warning'/'success'), 'message', 'event', 'frame' и, для
+            ограничения скорости, 'speed_limit'
+        """
+        # На одном кадре с несколькими детекциями вызов NumPy дороже
+        # прохода по спискам, поэтому таблицы используются как списки
+        top = [0.0] * NUM_ACTIONS
+        speed = 0
+        for class_id, confidence in zip(detections.class_ids.tolist(), detections.confidences.tolist()):
+            action = self._action_list[class_id]
+            if confidence >= top[action]:
+                top[action] = confidence
+                if action == ACTION_SPEED_LIMIT:
+                    speed = self._speed_list[class_id]
+        return self._step(top[ACTION_SPEED_LIMIT], speed, top[ACTION_STOP],
+                          top[ACTION_RED_LIGHT], top[ACTION_GREEN_LIGHT])
+
+    def update_many(self, results: Iterable[Union[Dict[str, Any], Detections]]) -> List[Dict[str, Any]]:
+        """
+        Обрабатывает пакет кадров по порядку
+
+        Правила применяются ко всем детекциям пакета одним проходом
+        (максимум уверенности по кадру и действию), по кадрам в цикле
+        обновляется только состояние. Для потока это дешевле, чем
+        update() на каждом кадре.
+
+        Args:
+            results: Результаты detect()/detect_batch() или объекты Detections
+
+        Returns:
+            Изменения состояния на всех кадрах пакета (см. update())
+        """
+        detections = [
+            result['detections'] if isinstance(result, dict) else result
+            for result in results
+        ]
+        counts = [len(d) for d in detections]
+        top = np.zeros((len(detections), NUM_ACTIONS), dtype=np.float32)
+        speeds = np.zeros(len(detections), dtype=np.int16)
+
+        if sum(counts):
+            class_ids = np.concatenate([d.class_ids for d in detections])
+            confidences = np.concatenate([d.confidences for d in detections])
+            frame_index = np.repeat(np.arange(len(detections)), counts)
+            actions = self.actions[class_ids]
+            np.maximum.at(top, (frame_index, actions), confidences)
+
+            # Значение самого уверенного знака ограничения в каждом кадре
+            best_speed = (actions == ACTION_SPEED_LIMIT) & (confidences == top[frame_index, ACTION_SPEED_LIMIT])
+            speeds[frame_index[best_speed]] = self.speeds[class_ids[best_speed]]
+
+        events = []
+        for (_, speed_conf, stop, red, green), speed in zip(top.tolist(), speeds.tolist()):
+            events += self._step(speed_conf, speed, stop, red, green)
+        return events
+
+    def _step(self, speed_conf: float, speed: int, stop: float, red: float, green: float) -> List[Dict[str, Any]]:
+        """Обновление состояния по максимальным уверенностям действий на кадре"""
+        events = []
+        if self._update_speed(speed_conf, speed):
+            events.append(self._event(ACTION_SPEED_LIMIT, speed_limit=self.speed_limit))
+
+        # Красный и зеленый взаимоисключающие: на кадре учитывается более уверенный
+        if red >= green:
+            green = 0.0
+        else:
+            red = 0.0
+
+        for action, top in ((ACTION_STOP, stop), (ACTION_RED_LIGHT, red), (ACTION_GREEN_LIGHT, green)):
+            if self._latches[action].update(top >= self.confidence, top >= self.release_confidence):
+                events.append(self._event(action))
+                # Включение одного сигнала сразу выключает другой
+                if action == ACTION_RED_LIGHT:
+                    self._latches[ACTION_GREEN_LIGHT].reset()
+                elif action == ACTION_GREEN_LIGHT:
+                    self._latches[ACTION_RED_LIGHT].reset()
+
+        self.frame += 1
+        return events
+
+    def _update_speed(self, confidence: float, speed: int) -> bool:
+        """Обновляет кандидата; True, если подтверждено новое ограничение"""
+        if confidence < self.confidence:
+            # Кандидат забывается после release_frames кадров без подтверждения
+            self._speed_misses += 1
+            if self._speed_misses >= self.release_frames:
+                self._speed_candidate, self._speed_hits = None, 0
+            return False
+
+        if speed != self._speed_candidate:
+            self._speed_candidate, self._speed_hits = speed, 0
+        self._speed_hits += 1
+        self._speed_misses = 0
+
+        # Ограничение действует до следующего знака, поэтому не сбрасывается
+        if self._speed_hits >= self.confirm_frames and speed != self.speed_limit:
+            self.speed_limit = speed
+            return True
+        return False
+
+    def _event(self, action: int, **extra) -> Dict[str, Any]:
+        kind, template = MESSAGES[action]
+        return {
+            'type': kind,
+            'message': template.format(**extra),
+            'event': EVENTS[action],
+            'frame': self.frame,
+            **extra
+        }
+
+def driver_recommendations(detections: Detections) -> List[Dict[str, Any]]:
+    """
+    Рекомендации для одного изображения
+
+    Каждое действие упоминается один раз, даже если знак найден
+    несколько раз; из нескольких ограничений скорости берется самое
+    уверенное.
+
+    Returns:
+        Список словарей с ключами 'type' и 'message'
+    """
+    engine = RecommendationEngine(detections.class_names, confirm_frames=1)
+    recommendations = engine.update(detections)
+    if not recommendations:
+        recommendations.append({
+            'type': 'info',
+            'message': "ℹ️ Дорожные знаки обнаружены, но рекомендации не требуются"
+        })
+    return recommendations
@@ -0,0 +1,392 @@
+import os
+import threading
+import time
+import yaml
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Any, Iterator, Optional, Sequence, Tuple, Union
+
+from config import INFERENCE_BACKEND, MODEL_PATH, MODEL_REGISTRY_PATH, REGISTRY_MAX_MB, WARMUP_IMAGE_SIZES
+from utils.cache import model_fingerprint
+from utils.detection import TrafficSignDetector
+
+if TYPE_CHECKING:
+    from utils.pool import DetectorPool
+
+# Имя модели по умолчанию (MODEL_PATH без манифеста)
+DEFAULT_MODEL = "default"
+
+def _rss_bytes() -> Optional[int]:
+    """Резидентная память процесса по /proc/self/statm (None вне Linux)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+class _ModelEntry:
+    """Загруженная версия модели и ее замеры"""
+
+    __slots__ = ('name', 'version', 'path', 'detector', 'load_seconds',
+                 'weights_bytes', 'rss_delta_bytes', 'leases', 'last_used')
+
+    def __init__(self, name: str, version: str, path: Path, detector: TrafficSignDetector,
+                 load_seconds: float, weights_bytes: int, rss_delta_bytes: Optional[int]):
+        self.name = name
+        self.version = version
+        self.path = path
+        self.detector = detector
+        self.load_seconds = load_seconds
+        self.weights_bytes = weights_bytes
+        self.rss_delta_bytes = rss_delta_bytes
+        self.leases = 0
+        self.last_used = time.time()
+
+class ModelRegistry:
+    """
+    Реестр моделей по имени и версии с горячей заменой
+
+    У каждого имени есть зарегистрированные версии (пути к весам) и
+    активная версия. activate() сначала загружает и прогревает новую
+    версию, затем атомарно переключает указатель: запросы, которые уже
+    получили детектор через acquire(), дорабатывают на старой версии,
+    новые сразу идут на новую. Загруженные версии хранятся в LRU с
+    бюджетом памяти на веса; сверх бюджета выгружаются давно не
+    использованные версии, кроме занятых запросами. Одновременные
+    запросы одной незагруженной версии ждут одну загрузку. Безопасен для
+    использования из нескольких потоков.
+    """
+
+    def __init__(self,
+                 max_bytes: int = REGISTRY_MAX_MB * 2 ** 20,
+                 backend: str = INFERENCE_BACKEND,
+                 warmup_batch_sizes: Sequence[int] = (1,),
+                 warmup_img_sizes: Sequence[int] = WARMUP_IMAGE_SIZES,
+                 **detector_kwargs: Any):
+        """
+        Args:
+            max_bytes: Бюджет памяти на веса загруженных моделей
+                (см. TrafficSignDetector.weights_nbytes())
+            backend: Движок инференса (см. TrafficSignDetector)
+            warmup_batch_sizes: Размеры пакета для прогрева после
+                загрузки (пустой - без прогрева)
+            warmup_img_sizes: Размеры входа для прогрева
+            **detector_kwargs: Параметры TrafficSignDetector (cache, metrics)
+        """
+        self.max_bytes = max_bytes
+        self.backend = backend
+        self.warmup_batch_sizes = tuple(warmup_batch_sizes)
+        self.warmup_img_sizes = tuple(warmup_img_sizes)
+        self.detector_kwargs = detector_kwargs
+        self.evictions = 0
+
+        self._versions: Dict[str, Dict[str, Path]] = {}
+        self._active: Dict[str, str] = {}
+        self._resident: "OrderedDict[Tuple[str, str], _ModelEntry]" = OrderedDict()
+        self._loading: Dict[Tuple[str, str], Future] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, **kwargs: Any) -> "ModelRegistry":
+        """
+        Реестр по настройкам config.py: манифест MODEL_REGISTRY_PATH или
+        одна модель MODEL_PATH под именем DEFAULT_MODEL
+        """
+        registry = cls(**kwargs)
+        if MODEL_REGISTRY_PATH:
+            registry.load_manifest(MODEL_REGISTRY_PATH)
+        else:
+            registry.register(DEFAULT_MODEL, MODEL_PATH)
+        return registry
+
+    def names(self) -> List[str]:
+        with self._lock:
+            return list(self._versions)
+
+    def versions(self, name: str) -> List[str]:
+        with self._lock:
+            return list(self._versions.get(name, {}))
+
+    def active_version(self, name: str = DEFAULT_MODEL) -> Optional[str]:
+        with self._lock:
+            return self._active.get(name)
+
+    @property
+    def resident_bytes(self) -> int:
+        with self._lock:
+            return sum(entry.weights_bytes for entry in self._resident.values())
+
+    def register(self,
+                 name: str,
+                 path: Union[str, Path],
+                 version: Optional[str] = None,
+                 activate: Optional[bool] = None) -> str:
+        """
+        Регистрирует версию модели без загрузки
+
+        Args:
+            name: Имя модели
+            path: Путь к весам (.pt)
+            version: Версия (по умолчанию - начало хэша содержимого весов)
+            activate: Сделать версию активной без загрузки; по умолчанию
+                только если у имени еще нет активной версии. Для горячей
+                замены используйте activate()
+
+        Returns:
+            Версия
+        """
+        path = Path(path)
+        if not path.exists():
+            raise FileNotFoundError(f"Модель не найдена: {path}")
+        version = version or model_fingerprint(path)[:12]
+
+        with self._lock:
+            known = self._versions.setdefault(name, {})
+            if known.get(version, path) != path:
+                raise ValueError(f"Версия {name}:{version} уже зарегистрирована с весами {known[version]}")
+            known[version] = path
+            if activate or (activate is None and name not in self._active):
+                self._active[name] = version
+        return version
+
+    def load_manifest(self, path: Union[str, Path], preload: bool = False) -> Dict[str, str]:
+        """
+        Регистрирует модели из манифеста YAML
+
+        Формат (пути к весам - относительно папки манифеста):
+
+            models:
+              default:
+                active: v2
+                versions:
+                  v1: best_v1.pt
+                  v2: best.pt
+
+        Повторная загрузка того же манифеста добавляет новые версии и
+        переключает активные; с preload=True новая активная версия
+        загружается до переключения (горячая замена без пауз).
+
+        Returns:
+            Отображение имя -> активная версия
+        """
+        path = Path(path)
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = yaml.safe_load(f) or {}
+
+        active = {}
+        for name, spec in (manifest.get('models') or {}).items():
+            versions = spec.get('versions') or {}
+            if not versions:
+                raise ValueError(f"В манифесте {path} у модели {name} нет версий")
+            for version, weights in versions.items():
+                self.register(name, path.parent / weights, version=str(version), activate=False)
+
+            version = str(spec.get('active', list(versions)[-1]))
+            if preload:
+                self.activate(name, version)
+            else:
+                with self._lock:
+                    if version not in self._versions[name]:
+                        raise KeyError(f"Активная версия {name}:{version} не описана в манифесте")
+                    self._active[name] = version
+            active[name] = version
+        return active
+
+    def activate(self, name: str, version: str) -> Optional[str]:
+        """
+        Загружает версию и делает ее активной
+
+        Загрузка и прогрев выполняются до переключения, поэтому запросы
+        не ждут новую модель; запросы на старой версии дорабатывают.
+
+        Returns:
+            Предыдущая активная версия
+        """
+        key = self._resolve(name, version)
+        self._load(key)
+        with self._lock:
+            previous = self._active.get(name)
+            self._active[name] = version
+        if previous != version:
+            print(f"🔁 Модель {name}: {previous} -> {version}")
+        return previous
+
+    def get(self, name: str = DEFAULT_MODEL, version: Optional[str] = None) -> TrafficSignDetector:
+        """
+        Детектор версии модели (по умолчанию - активной), загружается при
+        первом обращении
+
+        Детектор может быть выгружен из реестра другим потоком, когда
+        превышен бюджет; для запросов на сервере используйте acquire().
+        """
+        return self._load(self._resolve(name, version)).detector
+
+    @contextmanager
+    def acquire(self, name: str = DEFAULT_MODEL, version: Optional[str] = None) -> Iterator[TrafficSignDetector]:
+        """
+        Детектор на время запроса
+
+        Версия фиксируется при входе: переключение активной версии не
+        влияет на уже начатый запрос, а занятая версия не выгружается.
+        """
+        entry = self._load(self._resolve(name, version), lease=True)
+        try:
+            yield entry.detector
+        finally:
+            with self._lock:
+                entry.leases -= 1
+
+    def is_resident(self, name: str = DEFAULT_MODEL, version: Optional[str] = None) -> bool:
+        with self._lock:
+            version = version or self._active.get(name)
+            return (name, version) in self._resident
+
+    def evict(self, name: str, version: Optional[str] = None) -> bool:
+        """
+        Выгружает версию модели (по умолчанию - активную)
+
+        Returns:
+            False, если версия не загружена или занята запросами
+        """
+        with self._lock:
+            key = (name, version or self._active.get(name))
+            entry = self._resident.get(key)
+            if entry is None or entry.leases:
+                return False
+            del self._resident[key]
+            self.evictions += 1
+        return True
+
+    def pool(self, name: str = DEFAULT_MODEL, version: Optional[str] = None, **kwargs: Any) -> "DetectorPool":
+        """
+        Пул процессов для версии модели с общими весами
+
+        Веса загруженной в реестр модели переносятся в общую память и
+        передаются воркерам (для pytorch), поэтому N воркеров не держат
+        N копий весов. Для ONNX и OpenVINO каждый воркер загружает свою
+        копию, как обычно.
+
+        Args:
+            **kwargs: Параметры DetectorPool
+        """
+        from utils.pool import DetectorPool
+
+        entry = self._load(self._resolve(name, version), lease=True)
+        try:
+            shared = entry.detector.shared_weights()
+            return DetectorPool(str(entry.path), backend=self.backend, shared_weights=shared, **kwargs)
+        finally:
+            with self._lock:
+                entry.leases -= 1
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """
+        Состояние всех зарегистрированных версий
+
+        Returns:
+            Список словарей: name, version, path, active, resident,
+            load_seconds, weights_bytes, rss_delta_bytes (прирост памяти
+            процесса при загрузке; None вне Linux), leases, last_used
+        """
+        rows = []
+        with self._lock:
+            for name, versions in self._versions.items():
+                for version, path in versions.items():
+                    entry = self._resident.get((name, version))
+                    rows.append({
+                        'name': name,
+                        'version': version,
+                        'path': str(path),
+                        'active': self._active.get(name) == version,
+                        'resident': entry is not None,
+                        'load_seconds': entry.load_seconds if entry else None,
+                        'weights_bytes': entry.weights_bytes if entry else None,
+                        'rss_delta_bytes': entry.rss_delta_bytes if entry else None,
+                        'leases': entry.leases if entry else 0,
+                        'last_used': entry.last_used if entry else None,
+                    })
+        return rows
+
+    def _resolve(self, name: str, version: Optional[str]) -> Tuple[str, str]:
+        with self._lock:
+            if name not in self._versions:
+                raise KeyError(f"Неизвестная модель: {name}")
+            version = version or self._active[name]
+            if version not in self._versions[name]:
+                raise KeyError(f"Неизвестная версия модели {name}: {version}")
+            return name, version
+
+    def _load(self, key: Tuple[str, str], lease: bool = False) -> _ModelEntry:
+        """Загруженная версия; одновременные вызовы ждут одну загрузку"""
+        while True:
+            with self._lock:
+                entry = self._resident.get(key)
+                if entry is not None:
+                    self._resident.move_to_end(key)
+                    entry.last_used = time.time()
+                    entry.leases += lease
+                    return entry
+                future = self._loading.get(key)
+                owner = future is None
+                if owner:
+                    future = self._loading[key] = Future()
+
+            if not owner:
+                # Ошибка загрузки в другом потоке пробрасывается и здесь
+                future.result()
+                continue
+
+            try:
+                entry = self._load_entry(*key)
+            except BaseException as error:
+                with self._lock:
+                    del self._loading[key]
+                future.set_exception(error)
+                raise
+
+            with self._lock:
+                del self._loading[key]
+                entry.leases += lease
+                self._resident[key] = entry
+                self._evict_over_budget(keep=key)
+            future.set_result(None)
+            return entry
+
+    def _load_entry(self, name: str, version: str) -> _ModelEntry:
+        """Загружает и прогревает версию с замером времени и памяти"""
+        with self._lock:
+            path = self._versions[name][version]
+
+        rss_before = _rss_bytes()
+        start = time.perf_counter()
+        detector = TrafficSignDetector(path, backend=self.backend, **self.detector_kwargs)
+        if self.warmup_batch_sizes:
+            detector.warmup(img_sizes=self.warmup_img_sizes, batch_sizes=self.warmup_batch_sizes)
+        load_seconds = time.perf_counter() - start
+        rss_after = _rss_bytes()
+
+        entry = _ModelEntry(
+            name, version, path, detector, load_seconds, detector.weights_nbytes(),
+            rss_after - rss_before if rss_before is not None and rss_after is not None else None
+        )
+        print(f"📦 Модель {name}:{version} загружена за {load_seconds:.2f} с, "
+              f"веса {entry.weights_bytes / 2 ** 20:.1f} МБ")
+        return entry
+
+    def _evict_over_budget(self, keep: Tuple[str, str]):
+        """Выгружает давно не использованные версии сверх бюджета (под блокировкой)"""
+        total = sum(entry.weights_bytes for entry in self._resident.values())
+        for key, entry in list(self._resident.items()):
+            if total <= self.max_bytes:
+                return
+            if key == keep or entry.leases:
+                continue
+            del self._resident[key]
+            total -= entry.weights_bytes
+            self.evictions += 1
+            print(f"♻️ Модель {key[0]}:{key[1]} выгружена из памяти")
+        if total > self.max_bytes:
+            print(f"⚠️ Загруженные модели занимают {total / 2 ** 20:.1f} МБ при бюджете "
+                  f"{self.max_bytes / 2 ** 20:.1f} МБ: выгрузить больше нечего")
@@ -0,0 +1,20 @@
+from typing import Sequence
+
+def markdown_table(headers: Sequence[str], rows: Sequence[Sequence[object]]) -> str:
+    """
+    Форматирует таблицу в Markdown (как таблицы в README)
+    
+    Args:
+        headers: Заголовки столбцов
+        rows: Строки таблицы
+        
+    Returns:
+        Текст таблицы
+    """
+    lines = [
+        "| " + " | ".join(str(h) for h in headers) + " |",
+        "|" + "|".join("-------" for _ in headers) + "|",
+    ]
+    for row in rows:
+        lines.append("| " + " | ".join(str(cell) for cell in row) + " |")
+    return "\n".join(lines)
@@ -0,0 +1,244 @@
+import numpy as np
+from collections.abc import Sequence
+from typing import Dict, List, Any, Mapping, Optional, Tuple, Union
+
+from utils.boxes import batched_nms
+
+class Detections(Sequence):
+    """
+    Колоночное представление детекций одного изображения
+
+    Хранит по одному непрерывному массиву NumPy для боксов, уверенностей
+    и классов. Для совместимости с кодом, который ожидает список словарей,
+    ведет себя как последовательность: словарь детекции создается только
+    при обращении к элементу.
+    """
+
+    __slots__ = ('bboxes', 'confidences', 'class_ids', 'class_names', 'track_ids')
+
+    def __init__(self,
+                 bboxes: np.ndarray,
+                 confidences: np.ndarray,
+                 class_ids: np.ndarray,
+                 class_names: Mapping[int, str],
+                 track_ids: Optional[np.ndarray] = None):
+        """
+        Args:
+            bboxes: Массив (N, 4) float32 с координатами [x1, y1, x2, y2]
+            confidences: Массив (N,) float32 с уверенностями
+            class_ids: Массив (N,) int32 с ID классов
+            class_names: Отображение ID класса -> название
+            track_ids: Необязательный массив (N,) int64 с ID треков
+        """
+        self.bboxes = np.ascontiguousarray(bboxes, dtype=np.float32).reshape(-1, 4)
+        self.confidences = np.ascontiguousarray(confidences, dtype=np.float32).reshape(-1)
+        self.class_ids = np.ascontiguousarray(class_ids, dtype=np.int32).reshape(-1)
+        self.class_names = class_names
+        self.track_ids = (
+            None if track_ids is None
+            else np.ascontiguousarray(track_ids, dtype=np.int64).reshape(-1)
+        )
+
+        if not (len(self.bboxes) == len(self.confidences) == len(self.class_ids)):
+            raise ValueError("Размеры массивов детекций не совпадают")
+        if self.track_ids is not None and len(self.track_ids) != len(self.class_ids):
+            raise ValueError("Размер массива track_ids не совпадает с числом детекций")
+
+    @classmethod
+    def empty(cls, class_names: Mapping[int, str]) -> "Detections":
+        """Создает пустой набор детекций"""
+        return cls(
+            np.empty((0, 4), dtype=np.float32),
+            np.empty(0, dtype=np.float32),
+            np.empty(0, dtype=np.int32),
+            class_names
+        )
+
+    @classmethod
+    def from_array(cls, data: np.ndarray, class_names: Mapping[int, str]) -> "Detections":
+        """
+        Создает детекции из массива формата ultralytics
+
+        Args:
+            data: Массив (N, 6) со столбцами [x1, y1, x2, y2, conf, cls]
+                (при трекинге ultralytics перед conf идет столбец track id)
+            class_names: Отображение ID класса -> название
+
+        Returns:
+            Объект Detections
+        """
+        data = np.atleast_2d(np.asarray(data))
+        track_ids = data[:, 4] if data.shape[1] == 7 else None
+        return cls(data[:, :4], data[:, -2], data[:, -1], class_names, track_ids)
+
+    @classmethod
+    def from_result(cls, result: Any, class_names: Mapping[int, str]) -> "Detections":
+        """
+        Создает детекции из объекта Results ultralytics
+
+        Все данные переносятся с устройства одним вызовом .cpu().
+
+        Args:
+            result: Объект Results (или None)
+            class_names: Отображение ID класса -> название
+
+        Returns:
+            Объект Detections
+        """
+        if result is None or result.boxes is None or len(result.boxes) == 0:
+            return cls.empty(class_names)
+
+        return cls.from_array(result.boxes.data.cpu().numpy(), class_names)
+
+    @property
+    def nbytes(self) -> int:
+        """Объем памяти, занимаемый массивами"""
+        nbytes = self.bboxes.nbytes + self.confidences.nbytes + self.class_ids.nbytes
+        if self.track_ids is not None:
+            nbytes += self.track_ids.nbytes
+        return nbytes
+
+    def select(self, index: Union[np.ndarray, slice]) -> "Detections":
+        """
+        Возвращает подмножество детекций по маске, индексам или срезу
+
+        Args:
+            index: Булева маска, массив индексов или срез
+
+        Returns:
+            Новый объект Detections
+        """
+        return Detections(
+            self.bboxes[index],
+            self.confidences[index],
+            self.class_ids[index],
+            self.class_names,
+            None if self.track_ids is None else self.track_ids[index]
+        )
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        """
+        Преобразует детекции в список словарей из встроенных типов Python
+
+        Удобно для сериализации в JSON.
+        """
+        bboxes = self.bboxes.astype(int).tolist()
+        records = [
+            {
+                'bbox': bbox,
+                'confidence': confidence,
+                'class_id': class_id,
+                'class_name': self.class_names[class_id]
+            }
+            for bbox, confidence, class_id in zip(
+                bboxes, self.confidences.tolist(), self.class_ids.tolist()
+            )
+        ]
+        if self.track_ids is not None:
+            for record, track_id in zip(records, self.track_ids.tolist()):
+                record['track_id'] = track_id
+        return records
+
+    def __len__(self) -> int:
+        return len(self.class_ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.select(index)
+
+        class_id = int(self.class_ids[index])
+        detection = {
+            'bbox': self.bboxes[index].astype(int),  # [x1, y1, x2, y2]
+            'confidence': float(self.confidences[index]),
+            'class_id': class_id,
+            'class_name': self.class_names[class_id]
+        }
+        if self.track_ids is not None:
+            detection['track_id'] = int(self.track_ids[index])
+        return detection
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __repr__(self) -> str:
+        return f"Detections(n={len(self)})"
+
+class CandidateSet:
+    """
+    Кандидаты детекции до применения порогов уверенности и IoU
+
+    Модель запускается один раз с минимальным порогом уверенности и без
+    подавления пересечений. Любая пара порогов не ниже минимального затем
+    применяется фильтром NumPy и NMS по классам без повторного инференса.
+    Результат совпадает с detect() при тех же порогах: отсечение по
+    уверенности перед жадным NMS не меняет выбор оставшихся боксов.
+    Как и в ultralytics, NMS выполняется по боксам до обрезки по краю
+    изображения, поэтому кандидаты хранятся необрезанными, а по
+    границам обрезаются только оставшиеся после NMS.
+    """
+
+    def __init__(self,
+                 detections: Detections,
+                 image_shape: Tuple[int, ...],
+                 img_size: int,
+                 conf_floor: float):
+        """
+        Args:
+            detections: Все кандидаты с уверенностью не ниже conf_floor,
+                боксы без обрезки по краю изображения
+            image_shape: Форма исходного изображения
+            img_size: Размер изображения для модели
+            conf_floor: Минимальный порог, с которым запускалась модель
+        """
+        self.detections = detections
+        self.image_shape = image_shape
+        self.img_size = img_size
+        self.conf_floor = conf_floor
+
+    def __len__(self) -> int:
+        return len(self.detections)
+
+    def filter(self,
+               conf_threshold: float = 0.5,
+               iou_threshold: float = 0.4,
+               max_det: int = 300) -> Dict[str, Any]:
+        """
+        Применяет пороги к кэшированным кандидатам
+
+        Args:
+            conf_threshold: Порог уверенности (не ниже conf_floor)
+            iou_threshold: Порог IoU для NMS
+            max_det: Максимальное число детекций (как в ultralytics)
+
+        Returns:
+            Словарь с результатами в формате detect()
+        """
+        if conf_threshold < self.conf_floor:
+            raise ValueError(
+                f"Порог уверенности {conf_threshold} ниже порога кандидатов {self.conf_floor}"
+            )
+
+        # Строгое сравнение, как в NMS ultralytics
+        candidates = self.detections.select(self.detections.confidences > conf_threshold)
+        keep = batched_nms(
+            candidates.bboxes,
+            candidates.confidences,
+            candidates.class_ids,
+            iou_threshold
+        )[:max_det]
+
+        detections = candidates.select(keep)
+        height, width = self.image_shape[:2]
+        np.clip(detections.bboxes[:, 0::2], 0, width, out=detections.bboxes[:, 0::2])
+        np.clip(detections.bboxes[:, 1::2], 0, height, out=detections.bboxes[:, 1::2])
+
+        return {
+            'detections': detections,
+            'image_shape': self.image_shape,
+            'model_info': {
+                'conf_threshold': conf_threshold,
+                'iou_threshold': iou_threshold,
+                'img_size': self.img_size
+            }
+        }
@@ -0,0 +1,210 @@
+import numpy as np
+from typing import Dict, List, Any, Iterable, Mapping, Optional, Union
+
+from config import CLASS_NAMES
+from utils.results import Detections
+
+class DetectionStats:
+    """
+    Потоковая статистика детекций по классам
+
+    Хранит только массивы фиксированного размера по ID класса: число
+    детекций, среднее и сумму квадратов отклонений уверенности (для
+    дисперсии) и гистограмму уверенностей с фиксированными корзинами.
+    Обновление пакетом выполняется через np.bincount, отдельные значения
+    уверенности не сохраняются. Статистики разных воркеров объединяются
+    через merge().
+    """
+
+    def __init__(self,
+                 class_names: Optional[Mapping[int, str]] = None,
+                 bins: int = 20):
+        """
+        Args:
+            class_names: Отображение ID класса -> название
+                (по умолчанию CLASS_NAMES из конфига)
+            bins: Число корзин гистограммы уверенности на отрезке [0, 1]
+        """
+        self.class_names = dict(class_names) if class_names is not None else dict(enumerate(CLASS_NAMES))
+        self.num_classes = max(self.class_names) + 1 if self.class_names else 0
+        self.bins = bins
+
+        self.frames = 0
+        self.counts = np.zeros(self.num_classes, dtype=np.int64)
+        self.mean = np.zeros(self.num_classes, dtype=np.float64)
+        self.m2 = np.zeros(self.num_classes, dtype=np.float64)
+        self.histogram = np.zeros((self.num_classes, bins), dtype=np.int64)
+
+    @classmethod
+    def from_detections(cls, detections: Detections, bins: int = 20) -> "DetectionStats":
+        """Статистика одного набора детекций"""
+        stats = cls(detections.class_names, bins)
+        stats.update(detections)
+        return stats
+
+    @property
+    def total(self) -> int:
+        """Общее число детекций"""
+        return int(self.counts.sum())
+
+    @property
+    def variance(self) -> np.ndarray:
+        """Дисперсия уверенности по классам (0 для классов без детекций)"""
+        return np.divide(self.m2, self.counts, out=np.zeros_like(self.m2), where=self.counts > 0)
+
+    @property
+    def std(self) -> np.ndarray:
+        """Стандартное отклонение уверенности по классам"""
+        return np.sqrt(self.variance)
+
+    @property
+    def bin_edges(self) -> np.ndarray:
+        """Границы корзин гистограммы уверенности"""
+        return np.linspace(0.0, 1.0, self.bins + 1)
+
+    def update(self, detections: Detections, frames: int = 1):
+        """
+        Добавляет детекции одного или нескольких кадров
+
+        Args:
+            detections: Объект Detections
+            frames: Сколько кадров представляют эти детекции
+        """
+        self.update_arrays(detections.class_ids, detections.confidences, frames)
+
+    def update_many(self, results: Iterable[Union[Dict[str, Any], Detections]]):
+        """
+        Добавляет результаты набора кадров одним обновлением
+
+        Массивы кадров склеиваются, поэтому накладные расходы NumPy
+        приходятся на пакет, а не на каждый кадр.
+
+        Args:
+            results: Результаты detect()/detect_batch() или объекты Detections
+        """
+        detections = [
+            result['detections'] if isinstance(result, dict) else result
+            for result in results
+        ]
+        if not detections:
+            return
+        self.update_arrays(
+            np.concatenate([d.class_ids for d in detections]),
+            np.concatenate([d.confidences for d in detections]),
+            frames=len(detections)
+        )
+
+    def update_arrays(self, class_ids: np.ndarray, confidences: np.ndarray, frames: int = 1):
+        """
+        Добавляет детекции, заданные массивами
+
+        Среднее и дисперсия пакета считаются через bincount и
+        объединяются с накопленными по формуле Чана, поэтому результат
+        не зависит от разбиения потока на пакеты.
+
+        Args:
+            class_ids: Массив (N,) ID классов
+            confidences: Массив (N,) уверенностей
+            frames: Сколько кадров представляют эти детекции
+        """
+        self.frames += frames
+        class_ids = np.asarray(class_ids, dtype=np.intp)
+        if class_ids.size == 0:
+            return
+        confidences = np.asarray(confidences, dtype=np.float64)
+
+        size = self.num_classes
+        batch_counts = np.bincount(class_ids, minlength=size)
+        if len(batch_counts) > size:
+            raise ValueError(f"ID класса {class_ids.max()} вне диапазона 0..{size - 1}")
+
+        batch_mean = np.divide(
+            np.bincount(class_ids, weights=confidences, minlength=size),
+            batch_counts,
+            out=np.zeros(size),
+            where=batch_counts > 0
+        )
+        batch_m2 = np.bincount(
+            class_ids, weights=(confidences - batch_mean[class_ids]) ** 2, minlength=size
+        )
+        self._combine(batch_counts, batch_mean, batch_m2)
+
+        bin_index = np.clip((confidences * self.bins).astype(np.intp), 0, self.bins - 1)
+        self.histogram += np.bincount(
+            class_ids * self.bins + bin_index, minlength=size * self.bins
+        ).reshape(size, self.bins)
+
+    def merge(self, other: "DetectionStats") -> "DetectionStats":
+        """
+        Добавляет статистику другого воркера
+
+        Args:
+            other: Статистика с теми же классами и корзинами
+
+        Returns:
+            self
+        """
+        if other.num_classes != self.num_classes or other.bins != self.bins:
+            raise ValueError("Нельзя объединить статистику с разными классами или корзинами")
+
+        self.frames += other.frames
+        self._combine(other.counts, other.mean, other.m2)
+        self.histogram += other.histogram
+        return self
+
+    def _combine(self, counts: np.ndarray, mean: np.ndarray, m2: np.ndarray):
+        """Параллельное объединение среднего и M2 (Chan et al.)"""
+        total = self.counts + counts
+        safe_total = np.maximum(total, 1)
+        delta = mean - self.mean
+        self.mean = self.mean + delta * counts / safe_total
+        self.m2 = self.m2 + m2 + delta ** 2 * self.counts * counts / safe_total
+        self.counts = total
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """
+        Сводка по классам, у которых есть детекции
+
+        Returns:
+            Список словарей 'class_id', 'class_name', 'count',
+            'mean_confidence', 'std_confidence' по убыванию числа детекций
+        """
+        std = self.std
+        order = np.argsort(-self.counts, kind='stable')
+        return [
+            {
+                'class_id': int(class_id),
+                'class_name': self.class_names.get(int(class_id), str(class_id)),
+                'count': int(self.counts[class_id]),
+                'mean_confidence': float(self.mean[class_id]),
+                'std_confidence': float(std[class_id])
+            }
+            for class_id in order
+            if self.counts[class_id] > 0
+        ]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-совместимое представление для передачи между воркерами"""
+        return {
+            'class_names': {int(k): v for k, v in self.class_names.items()},
+            'bins': self.bins,
+            'frames': self.frames,
+            'counts': self.counts.tolist(),
+            'mean': self.mean.tolist(),
+            'm2': self.m2.tolist(),
+            'histogram': self.histogram.tolist()
+        }
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "DetectionStats":
+        """Восстанавливает статистику из to_dict()"""
+        stats = cls({int(k): v for k, v in data['class_names'].items()}, data['bins'])
+        stats.frames = data['frames']
+        stats.counts = np.asarray(data['counts'], dtype=np.int64)
+        stats.mean = np.asarray(data['mean'], dtype=np.float64)
+        stats.m2 = np.asarray(data['m2'], dtype=np.float64)
+        stats.histogram = np.asarray(data['histogram'], dtype=np.int64)
+        return stats
+
+    def __repr__(self) -> str:
+        return f"DetectionStats(frames={self.frames}, detections={self.total})"
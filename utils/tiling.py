@@ -0,0 +1,169 @@
+import numpy as np
+from typing import Dict, List, Any, Optional, Sequence
+
+from config import TILE_SIZE, TILE_OVERLAP, TILE_MERGE_IOS
+from utils.boxes import batched_nms, merge_by_ios
+from utils.results import Detections
+
+def tile_starts(length: int, tile_size: int, overlap: float) -> List[int]:
+    """
+    Начала тайлов вдоль одной оси
+
+    Последний тайл прижимается к краю, поэтому все тайлы имеют размер
+    tile_size (кроме случая, когда сторона меньше тайла).
+
+    Args:
+        length: Длина стороны изображения
+        tile_size: Размер тайла
+        overlap: Доля перекрытия соседних тайлов (0 <= overlap < 1)
+
+    Returns:
+        Список координат начала тайлов
+    """
+    if length <= tile_size:
+        return [0]
+    stride = max(1, int(round(tile_size * (1 - overlap))))
+    starts = list(range(0, length - tile_size, stride))
+    starts.append(length - tile_size)
+    return starts
+
+def tile_boxes(image_shape: Sequence[int],
+               tile_size: int = TILE_SIZE,
+               overlap: float = TILE_OVERLAP) -> np.ndarray:
+    """
+    Сетка перекрывающихся тайлов изображения
+
+    Args:
+        image_shape: Форма изображения (высота, ширина, ...)
+        tile_size: Размер квадратного тайла в пикселях
+        overlap: Доля перекрытия соседних тайлов
+
+    Returns:
+        Массив (T, 4) int с координатами тайлов [x1, y1, x2, y2]
+    """
+    if not 0 <= overlap < 1:
+        raise ValueError(f"overlap должен быть в диапазоне [0, 1): {overlap}")
+
+    height, width = image_shape[:2]
+    tiles = [
+        (x, y, min(x + tile_size, width), min(y + tile_size, height))
+        for y in tile_starts(height, tile_size, overlap)
+        for x in tile_starts(width, tile_size, overlap)
+    ]
+    return np.array(tiles, dtype=np.int64).reshape(-1, 4)
+
+def merge_tile_detections(tile_detections: Sequence[Detections],
+                          offsets: np.ndarray,
+                          class_names: Dict[int, str],
+                          iou_threshold: float,
+                          merge_threshold: float = TILE_MERGE_IOS) -> Detections:
+    """
+    Переводит детекции тайлов в координаты кадра и убирает дубликаты
+
+    Объекты в зоне перекрытия находятся в нескольких тайлах. Знак на шве
+    один тайл видит обрезанным, а соседний - целиком; IoU такой пары мал,
+    и NMS по IoU оставил бы оба бокса (или только обрезанный, если он
+    увереннее). Поэтому сначала боксы разных тайлов сливаются по IOS
+    (пересечение к площади меньшего бокса) в общий охватывающий бокс, а
+    затем на всем кадре выполняется NMS по классам.
+
+    Args:
+        tile_detections: Детекции каждого тайла в его координатах
+        offsets: Массив (T, 2) смещений тайлов [x, y]
+        class_names: Отображение ID класса -> название
+        iou_threshold: Порог IoU для NMS между тайлами
+        merge_threshold: Порог IOS для слияния боксов разных тайлов
+
+    Returns:
+        Детекции в координатах кадра по убыванию уверенности
+    """
+    if not tile_detections or sum(len(d) for d in tile_detections) == 0:
+        return Detections.empty(class_names)
+
+    shifts = np.repeat(np.tile(offsets, 2), [len(d) for d in tile_detections], axis=0)
+    merged = Detections(
+        np.concatenate([d.bboxes for d in tile_detections]) + shifts,
+        np.concatenate([d.confidences for d in tile_detections]),
+        np.concatenate([d.class_ids for d in tile_detections]),
+        class_names
+    )
+    sources = np.repeat(np.arange(len(tile_detections)), [len(d) for d in tile_detections])
+    keep, bboxes = merge_by_ios(merged.bboxes, merged.confidences, merged.class_ids,
+                                merge_threshold, groups=sources)
+    merged = Detections(bboxes, merged.confidences[keep], merged.class_ids[keep], class_names)
+
+    keep = batched_nms(merged.bboxes, merged.confidences, merged.class_ids, iou_threshold)
+    return merged.select(keep)
+
+def detect_sliced(runner: Any,
+                  image: np.ndarray,
+                  tile_size: int = TILE_SIZE,
+                  overlap: float = TILE_OVERLAP,
+                  conf_threshold: float = 0.5,
+                  iou_threshold: float = 0.4,
+                  img_size: Optional[int] = None,
+                  full_frame: bool = True,
+                  batch_size: int = 16,
+                  merge_threshold: float = TILE_MERGE_IOS) -> Dict[str, Any]:
+    """
+    Детекция на изображении высокого разрешения по перекрывающимся тайлам
+
+    Все тайлы (и при full_frame уменьшенный целый кадр для крупных
+    объектов) передаются в runner.detect_batch() одним набором, поэтому
+    они идут пакетами через модель; с DetectorPool пакеты выполняются
+    параллельно в разных процессах.
+
+    Args:
+        runner: Объект с методом detect_batch() и атрибутом class_names
+            (TrafficSignDetector или DetectorPool)
+        image: Изображение в формате numpy array (RGB)
+        tile_size: Размер тайла в пикселях исходного изображения
+        overlap: Доля перекрытия соседних тайлов
+        conf_threshold: Порог уверенности для детекции
+        iou_threshold: Порог IoU для NMS внутри тайла и между тайлами
+        img_size: Размер входа модели (по умолчанию равен tile_size,
+            то есть тайлы не масштабируются)
+        full_frame: Добавить проход по целому кадру
+        batch_size: Максимальное число тайлов в одном проходе модели
+        merge_threshold: Порог IOS для слияния боксов соседних тайлов
+
+    Returns:
+        Словарь с результатами в формате detect(); в 'model_info'
+        добавлены 'tiles' и 'tile_size'
+    """
+    img_size = img_size or tile_size
+    tiles = tile_boxes(image.shape, tile_size, overlap)
+
+    # Копии тайлов: срезы с шагом кадра не подходят для letterbox и общей памяти
+    crops = [np.ascontiguousarray(image[y1:y2, x1:x2]) for x1, y1, x2, y2 in tiles]
+    offsets = tiles[:, :2]
+    if full_frame and len(tiles) > 1:
+        crops.append(image)
+        offsets = np.vstack([offsets, [[0, 0]]])
+
+    results = runner.detect_batch(
+        crops,
+        conf_threshold=conf_threshold,
+        iou_threshold=iou_threshold,
+        img_size=img_size,
+        batch_size=batch_size
+    )
+
+    detections = merge_tile_detections(
+        [result['detections'] for result in results],
+        offsets,
+        runner.class_names,
+        iou_threshold,
+        merge_threshold
+    )
+    return {
+        'detections': detections,
+        'image_shape': image.shape,
+        'model_info': {
+            'conf_threshold': conf_threshold,
+            'iou_threshold': iou_threshold,
+            'img_size': img_size,
+            'tiles': len(tiles),
+            'tile_size': tile_size
+        }
+    }
@@ -0,0 +1,228 @@
+import numpy as np
+from typing import Dict, Any
+
+from utils.boxes import box_iou, greedy_match
+from utils.results import Detections
+
+# Модель постоянной скорости: состояние [cx, cy, w, h, vx, vy, vw, vh]
+_F = np.eye(8, dtype=np.float64)
+_F[:4, 4:] = np.eye(4)
+_H = np.eye(4, 8, dtype=np.float64)
+
+# Доли размера бокса для шумов процесса и измерения (как в DeepSORT)
+_STD_POSITION = 1.0 / 20
+_STD_VELOCITY = 1.0 / 160
+
+def _xyxy_to_cxcywh(boxes: np.ndarray) -> np.ndarray:
+    boxes = boxes.astype(np.float64)
+    wh = boxes[:, 2:] - boxes[:, :2]
+    return np.concatenate([boxes[:, :2] + wh / 2, wh], axis=1)
+
+def _cxcywh_to_xyxy(boxes: np.ndarray) -> np.ndarray:
+    half = np.clip(boxes[:, 2:4], 0, None) / 2
+    return np.concatenate([boxes[:, :2] - half, boxes[:, :2] + half], axis=1)
+
+class KeyframeTracker:
+    """
+    Трекинг дорожных знаков с детекцией только на ключевых кадрах
+
+    Полная детекция TrafficSignDetector запускается раз в keyframe_interval
+    кадров или раньше, если уверенность какого-либо трека опустилась ниже
+    min_track_confidence. На промежуточных кадрах боксы продвигаются
+    фильтром Калмана с моделью постоянной скорости. Состояния всех треков
+    хранятся в общих массивах, поэтому предсказание векторизовано.
+    """
+
+    def __init__(self,
+                 detector: Any,
+                 keyframe_interval: int = 5,
+                 min_track_confidence: float = 0.3,
+                 confidence_decay: float = 0.9,
+                 match_iou: float = 0.3,
+                 max_missed: int = 1,
+                 **detect_kwargs):
+        """
+        Args:
+            detector: Экземпляр TrafficSignDetector
+            keyframe_interval: Максимальное число кадров между детекциями
+            min_track_confidence: Порог уверенности трека, ниже которого
+                следующий кадр становится ключевым
+            confidence_decay: Множитель уверенности трека на каждом
+                промежуточном кадре
+            match_iou: Минимальный IoU для сопоставления трека с детекцией
+            max_missed: Сколько ключевых кадров подряд трек может
+                не находить пару, прежде чем будет удален
+            **detect_kwargs: Параметры для detect()
+        """
+        if keyframe_interval < 1:
+            raise ValueError(f"keyframe_interval должен быть положительным: {keyframe_interval}")
+
+        self.detector = detector
+        self.keyframe_interval = keyframe_interval
+        self.min_track_confidence = min_track_confidence
+        self.confidence_decay = confidence_decay
+        self.match_iou = match_iou
+        self.max_missed = max_missed
+        self.detect_kwargs = detect_kwargs
+
+        self.keyframes = 0
+        self.frames = 0
+        self.reset()
+
+    def reset(self):
+        """Сбрасывает все треки (например, при смене сцены)"""
+        self._state = np.empty((0, 8))
+        self._covariance = np.empty((0, 8, 8))
+        self._track_ids = np.empty(0, dtype=np.int64)
+        self._class_ids = np.empty(0, dtype=np.int32)
+        self._confidences = np.empty(0, dtype=np.float32)
+        self._missed = np.empty(0, dtype=np.int32)
+        self._next_id = 1
+        self._since_keyframe = None
+        self._model_info = {}
+
+    @property
+    def num_tracks(self) -> int:
+        return len(self._track_ids)
+
+    def _is_keyframe(self) -> bool:
+        if self._since_keyframe is None or self._since_keyframe >= self.keyframe_interval:
+            return True
+        visible = self._confidences[self._missed == 0]
+        return bool(len(visible) and visible.min() < self.min_track_confidence)
+
+    def _predict(self):
+        """Шаг предсказания фильтра Калмана для всех треков"""
+        if not self.num_tracks:
+            return
+
+        height = self._state[:, 3:4]
+        std = np.concatenate([
+            np.repeat(_STD_POSITION * height, 4, axis=1),
+            np.repeat(_STD_VELOCITY * height, 4, axis=1)
+        ], axis=1)
+        noise = std[:, :, None] ** 2 * np.eye(8)
+
+        self._state = self._state @ _F.T
+        self._covariance = _F @ self._covariance @ _F.T + noise
+
+    def _correct(self, index: np.ndarray, measurement: np.ndarray):
+        """Шаг коррекции фильтра Калмана для сопоставленных треков"""
+        state = self._state[index]
+        covariance = self._covariance[index]
+
+        std = _STD_POSITION * state[:, 3:4]
+        noise = np.repeat(std, 4, axis=1)[:, :, None] ** 2 * np.eye(4)
+
+        innovation_cov = _H @ covariance @ _H.T + noise
+        gain = covariance @ _H.T @ np.linalg.inv(innovation_cov)
+        residual = measurement - state @ _H.T
+
+        self._state[index] = state + np.einsum('nij,nj->ni', gain, residual)
+        self._covariance[index] = covariance - gain @ _H @ covariance
+
+    def _spawn(self, measurement: np.ndarray, class_ids: np.ndarray, confidences: np.ndarray):
+        """Создает новые треки для несопоставленных детекций"""
+        count = len(measurement)
+        if not count:
+            return
+
+        state = np.concatenate([measurement, np.zeros((count, 4))], axis=1)
+        std = np.concatenate([
+            np.repeat(2 * _STD_POSITION * measurement[:, 3:4], 4, axis=1),
+            np.repeat(10 * _STD_VELOCITY * measurement[:, 3:4], 4, axis=1)
+        ], axis=1)
+
+        self._state = np.concatenate([self._state, state])
+        self._covariance = np.concatenate([self._covariance, std[:, :, None] ** 2 * np.eye(8)])
+        self._track_ids = np.concatenate([
+            self._track_ids, np.arange(self._next_id, self._next_id + count)
+        ])
+        self._class_ids = np.concatenate([self._class_ids, class_ids])
+        self._confidences = np.concatenate([self._confidences, confidences])
+        self._missed = np.concatenate([self._missed, np.zeros(count, dtype=np.int32)])
+        self._next_id += count
+
+    def _keep(self, mask: np.ndarray):
+        self._state = self._state[mask]
+        self._covariance = self._covariance[mask]
+        self._track_ids = self._track_ids[mask]
+        self._class_ids = self._class_ids[mask]
+        self._confidences = self._confidences[mask]
+        self._missed = self._missed[mask]
+
+    def _associate(self, detections: Detections):
+        """Сопоставляет предсказанные треки с детекциями ключевого кадра"""
+        iou = box_iou(_cxcywh_to_xyxy(self._state[:, :4]), detections.bboxes)
+        # Трек сопоставляется только с детекцией своего класса
+        iou[self._class_ids[:, None] != detections.class_ids[None, :]] = 0
+        track_index, det_index = greedy_match(iou, self.match_iou)
+
+        measurement = _xyxy_to_cxcywh(detections.bboxes)
+        if len(track_index):
+            self._correct(track_index, measurement[det_index])
+            self._confidences[track_index] = detections.confidences[det_index]
+            self._missed[track_index] = 0
+
+        unmatched_tracks = np.ones(self.num_tracks, dtype=bool)
+        unmatched_tracks[track_index] = False
+        self._missed[unmatched_tracks] += 1
+        self._keep(self._missed <= self.max_missed)
+
+        unmatched = np.ones(len(detections), dtype=bool)
+        unmatched[det_index] = False
+        self._spawn(
+            measurement[unmatched],
+            detections.class_ids[unmatched],
+            detections.confidences[unmatched]
+        )
+
+    def update(self, image: np.ndarray) -> Dict[str, Any]:
+        """
+        Обрабатывает очередной кадр видеопотока
+
+        Args:
+            image: Кадр в формате numpy array (RGB)
+
+        Returns:
+            Словарь того же формата, что и detect(); у детекций есть
+            'track_id', а в 'model_info' добавлены флаг 'keyframe' и
+            'keyframe_interval'
+        """
+        keyframe = self._is_keyframe()
+        self._predict()
+
+        if keyframe:
+            results = self.detector.detect(image, **self.detect_kwargs)
+            self._associate(results['detections'])
+            self._since_keyframe = 0
+            self.keyframes += 1
+            self._model_info = results['model_info']
+        else:
+            self._confidences = self._confidences * np.float32(self.confidence_decay)
+
+        self._since_keyframe += 1
+        self.frames += 1
+
+        # Выдаем только треки, подтвержденные на последнем ключевом кадре
+        visible = self._missed == 0
+        height, width = image.shape[:2]
+        bboxes = _cxcywh_to_xyxy(self._state[visible, :4])
+        bboxes = np.clip(bboxes, 0, [width, height, width, height])
+
+        model_info = dict(self._model_info)
+        model_info.update({
+            'keyframe': keyframe,
+            'keyframe_interval': self.keyframe_interval
+        })
+        return {
+            'detections': Detections(
+                bboxes,
+                self._confidences[visible],
+                self._class_ids[visible],
+                self.detector.class_names,
+                self._track_ids[visible]
+            ),
+            'image_shape': image.shape,
+            'model_info': model_info
+        }
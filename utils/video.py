@@ -0,0 +1,395 @@
+import queue
+import threading
+import time
+import cv2
+import numpy as np
+from pathlib import Path
+from typing import Dict, Any, Iterator, Optional, Tuple, Union
+
+from utils.ingest import bgr_to_rgb, read_image
+from utils.visualization import AnnotationRenderer
+
+# Расширения файлов, которые считаются кадрами в папке
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp'}
+
+# Политики поведения при отставании инференса
+DROP_POLICIES = ('block', 'drop_new', 'drop_oldest')
+
+# Маркер конца потока между стадиями
+_END = object()
+
+def iter_frames(source: Union[str, Path],
+                fps: float = 30.0) -> Iterator[Tuple[int, float, np.ndarray]]:
+    """
+    Читает кадры из видеофайла или папки с изображениями
+
+    Args:
+        source: Путь к видеофайлу или к папке с кадрами
+        fps: Частота кадров для папки (для расчета временных меток)
+
+    Yields:
+        Кортежи (номер кадра, временная метка в секундах, кадр RGB)
+    """
+    source = Path(source)
+
+    if source.is_dir():
+        # Кадры из папки в лексикографическом порядке
+        paths = sorted(
+            p for p in source.iterdir()
+            if p.suffix.lower() in IMAGE_EXTENSIONS
+        )
+        for index, path in enumerate(paths):
+            yield index, index / fps, read_image(path)
+        return
+
+    if not source.exists():
+        raise FileNotFoundError(f"Источник видео не найден: {source}")
+
+    capture = cv2.VideoCapture(str(source))
+    if not capture.isOpened():
+        raise ValueError(f"Не удалось открыть видео: {source}")
+
+    try:
+        index = 0
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            timestamp = capture.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+            yield index, timestamp, bgr_to_rgb(frame)
+            index += 1
+    finally:
+        capture.release()
+
+def get_source_fps(source: Union[str, Path], default: float = 30.0) -> float:
+    """Возвращает частоту кадров видеофайла или значение по умолчанию"""
+    source = Path(source)
+    if source.is_dir():
+        return default
+
+    capture = cv2.VideoCapture(str(source))
+    try:
+        fps = capture.get(cv2.CAP_PROP_FPS)
+    finally:
+        capture.release()
+    return fps if fps and fps > 0 else default
+
+class StageStats:
+    """Счетчики производительности одной стадии конвейера"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.frames = 0
+        self.dropped = 0
+        self.busy_time = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, frames: int, seconds: float):
+        """Учитывает обработанные кадры и затраченное время"""
+        with self._lock:
+            self.frames += frames
+            self.busy_time += seconds
+
+    def drop(self, frames: int = 1):
+        """Учитывает отброшенные кадры"""
+        with self._lock:
+            self.dropped += frames
+
+    @property
+    def fps(self) -> float:
+        """Пропускная способность стадии (кадров в секунду работы)"""
+        return self.frames / self.busy_time if self.busy_time > 0 else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'frames': self.frames,
+            'dropped': self.dropped,
+            'busy_time': self.busy_time,
+            'fps': self.fps
+        }
+
+class VideoWriterSink:
+    """Запись аннотированных кадров в видеофайл"""
+
+    def __init__(self, path: Union[str, Path], fps: float = 30.0, fourcc: str = 'mp4v'):
+        """
+        Args:
+            path: Путь к выходному видеофайлу
+            fps: Частота кадров выходного видео
+            fourcc: Код кодека для cv2.VideoWriter
+        """
+        self.path = Path(path)
+        self.fps = fps
+        self.fourcc = fourcc
+        self._writer = None
+
+    def write(self, frame: np.ndarray):
+        """Записывает кадр (RGB); файл открывается по размеру первого кадра"""
+        if self._writer is None:
+            height, width = frame.shape[:2]
+            self._writer = cv2.VideoWriter(
+                str(self.path),
+                cv2.VideoWriter_fourcc(*self.fourcc),
+                self.fps,
+                (width, height)
+            )
+            if not self._writer.isOpened():
+                raise ValueError(f"Не удалось открыть файл для записи: {self.path}")
+
+        self._writer.write(cv2.cvtColor(frame, cv2.COLOR_RGB2BGR))
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.release()
+            self._writer = None
+
+class VideoPipeline:
+    """
+    Потоковая детекция на видео
+
+    Декодирование, инференс и отрисовка выполняются в отдельных потоках,
+    связанных очередями ограниченного размера, поэтому стадии работают
+    параллельно. Итерация по объекту возвращает кадры с результатами в
+    исходном порядке.
+    """
+
+    def __init__(self,
+                 detector: Any,
+                 source: Union[str, Path],
+                 queue_size: int = 8,
+                 drop_policy: str = 'block',
+                 inference_batch_size: int = 1,
+                 tracker: Optional[Any] = None,
+                 render: bool = True,
+                 writer: Optional[VideoWriterSink] = None,
+                 show_confidence: bool = True,
+                 show_class_names: bool = True,
+                 **detect_kwargs):
+        """
+        Args:
+            detector: Экземпляр TrafficSignDetector
+            source: Путь к видеофайлу или папке с кадрами
+            queue_size: Максимальный размер очереди между стадиями
+            drop_policy: Поведение при отставании инференса:
+                'block' - декодер ждет (кадры не теряются),
+                'drop_new' - новый кадр отбрасывается,
+                'drop_oldest' - из очереди вытесняется самый старый кадр
+            inference_batch_size: Сколько накопившихся кадров отправлять
+                в detect_batch() за один проход
+            tracker: Необязательный KeyframeTracker; если задан, кадры
+                обрабатываются им по одному вместо detect_batch()
+            render: Рисовать ли детекции на кадрах
+            writer: Необязательный приемник аннотированных кадров
+            show_confidence: Показывать ли уверенность на кадре
+            show_class_names: Показывать ли названия классов на кадре
+            **detect_kwargs: Параметры для detect_batch()
+        """
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"Неизвестная политика: {drop_policy}. Допустимые: {DROP_POLICIES}")
+        if tracker is not None and (inference_batch_size > 1 or drop_policy != 'block'):
+            raise ValueError("Трекеру нужны все кадры по порядку: inference_batch_size=1, drop_policy='block'")
+        if writer is not None and not render:
+            raise ValueError("Для записи видео нужна отрисовка (render=True)")
+
+        self.detector = detector
+        self.source = source
+        self.queue_size = queue_size
+        self.drop_policy = drop_policy
+        self.inference_batch_size = max(1, inference_batch_size)
+        self.tracker = tracker
+        self.render = render
+        self.writer = writer
+        self.show_confidence = show_confidence
+        self.show_class_names = show_class_names
+        self.renderer = AnnotationRenderer(show_confidence, show_class_names)
+        self.detect_kwargs = detect_kwargs
+
+        self.stages = {
+            name: StageStats(name) for name in ('decode', 'inference', 'render')
+        }
+        self._wall_time = 0.0
+        self._frames_out = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Статистика по стадиям конвейера
+
+        Returns:
+            Словарь со счетчиками и FPS каждой стадии, а также итоговым FPS
+        """
+        stats = {name: stage.as_dict() for name, stage in self.stages.items()}
+        stats['total'] = {
+            'frames': self._frames_out,
+            'wall_time': self._wall_time,
+            'fps': self._frames_out / self._wall_time if self._wall_time > 0 else 0.0
+        }
+        return stats
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        decoded = queue.Queue(maxsize=self.queue_size)
+        detected = queue.Queue(maxsize=self.queue_size)
+        rendered = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+
+        threads = [
+            threading.Thread(target=self._run_stage, args=(self._decode, None, decoded, stop), daemon=True),
+            threading.Thread(target=self._run_stage, args=(self._infer, decoded, detected, stop), daemon=True),
+            threading.Thread(target=self._run_stage, args=(self._draw, detected, rendered, stop), daemon=True),
+        ]
+
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                item = rendered.get()
+                if item is _END:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                self._frames_out += 1
+                self._wall_time = time.perf_counter() - start
+                yield item
+        finally:
+            # Останавливаем стадии, даже если потребитель прервал итерацию
+            stop.set()
+            for thread in threads:
+                thread.join()
+            self._wall_time = time.perf_counter() - start
+            if self.writer is not None:
+                self.writer.close()
+
+    def _run_stage(self, work, inbox, outbox, stop):
+        """Запускает стадию и передает дальше маркер конца или ошибку"""
+        try:
+            work(inbox, outbox, stop)
+        except BaseException as error:
+            self._put(outbox, error, stop)
+            return
+        self._put(outbox, _END, stop)
+
+    @staticmethod
+    def _put(q: queue.Queue, item: Any, stop: threading.Event) -> bool:
+        """Блокирующая запись в очередь, прерываемая остановкой конвейера"""
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    @staticmethod
+    def _get(q: queue.Queue, stop: threading.Event) -> Any:
+        """
+        Блокирующее чтение из очереди, прерываемое остановкой конвейера
+
+        Ошибка предыдущей стадии пробрасывается дальше по конвейеру.
+        """
+        while not stop.is_set():
+            try:
+                item = q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if isinstance(item, BaseException):
+                raise item
+            return item
+        return _END
+
+    def _decode(self, inbox, outbox, stop):
+        stats = self.stages['decode']
+        frames = iter_frames(self.source)
+
+        try:
+            self._decode_frames(frames, outbox, stop, stats)
+        finally:
+            frames.close()
+
+    def _decode_frames(self, frames, outbox, stop, stats):
+        while not stop.is_set():
+            start = time.perf_counter()
+            frame = next(frames, None)
+            if frame is None:
+                return
+            stats.add(1, time.perf_counter() - start)
+
+            index, timestamp, image = frame
+            item = {'frame_index': index, 'timestamp': timestamp, 'image': image}
+
+            if self.drop_policy == 'block':
+                self._put(outbox, item, stop)
+            elif self.drop_policy == 'drop_new':
+                try:
+                    outbox.put_nowait(item)
+                except queue.Full:
+                    stats.drop()
+            else:
+                while True:
+                    try:
+                        outbox.put_nowait(item)
+                        break
+                    except queue.Full:
+                        try:
+                            outbox.get_nowait()
+                            stats.drop()
+                        except queue.Empty:
+                            pass
+
+    def _infer(self, inbox, outbox, stop):
+        stats = self.stages['inference']
+
+        while True:
+            item = self._get(inbox, stop)
+            if item is _END:
+                return
+
+            # Добираем уже готовые кадры в пакет, не дожидаясь новых
+            batch = [item]
+            finished = False
+            while len(batch) < self.inference_batch_size:
+                try:
+                    extra = inbox.get_nowait()
+                except queue.Empty:
+                    break
+                if isinstance(extra, BaseException):
+                    raise extra
+                if extra is _END:
+                    finished = True
+                    break
+                batch.append(extra)
+
+            start = time.perf_counter()
+            if self.tracker is not None:
+                results = [self.tracker.update(frame['image']) for frame in batch]
+            else:
+                results = self.detector.detect_batch(
+                    [frame['image'] for frame in batch],
+                    batch_size=len(batch),
+                    **self.detect_kwargs
+                )
+            stats.add(len(batch), time.perf_counter() - start)
+
+            for frame, result in zip(batch, results):
+                frame['results'] = result
+                self._put(outbox, frame, stop)
+
+            if finished:
+                return
+
+    def _draw(self, inbox, outbox, stop):
+        stats = self.stages['render']
+
+        while True:
+            item = self._get(inbox, stop)
+            if item is _END:
+                return
+
+            if self.render:
+                start = time.perf_counter()
+                item['result_image'] = self.renderer.render(item['image'], item['results'])
+                if self.writer is not None:
+                    self.writer.write(item['result_image'])
+                stats.add(1, time.perf_counter() - start)
+
+            self._put(outbox, item, stop)
@@ -1,9 +1,14 @@
-import cv2
 import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-from typing import List, Dict, Any
+from collections import OrderedDict
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Sequence, Tuple, Union
 from config import CLASS_COLORS
+from utils.results import Detections
+from utils.statistics import DetectionStats
+
+# OpenCV нужен только для отрисовки, plotly - для графиков; оба
+# импортируются при первом использовании
+if TYPE_CHECKING:
+    import plotly.graph_objects as go
 
 def create_result_image(image: np.ndarray, 
                        results: Dict[str, Any],
@@ -19,15 +24,13 @@ def create_result_image(image: np.ndarray,
         show_class_names: Показывать ли названия классов
         
     Returns:
-        Изображение с нарисованными детекциями
+        Копия изображения (RGB) с нарисованными детекциями
     """
+    import cv2
     
-    # Копируем изображение
+    # Единственная копия кадра: рисуем сразу в RGB, без конвертаций BGR
     result_image = image.copy()
     
-    # Конвертируем RGB -> BGR для OpenCV
-    result_image = cv2.cvtColor(result_image, cv2.COLOR_RGB2BGR)
-    
     # Рисуем каждую детекцию
     for detection in results['detections']:
         bbox = detection['bbox']
@@ -37,8 +40,8 @@ def create_result_image(image: np.ndarray,
         # Координаты бокса
         x1, y1, x2, y2 = bbox
         
-        # Цвет для класса
-        color = CLASS_COLORS.get(class_name, (255, 255, 255))
+        # Цвет для класса (в конфиге BGR, изображение RGB)
+        color = CLASS_COLORS.get(class_name, (255, 255, 255))[::-1]
         
         # Рисуем прямоугольник
         cv2.rectangle(result_image, (x1, y1), (x2, y2), color, 2)
@@ -82,23 +85,200 @@ def create_result_image(image: np.ndarray,
             thickness
         )
     
-    # Конвертируем обратно BGR -> RGB
-    result_image = cv2.cvtColor(result_image, cv2.COLOR_BGR2RGB)
-    
     return result_image
 
-def create_statistics_chart(detections: List[Dict[str, Any]]) -> go.Figure:
+class AnnotationRenderer:
+    """
+    Быстрая отрисовка детекций для видео
+    
+    Подписи (фон цвета класса и черный текст) растеризуются один раз на
+    пару класс/уверенность и кэшируются как спрайты с маской; на кадре
+    остаются только cv2.rectangle для бокса и копирование спрайта.
+    Уверенность округляется до confidence_step, чтобы спрайтов было
+    конечное число. Рисовать можно на месте в буфер вызывающего.
+    При confidence_step=0.0001 и confidence_format='.2%' результат
+    совпадает с create_result_image() попиксельно.
+    """
+    
+    def __init__(self,
+                 show_confidence: bool = True,
+                 show_class_names: bool = True,
+                 confidence_step: float = 0.01,
+                 confidence_format: str = '.0%',
+                 max_sprites: int = 4096,
+                 font: Optional[int] = None,
+                 font_scale: float = 0.6,
+                 thickness: int = 2):
+        """
+        Args:
+            show_confidence: Показывать ли уверенность
+            show_class_names: Показывать ли названия классов
+            confidence_step: Шаг округления уверенности в подписи
+            confidence_format: Формат уверенности в подписи
+            max_sprites: Максимальное число спрайтов в кэше
+            font: Шрифт OpenCV (None - cv2.FONT_HERSHEY_SIMPLEX)
+            font_scale: Масштаб шрифта
+            thickness: Толщина текста и рамки бокса
+        """
+        self.show_confidence = show_confidence
+        self.show_class_names = show_class_names
+        self.confidence_step = confidence_step
+        self.confidence_format = confidence_format
+        self.max_sprites = max_sprites
+        if font is None:
+            import cv2
+            font = cv2.FONT_HERSHEY_SIMPLEX
+        self.font = font
+        self.font_scale = font_scale
+        self.thickness = thickness
+        
+        # Цвета в конфиге BGR, кадры RGB
+        self.colors = {name: tuple(color[::-1]) for name, color in CLASS_COLORS.items()}
+        self._sprites: "OrderedDict[Tuple[str, str], Tuple[np.ndarray, np.ndarray, int, int]]" = OrderedDict()
+    
+    def label(self, class_name: str, confidence: float) -> str:
+        """Текст подписи с уверенностью, округленной до confidence_step"""
+        parts = []
+        if self.show_class_names:
+            parts.append(class_name)
+        if self.show_confidence:
+            bucket = round(confidence / self.confidence_step) * self.confidence_step
+            parts.append(format(bucket, self.confidence_format))
+        return " | ".join(parts)
+    
+    def sprite(self, class_name: str, label: str) -> Tuple[np.ndarray, np.ndarray, int, int]:
+        """
+        Растеризованная подпись
+        
+        Returns:
+            Кортеж (пиксели RGB, маска, смещение x, смещение y) относительно
+            левого верхнего угла бокса
+        """
+        key = (class_name, label)
+        cached = self._sprites.get(key)
+        if cached is not None:
+            self._sprites.move_to_end(key)
+            return cached
+        
+        import cv2
+
+        color = self.colors.get(class_name, (255, 255, 255))
+        (text_width, text_height), baseline = cv2.getTextSize(
+            label, self.font, self.font_scale, self.thickness
+        )
+        
+        # Текст может выходить за фон на толщину штриха и нижние выносные
+        margin = self.thickness
+        top = text_height + 10
+        height = top + baseline + 2 * margin
+        width = text_width + 2 * margin + 1
+        
+        pixels = np.zeros((height, width, 3), dtype=np.uint8)
+        mask = np.zeros((height, width), dtype=np.uint8)
+        for canvas, fill, ink in ((pixels, color, (0, 0, 0)), (mask, 255, 255)):
+            cv2.rectangle(canvas, (margin, 0), (margin + text_width, top), fill, -1)
+            cv2.putText(canvas, label, (margin, top - 5), self.font, self.font_scale, ink, self.thickness)
+        
+        entry = (pixels, mask.astype(bool), -margin, -top)
+        self._sprites[key] = entry
+        if len(self._sprites) > self.max_sprites:
+            self._sprites.popitem(last=False)
+        return entry
+    
+    def render(self,
+               image: np.ndarray,
+               results: Dict[str, Any],
+               out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Рисует детекции одного кадра
+        
+        Args:
+            image: Исходное изображение (RGB)
+            results: Результаты детекции от TrafficSignDetector
+            out: Буфер той же формы для результата; None - новая копия,
+                сам image - отрисовка на месте
+            
+        Returns:
+            Буфер с нарисованными детекциями
+        """
+        if out is None:
+            out = image.copy()
+        elif out is not image:
+            np.copyto(out, image)
+        
+        detections = results['detections']
+        if len(detections) == 0:
+            return out
+        
+        import cv2
+
+        height, width = out.shape[:2]
+        boxes = detections.bboxes.astype(int)
+        for (x1, y1, x2, y2), confidence, class_id in zip(
+                boxes.tolist(), detections.confidences.tolist(), detections.class_ids.tolist()):
+            class_name = detections.class_names[class_id]
+            cv2.rectangle(out, (x1, y1), (x2, y2), self.colors.get(class_name, (255, 255, 255)), self.thickness)
+            
+            label = self.label(class_name, confidence)
+            if not label:
+                continue
+            
+            pixels, mask, dx, dy = self.sprite(class_name, label)
+            
+            # Спрайт обрезается по границам кадра
+            left, top = x1 + dx, y1 + dy
+            x_from, y_from = max(left, 0), max(top, 0)
+            x_to = min(left + pixels.shape[1], width)
+            y_to = min(top + pixels.shape[0], height)
+            if x_from >= x_to or y_from >= y_to:
+                continue
+            
+            sprite_region = (slice(y_from - top, y_to - top), slice(x_from - left, x_to - left))
+            region_mask = mask[sprite_region]
+            out[y_from:y_to, x_from:x_to][region_mask] = pixels[sprite_region][region_mask]
+        
+        return out
+    
+    def render_batch(self,
+                     images: Sequence[np.ndarray],
+                     results: Sequence[Dict[str, Any]],
+                     out: Optional[Sequence[np.ndarray]] = None) -> List[np.ndarray]:
+        """
+        Рисует детекции набора кадров
+        
+        Args:
+            images: Исходные изображения (RGB)
+            results: Результаты детекции для каждого изображения
+            out: Буферы для результатов (список или массив (N, H, W, 3));
+                None - новые копии
+            
+        Returns:
+            Список буферов с нарисованными детекциями
+        """
+        if out is None:
+            out = [None] * len(images)
+        return [
+            self.render(image, result, buffer)
+            for image, result, buffer in zip(images, results, out)
+        ]
+
+def create_statistics_chart(stats: Union[DetectionStats, Detections]) -> "go.Figure":
     """
     Создает график статистики обнаруженных классов
     
     Args:
-        detections: Список детекций
+        stats: Накопленная статистика DetectionStats (для одного
+            изображения можно передать его Detections)
         
     Returns:
         Plotly фигура с графиком
     """
+    import plotly.graph_objects as go
+    
+    if isinstance(stats, Detections):
+        stats = DetectionStats.from_detections(stats)
     
-    if not detections:
+    if stats.total == 0:
         # Пустой график если нет детекций
         fig = go.Figure()
         fig.add_annotation(
@@ -108,25 +288,11 @@ def create_statistics_chart(detections: List[Dict[str, Any]]) -> go.Figure:
         )
         return fig
     
-    # Подсчитываем количество каждого класса
-    class_counts = {}
-    class_confidences = {}
-    
-    for detection in detections:
-        class_name = detection['class_name']
-        confidence = detection['confidence']
-        
-        if class_name not in class_counts:
-            class_counts[class_name] = 0
-            class_confidences[class_name] = []
-        
-        class_counts[class_name] += 1
-        class_confidences[class_name].append(confidence)
-    
-    # Подготавливаем данные для графика
-    classes = list(class_counts.keys())
-    counts = list(class_counts.values())
-    avg_confidences = [np.mean(class_confidences[cls]) for cls in classes]
+    # Данные для графика берутся из агрегатов по классам
+    summary = stats.summary()
+    classes = [row['class_name'] for row in summary]
+    counts = [row['count'] for row in summary]
+    avg_confidences = [row['mean_confidence'] for row in summary]
     
     # Создаем график
     fig = go.Figure()